@@ -0,0 +1,49 @@
+"""Composite indexes for listing, template and version queries
+
+Also backfills ``projects.updated_at`` (now the keyset pagination key) for
+rows that were never updated, and on SQLite rewrites timestamps stored by
+``CURRENT_TIMESTAMP`` into the format the ORM binds, so cursor comparisons
+treat equal times as equal.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_projects_user_updated', 'projects', ['user_id', 'updated_at', 'id']),
+    ('ix_projects_user_category_updated', 'projects', ['user_id', 'category', 'updated_at', 'id']),
+    ('ix_projects_public_updated', 'projects', ['is_public', 'updated_at', 'id']),
+    ('ix_projects_public_category_updated', 'projects', ['is_public', 'category', 'updated_at', 'id']),
+    ('ix_projects_template_public', 'projects', ['is_template', 'is_public']),
+    ('ix_project_versions_project_version', 'project_versions', ['project_id', 'version_number']),
+]
+
+
+def upgrade() -> None:
+    op.execute("UPDATE projects SET updated_at = created_at WHERE updated_at IS NULL")
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "UPDATE projects SET updated_at = updated_at || '.000000' "
+            "WHERE length(updated_at) = 19"
+        )
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,104 @@
+"""Move project and version HTML/CSS/JS into content-addressed blobs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('projects', 'project_versions')
+FIELDS = (('html_content', 'html_hash'), ('css_content', 'css_hash'), ('js_content', 'js_hash'))
+BATCH_SIZE = 500
+
+
+def _insert_blob_sql(dialect: str) -> sa.TextClause:
+    if dialect == 'sqlite':
+        return sa.text("INSERT OR IGNORE INTO content_blobs (hash, size, data) VALUES (:hash, :size, :data)")
+    return sa.text(
+        "INSERT INTO content_blobs (hash, size, data) VALUES (:hash, :size, :data) "
+        "ON CONFLICT (hash) DO NOTHING"
+    )
+
+
+def _batches(bind, table: str, columns: str):
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            f"SELECT id, {columns} FROM {table} WHERE id > :last_id ORDER BY id LIMIT {BATCH_SIZE}"
+        ), {"last_id": last_id}).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'content_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+
+    bind = op.get_bind()
+    insert_blob = _insert_blob_sql(bind.dialect.name)
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            for _, hash_column in FIELDS:
+                batch.add_column(sa.Column(hash_column, sa.String(length=64), nullable=True))
+
+        content_columns = ", ".join(field for field, _ in FIELDS)
+        for rows in _batches(bind, table, content_columns):
+            for row in rows:
+                hashes = {}
+                for (_, hash_column), text in zip(FIELDS, row[1:]):
+                    if text is None:
+                        hashes[hash_column] = None
+                        continue
+                    data = text.encode('utf-8')
+                    hashes[hash_column] = hashlib.sha256(data).hexdigest()
+                    bind.execute(insert_blob, {"hash": hashes[hash_column], "size": len(data), "data": data})
+                bind.execute(sa.text(
+                    f"UPDATE {table} SET html_hash = :html_hash, css_hash = :css_hash, js_hash = :js_hash "
+                    f"WHERE id = :id"
+                ), {**hashes, "id": row[0]})
+
+        with op.batch_alter_table(table) as batch:
+            for field, _ in FIELDS:
+                batch.drop_column(field)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    as_text = "convert_from(data, 'UTF8')" if bind.dialect.name == 'postgresql' else "CAST(data AS TEXT)"
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            for field, _ in FIELDS:
+                batch.add_column(sa.Column(field, sa.Text(), nullable=True))
+
+        for field, hash_column in FIELDS:
+            bind.execute(sa.text(
+                f"UPDATE {table} SET {field} = "
+                f"(SELECT {as_text} FROM content_blobs WHERE hash = {table}.{hash_column}) "
+                f"WHERE {hash_column} IS NOT NULL"
+            ))
+
+        with op.batch_alter_table(table) as batch:
+            for _, hash_column in FIELDS:
+                batch.drop_column(hash_column)
+
+    op.drop_table('content_blobs')
@@ -0,0 +1,105 @@
+"""Delta-encoded project versions with periodic keyframes
+
+Existing versions stay full copies (keyframes) with no content hash; the
+background re-encode job rewrites them into delta chains after upgrade.
+Downgrade turns every delta back into a full copy first.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.delta import apply_fields
+from app.core.versions import pack_fields, unpack_fields
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('is_keyframe', 'chain_depth', 'base_version_number', 'delta', 'content_hash', 'content_size', 'stored_size')
+HASH_COLUMNS = ('html_hash', 'css_hash', 'js_hash')
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('project_versions') as batch:
+        batch.add_column(sa.Column('is_keyframe', sa.Boolean(), server_default='1', nullable=False))
+        batch.add_column(sa.Column('chain_depth', sa.Integer(), server_default='0', nullable=False))
+        batch.add_column(sa.Column('base_version_number', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('delta', sa.LargeBinary(), nullable=True))
+        batch.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column('content_size', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('stored_size', sa.Integer(), nullable=True))
+
+
+def _insert_blob_sql(dialect: str) -> sa.TextClause:
+    if dialect == 'sqlite':
+        return sa.text("INSERT OR IGNORE INTO content_blobs (hash, size, data) VALUES (:hash, :size, :data)")
+    return sa.text(
+        "INSERT INTO content_blobs (hash, size, data) VALUES (:hash, :size, :data) "
+        "ON CONFLICT (hash) DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insert_blob = _insert_blob_sql(bind.dialect.name)
+    project_ids = bind.execute(sa.text(
+        "SELECT DISTINCT project_id FROM project_versions WHERE is_keyframe = :false"
+    ), {"false": False}).scalars().all()
+
+    for project_id in project_ids:
+        rows = bind.execute(sa.text(
+            "SELECT id, version_number, is_keyframe, base_version_number, delta, "
+            "html_hash, css_hash, js_hash, elements_tree "
+            "FROM project_versions WHERE project_id = :project_id ORDER BY version_number"
+        ), {"project_id": project_id}).fetchall()
+        rebuilt = {}
+        for row in rows:
+            if row.is_keyframe:
+                texts = {}
+                for column in HASH_COLUMNS:
+                    blob_hash = getattr(row, column)
+                    data = bind.execute(
+                        sa.text("SELECT data FROM content_blobs WHERE hash = :hash"), {"hash": blob_hash}
+                    ).scalar() if blob_hash else None
+                    texts[column] = data.decode('utf-8') if data is not None else None
+                tree = row.elements_tree
+                if isinstance(tree, str):
+                    tree = json.loads(tree)
+                rebuilt[row.version_number] = pack_fields({
+                    'html_content': texts['html_hash'],
+                    'css_content': texts['css_hash'],
+                    'js_content': texts['js_hash'],
+                    'elements_tree': tree,
+                })
+                continue
+
+            fields = apply_fields(rebuilt[row.base_version_number], row.delta)
+            rebuilt[row.version_number] = fields
+            content = unpack_fields(fields)
+            hashes = {}
+            for column, data in zip(HASH_COLUMNS, fields[:3]):
+                if data is None:
+                    hashes[column] = None
+                    continue
+                hashes[column] = hashlib.sha256(data).hexdigest()
+                bind.execute(insert_blob, {"hash": hashes[column], "size": len(data), "data": data})
+            tree = content['elements_tree']
+            bind.execute(sa.text(
+                "UPDATE project_versions SET html_hash = :html_hash, css_hash = :css_hash, "
+                "js_hash = :js_hash, elements_tree = :elements_tree WHERE id = :id"
+            ), {**hashes, "elements_tree": json.dumps(tree) if tree is not None else None, "id": row.id})
+
+    with op.batch_alter_table('project_versions') as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column)
@@ -0,0 +1,85 @@
+"""Compress content blobs and JSON trees in place
+
+JSON tree columns become binary columns holding compressed UTF-8 JSON. Rows
+are rewritten in batches; readers accept both the old (headerless) and the
+new format, so the upgrade can also be left to finish while serving.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.compression import compress, decompress
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = (('projects', 'elements_tree'), ('projects', 'canvas_settings'), ('project_versions', 'elements_tree'))
+BATCH_SIZE = 500
+
+
+def _batches(bind, table: str, key: str, column: str):
+    last = None
+    while True:
+        where = f"{column} IS NOT NULL" + (f" AND {key} > :last" if last is not None else "")
+        rows = bind.execute(sa.text(
+            f"SELECT {key}, {column} FROM {table} WHERE {where} ORDER BY {key} LIMIT {BATCH_SIZE}"
+        ), {"last": last}).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def _recompress(value) -> bytes:
+    return compress(decompress(value))
+
+
+def _decompress_text(value) -> str:
+    return decompress(value).decode('utf-8')
+
+
+def _rewrite(bind, table: str, key: str, column: str, convert, type_=sa.LargeBinary()):
+    update = sa.text(f"UPDATE {table} SET {column} = :value WHERE {key} = :key").bindparams(
+        sa.bindparam('value', type_=type_)
+    )
+    for rows in _batches(bind, table, key, column):
+        bind.execute(update, [{"key": row[0], "value": convert(row[1])} for row in rows])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table, column in JSON_COLUMNS:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                column, type_=sa.LargeBinary(), existing_type=sa.JSON(), existing_nullable=True,
+                postgresql_using=f"convert_to({column}::text, 'UTF8')"
+            )
+
+    for table, column in JSON_COLUMNS:
+        _rewrite(bind, table, 'id', column, _recompress)
+    _rewrite(bind, 'content_blobs', 'hash', 'data', _recompress)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    _rewrite(bind, 'content_blobs', 'hash', 'data', decompress)
+    for table, column in JSON_COLUMNS:
+        if bind.dialect.name == 'sqlite':
+            _rewrite(bind, table, 'id', column, _decompress_text, sa.Text())
+        else:
+            _rewrite(bind, table, 'id', column, decompress)
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                column, type_=sa.JSON(), existing_type=sa.LargeBinary(), existing_nullable=True,
+                postgresql_using=f"convert_from({column}, 'UTF8')::json"
+            )
@@ -0,0 +1,75 @@
+"""Version counters on projects and unique version numbers
+
+Backfills ``projects.latest_version_number`` / ``version_count`` and makes
+``(project_id, version_number)`` unique. Projects that already hold
+duplicate numbers (from concurrent snapshots) have their history renumbered
+in (version_number, id) order first; delta bases are pointed at the first
+row that carried the old number, and the content check on reconstruction
+flags any delta that was in fact taken against the other one.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _renumber_duplicates(bind):
+    project_ids = bind.execute(sa.text(
+        "SELECT DISTINCT project_id FROM project_versions "
+        "GROUP BY project_id, version_number HAVING COUNT(*) > 1"
+    )).scalars().all()
+    for project_id in project_ids:
+        rows = bind.execute(sa.text(
+            "SELECT id, version_number, base_version_number FROM project_versions "
+            "WHERE project_id = :project_id ORDER BY version_number, id"
+        ), {"project_id": project_id}).fetchall()
+        renumbered = {}
+        for number, row in enumerate(rows, start=1):
+            renumbered.setdefault(row.version_number, number)
+        # Negative first, so no intermediate state collides with the new index
+        for number, row in enumerate(rows, start=1):
+            bind.execute(sa.text("UPDATE project_versions SET version_number = :number WHERE id = :id"),
+                         {"number": -number, "id": row.id})
+        for number, row in enumerate(rows, start=1):
+            base = renumbered.get(row.base_version_number) if row.base_version_number is not None else None
+            bind.execute(sa.text(
+                "UPDATE project_versions SET version_number = :number, base_version_number = :base WHERE id = :id"
+            ), {"number": number, "base": base, "id": row.id})
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('projects') as batch:
+        batch.add_column(sa.Column('latest_version_number', sa.Integer(), server_default='0', nullable=False))
+        batch.add_column(sa.Column('version_count', sa.Integer(), server_default='0', nullable=False))
+
+    bind = op.get_bind()
+    _renumber_duplicates(bind)
+    op.execute(
+        "UPDATE projects SET "
+        "latest_version_number = COALESCE((SELECT MAX(version_number) FROM project_versions "
+        "WHERE project_versions.project_id = projects.id), 0), "
+        "version_count = (SELECT COUNT(*) FROM project_versions WHERE project_versions.project_id = projects.id)"
+    )
+
+    op.drop_index('ix_project_versions_project_version', table_name='project_versions')
+    op.create_index('ix_project_versions_project_version', 'project_versions', ['project_id', 'version_number'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_project_versions_project_version', table_name='project_versions')
+    op.create_index('ix_project_versions_project_version', 'project_versions', ['project_id', 'version_number'])
+    with op.batch_alter_table('projects') as batch:
+        batch.drop_column('version_count')
+        batch.drop_column('latest_version_number')
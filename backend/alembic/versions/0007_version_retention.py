@@ -0,0 +1,32 @@
+"""Version retention: per-project policy and last check time
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('projects') as batch:
+        batch.add_column(sa.Column('retention_policy', sa.String(length=255), nullable=True))
+        batch.add_column(sa.Column('retention_checked_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_projects_retention_checked', 'projects', ['retention_checked_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_projects_retention_checked', table_name='projects')
+    with op.batch_alter_table('projects') as batch:
+        batch.drop_column('retention_checked_at')
+        batch.drop_column('retention_policy')
@@ -0,0 +1,31 @@
+"""Project structure hashes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:08
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Left NULL (unknown) on existing rows: their next save writes them
+    with op.batch_alter_table('projects') as batch:
+        batch.add_column(sa.Column('tree_hash', sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column('canvas_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('projects') as batch:
+        batch.drop_column('canvas_hash')
+        batch.drop_column('tree_hash')
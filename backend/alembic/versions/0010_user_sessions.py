@@ -0,0 +1,43 @@
+"""Login sessions for refresh tokens
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:09
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_sessions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('refresh_hash', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_user_sessions_user', 'user_sessions', ['user_id'])
+    op.create_index('ix_user_sessions_revoked', 'user_sessions', ['revoked_at'])
+    op.create_index('ix_user_sessions_expires', 'user_sessions', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_sessions_expires', table_name='user_sessions')
+    op.drop_index('ix_user_sessions_revoked', table_name='user_sessions')
+    op.drop_index('ix_user_sessions_user', table_name='user_sessions')
+    op.drop_table('user_sessions')
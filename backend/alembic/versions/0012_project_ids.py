@@ -0,0 +1,33 @@
+"""Drop orphaned versions and stop reusing project ids
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 00:00:11
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versions of projects deleted before deleting a project removed them
+    op.execute('DELETE FROM project_versions WHERE project_id NOT IN (SELECT id FROM projects)')
+    # Other databases never hand out a sequence value twice; SQLite needs AUTOINCREMENT
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('projects', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('projects', recreate='always'):
+            pass
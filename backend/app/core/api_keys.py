@@ -0,0 +1,133 @@
+"""
+API keys: prefix lookup, HMAC check and batched last-used tracking
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.api_key import ApiKey
+from app.models.user import User
+
+API_KEY_MARKER = "dnd_"
+
+# What a key can be limited to; interactive logins have all of them
+API_KEY_SCOPES = ("projects:read", "projects:write", "account", "admin")
+
+class UsageTracker:
+    """Last use of each API key, kept in memory and written in batches
+
+    Validating a key stays a read; the ``api_keys.usage`` background job
+    writes the collected times with one statement per flush.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._used: Dict[int, datetime] = {}
+
+    def record(self, key_id: int):
+        with self._lock:
+            self._used[key_id] = datetime.utcnow()
+
+    def take(self) -> Dict[int, datetime]:
+        """Remove and return everything recorded so far"""
+        with self._lock:
+            used, self._used = self._used, {}
+        return used
+
+    def restore(self, used: Dict[int, datetime]):
+        """Put back uses that could not be written, under any newer ones"""
+        with self._lock:
+            for key_id, used_at in used.items():
+                self._used.setdefault(key_id, used_at)
+
+    def __len__(self) -> int:
+        return len(self._used)
+
+key_usage = UsageTracker()
+metrics.register_collector("auth.api_keys", lambda: {"pending_usage": len(key_usage)})
+
+def is_api_key(token: str) -> bool:
+    """Whether a bearer credential is an API key rather than a JWT"""
+    return token.startswith(API_KEY_MARKER)
+
+def key_hash(secret: str) -> str:
+    """HMAC-SHA256 of a key's secret (changing SECRET_KEY invalidates every key)"""
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), secret.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def parse_api_key(token: str) -> Optional[Tuple[str, str]]:
+    """Split ``dnd_<prefix>_<secret>``"""
+    prefix, _, secret = token[len(API_KEY_MARKER):].partition("_")
+    if not prefix or not secret or len(prefix) > 16:
+        return None
+    return prefix, secret
+
+def new_api_key(user_id: int, name: str, scopes: Iterable[str], expires_at: Optional[datetime] = None) -> Tuple[ApiKey, str]:
+    """A new (unsaved) key and its full value, which is shown once and never stored"""
+    prefix, secret = secrets.token_hex(6), secrets.token_urlsafe(32)
+    api_key = ApiKey(
+        user_id=user_id,
+        name=name,
+        prefix=prefix,
+        key_hash=key_hash(secret),
+        scopes=sorted(set(scopes)),
+        expires_at=expires_at
+    )
+    return api_key, f"{API_KEY_MARKER}{prefix}_{secret}"
+
+async def authenticate_api_key(db: AsyncSession, token: str) -> Optional[Tuple[ApiKey, User]]:
+    """The live key and active user a credential belongs to, or None
+
+    One lookup by the unique prefix (joined to its user) and one HMAC.
+    """
+    parsed = parse_api_key(token)
+    if parsed is None:
+        return None
+    prefix, secret = parsed
+
+    result = await db.execute(
+        select(ApiKey, User).join(User, User.id == ApiKey.user_id).where(ApiKey.prefix == prefix)
+    )
+    row = result.first()
+    if (
+        row is None
+        or not hmac.compare_digest(row.ApiKey.key_hash, key_hash(secret))
+        or row.ApiKey.revoked_at is not None
+        or (row.ApiKey.expires_at is not None and row.ApiKey.expires_at <= datetime.utcnow())
+        or not row.User.is_active
+    ):
+        metrics.increment("auth.api_keys.rejected")
+        return None
+
+    metrics.increment("auth.api_keys.accepted")
+    key_usage.record(row.ApiKey.id)
+    return row.ApiKey, row.User
+
+async def flush_key_usage(db: AsyncSession) -> int:
+    """Background job: write the recorded last-used times, returning how many keys"""
+    used = key_usage.take()
+    if not used:
+        return 0
+    try:
+        await db.execute(
+            update(ApiKey.__table__).where(ApiKey.id == bindparam("key_id")).values(last_used_at=bindparam("used_at")),
+            [{"key_id": key_id, "used_at": used_at} for key_id, used_at in used.items()]
+        )
+    except Exception:
+        key_usage.restore(used)
+        raise
+    return len(used)
+
+def missing_scopes(granted: Optional[Iterable[str]], required: Iterable[str]) -> List[str]:
+    """Required scopes a principal lacks (``granted`` None means unrestricted)"""
+    if granted is None:
+        return []
+    return [scope for scope in required if scope not in granted]
@@ -2,24 +2,49 @@
 Authentication utilities
 """
 
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, Security, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, SecurityScopes
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.api_keys import authenticate_api_key, is_api_key, missing_scopes
+from app.core.cache import LRUCache
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.offload import BoundedExecutor, ExecutorBusy
+from app.core.sessions import revoked_sessions
 from app.database import get_db
 from app.models.user import User
 
-# Password hashing
+# Password hashing (bcrypt takes ~100-300 ms of CPU: request handlers go through password_executor)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_executor = BoundedExecutor("passwords", settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
 
 # Security
 security = HTTPBearer()
 
+# Authenticated users by token subject. Entries are column snapshots (no
+# password hash) and each request gets its own User built from one, so no
+# ORM instance is shared between requests or threads.
+principal_cache = LRUCache(
+    "auth.principals", settings.AUTH_PRINCIPAL_CACHE_SIZE, settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+)
+PRINCIPAL_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key != "hashed_password")
+_invalidations = 0
+
+def invalidate_principal(username: str):
+    """Drop a cached user after it changed (profile update, deactivation)"""
+    global _invalidations
+    _invalidations += 1
+    principal_cache.pop(username)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -28,6 +53,25 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def run_password_work(fn, *args):
+    """Run a password hash or check off the event loop; 503 when too many are queued"""
+    try:
+        return await password_executor.run(fn, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the password executor"""
+    return await run_password_work(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the password executor"""
+    return await run_password_work(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -40,43 +84,179 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify a JWT token and return the username"""
+# Verified claims by token digest, each kept until its token expires
+token_cache = LRUCache("auth.tokens", settings.AUTH_TOKEN_CACHE_SIZE)
+
+# Revoked token digests -> expiry (epoch seconds); entries go once the token would be rejected anyway
+revoked_tokens: Dict[str, float] = {}
+_revocation_lock = threading.Lock()
+
+def token_digest(token: str) -> str:
+    """Cache key of a token (the token itself is never kept)"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verified claims of a JWT, or None if it is invalid, expired or revoked
+
+    The signature is checked once per token: the claims are then served from
+    token_cache until the token's ``exp``.
+    """
+    digest = token_digest(token)
+    if digest in revoked_tokens:
+        return None
+    claims = token_cache.get(digest)
+    if claims is not None and claims["exp"] > time.time():
+        return claims
+    
+    started = time.perf_counter()
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
+    finally:
+        metrics.observe("auth.token.decode", time.perf_counter() - started)
+    
+    expires_at = claims.get("exp")
+    if isinstance(expires_at, (int, float)):
+        token_cache.put(digest, claims, ttl=expires_at - time.time())
+    return claims
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user"""
-    credentials_exception = HTTPException(
+def revoke_token(token: str):
+    """Reject a token from now on, e.g. on logout (this process only)"""
+    claims = decode_token(token)
+    if claims is None:
+        return
+    digest = token_digest(token)
+    now = time.time()
+    with _revocation_lock:
+        for expired in [key for key, expires_at in revoked_tokens.items() if expires_at <= now]:
+            del revoked_tokens[expired]
+        revoked_tokens[digest] = claims.get("exp", now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    token_cache.pop(digest)
+    metrics.increment("auth.token.revoked")
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify a JWT token and return the username"""
+    claims = decode_token(token)
+    if claims is None:
+        return None
+    return claims.get("sub")
+
+def user_role(username: str) -> str:
+    """Role claim for a user"""
+    return "admin" if username in settings.ADMIN_USERNAMES else "user"
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def authenticate_token(token: str) -> Dict[str, Any]:
+    """Claims of a valid bearer token whose session (if it names one) is not revoked, else 401"""
+    claims = decode_token(token)
+    if claims is None or claims.get("sub") is None or claims.get("sid") in revoked_sessions:
+        raise credentials_exception()
+    return claims
+
+async def api_key_principal(db: AsyncSession, token: str) -> User:
+    """The owner of an API key, limited to the key's scopes (401 if the key is not valid)"""
+    authenticated = await authenticate_api_key(db, token)
+    if authenticated is None:
+        raise credentials_exception()
+    api_key, user = authenticated
+    user.scopes = frozenset(api_key.scopes)
+    user.role = user_role(user.username) if "admin" in user.scopes else "user"
+    return user
+
+def check_scopes(user: User, security_scopes: SecurityScopes):
+    """403 unless the principal has every scope the endpoint declares"""
+    missing = missing_scopes(user.scopes, security_scopes.scopes)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"API key lacks scope: {' '.join(missing)}",
+            headers={"WWW-Authenticate": f'Bearer scope="{security_scopes.scope_str}"'},
+        )
+
+async def get_current_user(
+    security_scopes: SecurityScopes,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get the current authenticated user (cached per subject; a detached User)
+
+    Load the user in your own session before changing it, and call
+    invalidate_principal afterwards. API keys are accepted as bearer
+    credentials too, subject to the scopes declared with ``Security``.
+    """
+    if is_api_key(credentials.credentials):
+        user = await api_key_principal(db, credentials.credentials)
+    else:
+        claims = authenticate_token(credentials.credentials)
+        user = await load_principal(db, claims["sub"])
+        user.role = claims.get("role") or user_role(user.username)
+    check_scopes(user, security_scopes)
+    return user
+
+async def get_current_principal(
+    security_scopes: SecurityScopes,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """The authenticated user as its access token describes it: id, username and role, no query
+
+    For handlers that only need to know who is calling. Deactivating a user
+    revokes its sessions, which rejects their tokens here; tokens without a
+    ``uid`` claim fall back to get_current_user. API keys cost one lookup.
+    """
+    if is_api_key(credentials.credentials):
+        user = await api_key_principal(db, credentials.credentials)
+    else:
+        claims = authenticate_token(credentials.credentials)
+        if claims.get("uid") is None:
+            user = await load_principal(db, claims["sub"])
+        else:
+            user = User(id=claims["uid"], username=claims["sub"], is_active=True)
+        user.role = claims.get("role") or user_role(user.username)
+    check_scopes(user, security_scopes)
+    return user
+
+async def load_principal(db: AsyncSession, username: str) -> User:
+    """Active user by username, through principal_cache (401 if unknown or inactive)"""
+    principal: Optional[Dict[str, Any]] = principal_cache.get(username)
+    if principal is None:
+        invalidations = _invalidations
+        result = await db.execute(select(User).where(User.username == username))
+        user = result.scalars().first()
+        if user is None:
+            raise credentials_exception()
+        principal = {column: getattr(user, column) for column in PRINCIPAL_COLUMNS}
+        # Not if the user changed while it was being loaded: this copy may predate it
+        if invalidations == _invalidations:
+            principal_cache.put(username, principal)
     
-    username = verify_token(credentials.credentials)
-    if username is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+    if not principal["is_active"]:
+        raise credentials_exception()
     
-    return user
+    return User(**principal)
+
+async def get_current_admin(current_user: User = Security(get_current_principal, scopes=["admin"])) -> User:
+    """Require the current user to be an administrator (by the token's role claim)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator access required"
+        )
+    return current_user
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user"""
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
\ No newline at end of file
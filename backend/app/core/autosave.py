@@ -0,0 +1,283 @@
+"""
+Write-behind autosave: coalesce an editor's frequent saves in memory
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.blobs import assign_changes
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import AsyncSessionLocal, run_write
+from app.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+class PendingSave:
+    """Fields of one project saved to the buffer but not yet written"""
+
+    __slots__ = ("user_id", "values", "writes", "sequence", "first_at", "last_at", "modified_at", "revisions", "failures")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        # (before, after) once written: the project revisions around this write
+        self.revisions: Optional[Tuple[int, int]] = None
+        self.values: Dict[str, Any] = {}
+        self.writes = 0
+        self.failures = 0
+        self.sequence = 0
+        self.first_at = self.last_at = time.monotonic()
+        self.modified_at = datetime.utcnow()
+
+    def absorb(self, newer: "PendingSave"):
+        """Take ``newer`` saves on top of these ones"""
+        self.values.update(newer.values)
+        self.writes += newer.writes
+        self.sequence = newer.sequence
+        self.last_at = newer.last_at
+        self.modified_at = newer.modified_at
+
+class AutosaveBuffer:
+    """Per-project buffer of autosaved fields, written behind the request
+
+    Each save is merged into the project's pending entry (a later value of a
+    field replaces the earlier one), so a burst of autosaves becomes a single
+    transaction. An entry is written once the project has been idle for
+    ``idle`` seconds, or ``interval`` seconds after its first buffered save,
+    whichever comes first; everything left is written on shutdown.
+
+    Each project is written under its own savepoint: saves the database
+    rejects go back to the buffer without holding up other projects, and
+    are dropped (and logged) after AUTOSAVE_MAX_FAILURES attempts.
+
+    The buffer lives in the process: run one worker (or route a project's
+    requests to the same one) when autosave is used.
+    """
+
+    def __init__(self, interval: float, idle: float):
+        self.interval = interval
+        self.idle = idle
+        self._pending: Dict[int, PendingSave] = {}
+        self._flushing: Dict[int, PendingSave] = {}
+        self._written = LRUCache("autosave.written", 4096)
+        self._sequence = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def buffering(self) -> bool:
+        """Whether saves are held back at all (a non-positive interval writes through)"""
+        return self.interval > 0
+
+    def owner(self, project_id: int) -> Optional[int]:
+        """User a buffered project belongs to, if it has pending saves"""
+        entry = self._pending.get(project_id) or self._flushing.get(project_id)
+        return entry.user_id if entry is not None else None
+
+    def projects_of(self, user_id: int) -> List[int]:
+        """Projects of a user that have saves in the buffer"""
+        return [
+            project_id for project_id, entry in (*self._pending.items(), *self._flushing.items())
+            if entry.user_id == user_id
+        ]
+
+    def put(self, project_id: int, user_id: int, values: Dict[str, Any]) -> PendingSave:
+        """Buffer ``values`` for a project, superseding earlier buffered values"""
+        entry = self._pending.get(project_id)
+        if entry is None:
+            entry = self._pending[project_id] = PendingSave(user_id)
+        else:
+            metrics.increment("autosave.coalesced")
+        self._sequence += 1
+        entry.values.update(values)
+        entry.writes += 1
+        entry.sequence = self._sequence
+        entry.last_at = time.monotonic()
+        entry.modified_at = datetime.utcnow()
+        metrics.increment("autosave.writes")
+        return entry
+
+    async def save(self, project_id: int, user_id: int, values: Dict[str, Any]) -> PendingSave:
+        """Buffer a save, writing it straight away when buffering is off"""
+        entry = self.put(project_id, user_id, values)
+        if not self.buffering:
+            await self.flush([project_id])
+        return entry
+
+    def view(self, project_id: int) -> Optional[Tuple[Dict[str, Any], int, datetime]]:
+        """Unwritten values of a project (including a write in progress), their sequence and time"""
+        flushing, pending = self._flushing.get(project_id), self._pending.get(project_id)
+        if flushing is None and pending is None:
+            return None
+        values = dict(flushing.values) if flushing is not None else {}
+        latest = pending or flushing
+        if pending is not None:
+            values.update(pending.values)
+        return values, latest.sequence, latest.modified_at
+
+    def written(self, project_id: int) -> Optional[Tuple[int, int, int]]:
+        """Sequence of a project's last written saves, and its revisions before and after
+
+        A client may still hold the ETag it was shown while those saves were
+        buffered; it names the same content as the revision they produced.
+        """
+        return self._written.get(project_id)
+
+    def discard(self, project_id: int):
+        """Forget a project's pending saves (the project is gone)"""
+        self._pending.pop(project_id, None)
+        self._written.pop(project_id)
+
+    def _requeue(self, project_id: int, entry: PendingSave):
+        """Put saves that could not be written back, under anything saved in the meantime"""
+        if project_id in self._pending:
+            entry.absorb(self._pending[project_id])
+        self._pending[project_id] = entry
+
+    def due(self, now: Optional[float] = None) -> List[int]:
+        """Projects whose saves should be written now"""
+        now = time.monotonic() if now is None else now
+        return [
+            project_id for project_id, entry in self._pending.items()
+            if now - entry.last_at >= self.idle or now - entry.first_at >= self.interval
+        ]
+
+    async def flush(self, project_ids: Iterable[int]) -> int:
+        """Write the pending saves of ``project_ids`` in one transaction
+
+        Waits for a write already in progress, so that callers about to write
+        the project themselves never race the buffer. Saves that fail go back
+        to the buffer, under anything saved in the meantime; a project's saves
+        that keep failing are dropped.
+        """
+        async with self._lock:
+            entries = {
+                project_id: self._pending.pop(project_id)
+                for project_id in project_ids if project_id in self._pending
+            }
+            if not entries:
+                return 0
+            self._flushing.update(entries)
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    written, failed = await run_write(db, lambda session: write_saves(session, entries))
+            except Exception:
+                metrics.increment("autosave.failures")
+                for project_id, entry in entries.items():
+                    self._requeue(project_id, entry)
+                raise
+            finally:
+                for project_id in entries:
+                    self._flushing.pop(project_id, None)
+
+            for project_id, error in failed.items():
+                entry = entries[project_id]
+                entry.failures += 1
+                metrics.increment("autosave.failures")
+                if entry.failures >= settings.AUTOSAVE_MAX_FAILURES:
+                    metrics.increment("autosave.dropped")
+                    logger.error(
+                        "Dropping autosaved %s of project %s after %s failed writes: %s",
+                        sorted(entry.values), project_id, entry.failures, error
+                    )
+                else:
+                    self._requeue(project_id, entry)
+
+        for project_id, entry in entries.items():
+            if entry.revisions is not None:
+                self._written.put(project_id, (entry.sequence, *entry.revisions))
+        now = time.monotonic()
+        metrics.observe("autosave.flush", time.perf_counter() - started)
+        metrics.increment("autosave.flushed", written)
+        for entry in entries.values():
+            metrics.observe("autosave.delay", now - entry.first_at)
+        return written
+
+    async def flush_project(self, project_id: int) -> int:
+        """Write one project's buffered saves before it is read or written directly"""
+        if project_id not in self._pending and project_id not in self._flushing:
+            return 0
+        return await self.flush([project_id])
+
+    async def flush_all(self) -> int:
+        """Write every pending save"""
+        return await self.flush(list(self._pending))
+
+    def start(self):
+        """Start flushing in the background on the running event loop"""
+        self._lock = asyncio.Lock()
+        if self.buffering and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flush, then write whatever is still buffered"""
+        if self._task is not None:
+            # Holding the lock means no flush is cut off half way
+            async with self._lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_all()
+
+    async def _run(self):
+        tick = max(min(self.interval, self.idle) / 4, 0.01)
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                due = self.due()
+                if due:
+                    await self.flush(due)
+            except Exception:
+                logger.exception("Autosave flush failed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Live gauges of what is waiting to be written"""
+        return {
+            "pending_projects": len(self._pending),
+            "pending_writes": sum(entry.writes for entry in self._pending.values()),
+            "flushing_projects": len(self._flushing),
+        }
+
+async def write_saves(db: AsyncSession, entries: Dict[int, PendingSave]) -> Tuple[int, Dict[int, Exception]]:
+    """Apply buffered saves like full updates, returning how many projects changed and the errors of those that failed
+
+    Each project is written under its own savepoint, so one rejected save
+    does not undo the others. Projects deleted since, and saves that change
+    nothing, are skipped.
+    """
+    result = await db.execute(select(Project).where(Project.id.in_(list(entries))))
+    written = 0
+    failed: Dict[int, Exception] = {}
+    for project in result.scalars().all():
+        # Read before the savepoint: rolling it back expires the project
+        project_id, revision = project.id, project.revision
+        entry = entries[project_id]
+        if project.user_id != entry.user_id:
+            continue
+        try:
+            async with db.begin_nested():
+                if await assign_changes(db, project, entry.values):
+                    project.revision = Project.revision + 1
+                    await db.flush()
+                    entry.revisions = (revision, revision + 1)
+                    written += 1
+                else:
+                    entry.revisions = (revision, revision)
+        except Exception as error:
+            failed[project_id] = error
+    return written, failed
+
+# Global autosave buffer
+autosave_buffer = AutosaveBuffer(settings.AUTOSAVE_FLUSH_INTERVAL_SECONDS, settings.AUTOSAVE_IDLE_SECONDS)
+metrics.register_collector("autosave", autosave_buffer.stats)
@@ -0,0 +1,130 @@
+"""
+Content-addressed blob store helpers
+"""
+
+import codecs
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from sqlalchemy import LargeBinary, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.compression import StreamDecompressor
+from app.models.blob import ContentBlob
+from app.models.project import CONTENT_FIELDS, HASHED_FIELDS
+
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes per read when streaming a blob
+
+def _insert_ignore(dialect_name: str):
+    """INSERT that silently skips rows whose hash is already stored"""
+    if dialect_name == "postgresql":
+        return postgresql.insert(ContentBlob).on_conflict_do_nothing(index_elements=["hash"])
+    if dialect_name == "sqlite":
+        return sqlite.insert(ContentBlob).on_conflict_do_nothing(index_elements=["hash"])
+    return ContentBlob.__table__.insert().prefix_with("IGNORE")
+
+async def put_blob(db: AsyncSession, text: Optional[str]) -> Optional[str]:
+    """Store text once and return its hash (None for None)"""
+    if text is None:
+        return None
+    blob = ContentBlob.from_text(text)
+    await db.execute(
+        _insert_ignore(db.bind.dialect.name),
+        [{"hash": blob.hash, "size": blob.size, "data": blob.data}]
+    )
+    return blob.hash
+
+def json_hash(value: Any) -> str:
+    """SHA-256 of a JSON value's canonical serialization (key order does not matter)"""
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+async def assign_content(db: AsyncSession, target: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the content fields of ``values`` as blobs and point ``target`` at them
+
+    Returns the remaining (non-content) values; the hashes of the JSON ones
+    are set on ``target`` too.
+    """
+    remaining = dict(values)
+    for field, hash_column in CONTENT_FIELDS.items():
+        if field in remaining:
+            setattr(target, hash_column, await put_blob(db, remaining.pop(field)))
+    for field, hash_column in HASHED_FIELDS.items():
+        if field in remaining:
+            setattr(target, hash_column, json_hash(remaining[field]))
+    return remaining
+
+async def assign_changes(db: AsyncSession, target: Any, values: Dict[str, Any]) -> List[str]:
+    """Set only the ``values`` that differ from what ``target`` stores
+
+    Content and JSON fields are compared by hash, so none of them is loaded
+    (a JSON field whose hash is not known yet counts as changed); the rest
+    are compared by value. Returns the names of the fields that changed.
+    """
+    changed = []
+    for field, value in values.items():
+        if field in CONTENT_FIELDS:
+            hash_column = CONTENT_FIELDS[field]
+            stored = getattr(target, hash_column)
+            if stored == (ContentBlob.hash_text(value) if value is not None else None):
+                continue
+            setattr(target, hash_column, await put_blob(db, value))
+        elif field in HASHED_FIELDS:
+            hash_column = HASHED_FIELDS[field]
+            digest = json_hash(value)
+            if getattr(target, hash_column) == digest:
+                continue
+            setattr(target, field, value)
+            setattr(target, hash_column, digest)
+        else:
+            if getattr(target, field) == value:
+                continue
+            setattr(target, field, value)
+        changed.append(field)
+    return changed
+
+async def get_texts(db: AsyncSession, hashes: Iterable[Optional[str]]) -> Dict[str, str]:
+    """Load the text of several blobs in one query"""
+    wanted = {h for h in hashes if h}
+    if not wanted:
+        return {}
+    result = await db.execute(select(ContentBlob.hash, ContentBlob.data).where(ContentBlob.hash.in_(wanted)))
+    return {blob_hash: data.decode("utf-8") for blob_hash, data in result.all()}
+
+def content_hashes(source: Any) -> Dict[str, Optional[str]]:
+    """Blob hash of each content field of a project or version"""
+    return {field: getattr(source, column) for field, column in CONTENT_FIELDS.items()}
+
+async def load_content(db: AsyncSession, source: Any) -> Dict[str, Optional[str]]:
+    """Materialize the content fields of a project or version"""
+    texts = await get_texts(db, (getattr(source, column) for column in CONTENT_FIELDS.values()))
+    return {field: texts.get(getattr(source, column)) for field, column in CONTENT_FIELDS.items()}
+
+async def stream_text(
+    db: AsyncSession,
+    blob_hash: str,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[str]:
+    """Yield a blob's text in chunks read with SUBSTR, never holding it whole
+
+    Slices are taken from the stored (possibly compressed) bytes and
+    decompressed incrementally.
+    """
+    decompressor = StreamDecompressor()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    offset = 0
+    while True:
+        result = await db.execute(
+            select(func.substr(ContentBlob.data, offset + 1, chunk_size, type_=LargeBinary))
+            .where(ContentBlob.hash == blob_hash)
+        )
+        chunk = result.scalar_one()
+        offset += chunk_size
+        last = len(chunk) < chunk_size
+        text = decoder.decode(decompressor.feed(chunk), final=last)
+        if text:
+            yield text
+        if last:
+            return
@@ -0,0 +1,94 @@
+"""
+In-process caches
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import metrics
+
+class LRUCache:
+    """Thread-safe mapping bounded to ``maxsize`` entries, least recently used out first
+
+    With a ``ttl`` (seconds) entries also expire that long after they were
+    stored; ``put`` can give an entry a shorter one. Hits, misses, evictions
+    and expirations are counted as ``cache.{name}.*`` metrics, and the
+    current size and hit rate are reported as a gauge.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        metrics.register_collector(f"cache.{name}", self.stats)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (marking it recently used) or ``default``"""
+        expired = False
+        with self._lock:
+            try:
+                expires_at, value = self._entries[key]
+            except KeyError:
+                value = default
+                hit = False
+            else:
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._entries[key]
+                    value = default
+                    hit = False
+                    expired = True
+                else:
+                    self._entries.move_to_end(key)
+                    hit = True
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+        metrics.increment(f"cache.{self.name}.{'hits' if hit else 'misses'}")
+        if expired:
+            metrics.increment(f"cache.{self.name}.expirations")
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries beyond maxsize"""
+        if self.ttl is not None:
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            metrics.increment(f"cache.{self.name}.evictions", evicted)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Drop one entry, returning its value if it was cached"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+        }
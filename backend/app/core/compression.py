@@ -0,0 +1,118 @@
+"""
+Transparent compression for large text and JSON columns
+"""
+
+import json
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import settings
+from app.core.treecodec import LazyTree, encode_tree
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for CONTENT_COMPRESSION=zstd
+    zstandard = None
+
+# Header byte in front of every stored value. These bytes can never start
+# UTF-8 text, so values written before compression existed (no header) are
+# still recognized and read as-is: columns can be migrated row by row.
+FORMAT_RAW = 0xF5
+FORMAT_ZLIB = 0xF6
+FORMAT_ZSTD = 0xF7
+CODECS = {"none": FORMAT_RAW, "zlib": FORMAT_ZLIB, "zstd": FORMAT_ZSTD}
+
+def _zstd():
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the zstandard package")
+    return zstandard
+
+def compress(data: bytes, codec: Optional[str] = None, threshold: Optional[int] = None) -> bytes:
+    """Prefix ``data`` with a header byte, compressing it when above the threshold"""
+    codec = codec or settings.CONTENT_COMPRESSION
+    threshold = settings.CONTENT_COMPRESSION_THRESHOLD if threshold is None else threshold
+    if CODECS[codec] == FORMAT_RAW or len(data) < threshold:
+        return bytes([FORMAT_RAW]) + data
+    if codec == "zstd":
+        packed = _zstd().ZstdCompressor(level=settings.CONTENT_COMPRESSION_LEVEL).compress(data)
+    else:
+        packed = zlib.compress(data, settings.CONTENT_COMPRESSION_LEVEL)
+    if len(packed) >= len(data):
+        return bytes([FORMAT_RAW]) + data
+    return bytes([CODECS[codec]]) + packed
+
+def decompress(value: Any) -> bytes:
+    """Inverse of compress; values without a header are returned unchanged"""
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    value = bytes(value)
+    if not value:
+        return value
+    header = value[0]
+    if header == FORMAT_RAW:
+        return value[1:]
+    if header == FORMAT_ZLIB:
+        return zlib.decompress(value[1:])
+    if header == FORMAT_ZSTD:
+        return _zstd().ZstdDecompressor().decompress(value[1:])
+    return value
+
+class StreamDecompressor:
+    """Incremental decompress for a value read in slices (see stream_text)"""
+
+    def __init__(self):
+        self._decompress = None
+        self._started = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        if not self._started:
+            self._started = True
+            header = chunk[:1]
+            if header == bytes([FORMAT_RAW]):
+                chunk = chunk[1:]
+            elif header == bytes([FORMAT_ZLIB]):
+                self._decompress = zlib.decompressobj().decompress
+                chunk = chunk[1:]
+            elif header == bytes([FORMAT_ZSTD]):
+                self._decompress = _zstd().ZstdDecompressor().decompressobj().decompress
+                chunk = chunk[1:]
+        return self._decompress(chunk) if self._decompress else chunk
+
+class CompressedBinary(TypeDecorator):
+    """Binary column holding UTF-8 payloads, compressed above a size threshold"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[bytes], dialect) -> Optional[bytes]:
+        return compress(value) if value is not None else None
+
+    def process_result_value(self, value: Any, dialect) -> Optional[bytes]:
+        return decompress(value) if value is not None else None
+
+class CompressedJSON(TypeDecorator):
+    """JSON column stored as compressed bytes, read back as a LazyTree
+
+    New values are written as JSON text or, with TREE_ENCODING=binary, in
+    the compact tree encoding; both are read back.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        if isinstance(value, LazyTree) and value.payload is not None:
+            return compress(value.payload)
+        if isinstance(value, LazyTree):
+            value = value.value
+        if settings.TREE_ENCODING == "binary":
+            return compress(encode_tree(value))
+        return compress(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        return LazyTree.load(decompress(value)) if value is not None else None
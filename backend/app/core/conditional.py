@@ -0,0 +1,86 @@
+"""
+HTTP validators: ETags, Last-Modified, preconditions and 304 responses
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the values that identify a representation"""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+def static_etag(value: Any) -> str:
+    """ETag of a JSON-serializable constant, computed once when the module loads"""
+    return make_etag(hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()[:32])
+
+def entity_tags(header: str) -> List[str]:
+    """The entity tags (or ``*``) listed in an If-Match / If-None-Match header"""
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = False) -> bool:
+    """Whether an If-Match / If-None-Match header names ``etag``
+
+    If-Match uses the strong comparison, where W/ tags never match;
+    If-None-Match uses the weak one (``weak=True``).
+    """
+    if not header:
+        return False
+    for tag in entity_tags(header):
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            if weak and tag[2:] == etag:
+                return True
+        elif tag == etag:
+            return True
+    return False
+
+def require_if_match(if_match: Optional[str], etag: str):
+    """Raise 412 when an If-Match header is sent and does not name ``etag``"""
+    if if_match is not None and not etag_matches(if_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has changed (If-Match does not match the current ETag)"
+        )
+
+def _utc(value: datetime) -> datetime:
+    """Aware UTC; naive values are UTC already (datetime.utcnow, SQLite)"""
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def validator_headers(
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "no-cache"
+) -> Dict[str, str]:
+    """ETag, Last-Modified and a Cache-Control that makes clients revalidate"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified).replace(microsecond=0), usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Whether a GET can be answered with 304 (RFC 9110 section 13.2.2)
+
+    If-None-Match takes precedence; If-Modified-Since is only looked at
+    without it, to the second.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag, weak=True)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """Empty 304 carrying the validators the full response would have had"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
@@ -12,10 +12,63 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./dragndrop.db"
     
+    # Connection pool (per engine, per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1  # seconds, -1 disables recycling
+    
+    # SQLite production profile (WAL, tuned pragmas, single writer with group commit)
+    SQLITE_PRODUCTION_PROFILE: bool = False
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_WRITE_BATCH_SIZE: int = 64  # max queued writes per transaction
+    SQLITE_WRITE_BATCH_WINDOW_MS: float = 2.0  # wait for more writes before committing
+    
+    # Column compression for blobs and JSON trees (none, zlib or zstd; zstd needs zstandard)
+    CONTENT_COMPRESSION: str = "zlib"
+    CONTENT_COMPRESSION_LEVEL: int = 6
+    CONTENT_COMPRESSION_THRESHOLD: int = 512  # bytes; smaller values are stored raw
+    TREE_ENCODING: str = "json"  # json or binary (interned keys, smaller, slower to decode)
+    
+    # Version history (delta chains with a full keyframe every N versions)
+    VERSION_KEYFRAME_INTERVAL: int = 20
+    VERSION_REENCODE_INTERVAL_SECONDS: float = 300.0  # background re-encode period, 0 disables
+    VERSION_REENCODE_BATCH_SIZE: int = 10  # projects re-encoded per run
+    BLOB_GC_GRACE_SECONDS: int = 3600  # unreferenced blobs younger than this are kept
+    VERSION_DIFF_CACHE_SIZE: int = 256  # version diffs kept in memory per process
+    VERSION_DIFF_WORKERS: int = 2  # threads for diffs and delta encoding, 0 runs them on the event loop
+    VERSION_DIFF_MAX_PENDING: int = 32  # queued + running diffs before requests get 503
+    
+    # Version retention, e.g. "24h:all,30d:1h,*:1d" (every version for a day,
+    # hourly for 30 days, then daily); empty keeps everything. Projects can override it.
+    VERSION_RETENTION_POLICY: str = ""
+    VERSION_RETENTION_INTERVAL_SECONDS: float = 3600.0  # background thinning period, 0 disables
+    VERSION_RETENTION_BATCH_SIZE: int = 20  # projects checked per transaction (at most one is thinned)
+    VERSION_RETENTION_MAX_DELETES: int = 200  # versions dropped per project per transaction
+    VERSION_RETENTION_RECHECK_SECONDS: int = 3600  # a checked project is skipped this long
+    VERSION_RETENTION_DRY_RUN: bool = False  # only count what would be dropped
+    
+    # Autosave write-behind buffer
+    AUTOSAVE_FLUSH_INTERVAL_SECONDS: float = 10.0  # longest a buffered save waits, 0 writes through
+    AUTOSAVE_IDLE_SECONDS: float = 2.0  # a project quiet this long is written early
+    AUTOSAVE_MAX_FAILURES: int = 3  # failed writes before a project's buffered saves are dropped
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 1024  # authenticated users kept in memory per process
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0  # longest a cached user is trusted
+    AUTH_TOKEN_CACHE_SIZE: int = 4096  # verified tokens kept in memory per process
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # login sessions end this long after the login
+    AUTH_SESSION_SYNC_SECONDS: float = 30.0  # how often revoked sessions are loaded from the database
+    API_KEY_USAGE_FLUSH_SECONDS: float = 60.0  # how often API key last-used times are written
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt threads, 0 hashes on the event loop
+    PASSWORD_HASH_MAX_PENDING: int = 64  # queued + running hashes before logins get 503
+    ADMIN_USERNAMES: List[str] = []
     
     # CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -39,6 +92,7 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+        extra = "ignore"  # .env also carries server settings (HOST, PORT)
 
 # Global settings instance
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Binary delta encoding for version history
+"""
+
+import re
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+from app.core.diff import opcodes
+
+FORMAT_VERSION = 1
+OP_COPY = 0
+OP_INSERT = 1
+
+# Token boundaries: lines, plus tag/rule/statement ends so minified markup still diffs finely
+TOKEN = re.compile(rb"[^\n>};]*[\n>};]|[^\n>};]+")
+
+def _write_varint(out: bytearray, value: int):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+def _tokens(data: bytes) -> List[bytes]:
+    return TOKEN.findall(data)
+
+def _common_length(matches, limit: int) -> int:
+    """Largest n <= limit with matches(n), by binary search over C-level slice compares"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if matches(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def diff_ops(base: bytes, target: bytes) -> List[Tuple[int, int, int]]:
+    """Copy/insert operations turning ``base`` into ``target``
+
+    Each op is ``(OP_COPY, base_offset, length)`` or ``(OP_INSERT, target_offset, length)``.
+    Common prefix and suffix are matched byte-wise first, so the token diff
+    only runs over the edited region.
+    """
+    limit = min(len(base), len(target))
+    prefix = _common_length(lambda n: base[:n] == target[:n], limit)
+    suffix = _common_length(
+        lambda n: base[len(base) - n:] == target[len(target) - n:], limit - prefix
+    )
+
+    ops = []
+    if prefix:
+        ops.append((OP_COPY, 0, prefix))
+
+    base_mid = base[prefix:len(base) - suffix]
+    target_mid = target[prefix:len(target) - suffix]
+    if base_mid and target_mid:
+        base_tokens, target_tokens = _tokens(base_mid), _tokens(target_mid)
+        base_offsets = [0]
+        for token in base_tokens:
+            base_offsets.append(base_offsets[-1] + len(token))
+        target_offsets = [0]
+        for token in target_tokens:
+            target_offsets.append(target_offsets[-1] + len(token))
+        for tag, i1, i2, j1, j2 in opcodes(base_tokens, target_tokens):
+            if tag == "equal":
+                ops.append((OP_COPY, prefix + base_offsets[i1], base_offsets[i2] - base_offsets[i1]))
+            elif j2 > j1:
+                ops.append((OP_INSERT, prefix + target_offsets[j1], target_offsets[j2] - target_offsets[j1]))
+    elif target_mid:
+        ops.append((OP_INSERT, prefix, len(target_mid)))
+
+    if suffix:
+        ops.append((OP_COPY, len(base) - suffix, suffix))
+    return _merge(ops)
+
+def _merge(ops: Sequence[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    merged = []
+    for op in ops:
+        if merged and merged[-1][0] == op[0] and merged[-1][1] + merged[-1][2] == op[1]:
+            kind, start, length = merged[-1]
+            merged[-1] = (kind, start, length + op[2])
+        else:
+            merged.append(op)
+    return merged
+
+def encode_delta(base: bytes, target: bytes) -> bytes:
+    """Encode ``target`` as a compressed delta against ``base``"""
+    out = bytearray()
+    _write_varint(out, len(target))
+    for kind, start, length in diff_ops(base, target):
+        out.append(kind)
+        if kind == OP_COPY:
+            _write_varint(out, start)
+            _write_varint(out, length)
+        else:
+            _write_varint(out, length)
+            out += target[start:start + length]
+    return bytes([FORMAT_VERSION]) + zlib.compress(bytes(out), 6)
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild the target bytes from ``base`` and a delta made by encode_delta"""
+    if delta[0] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported delta format {delta[0]}")
+    data = zlib.decompress(delta[1:])
+    size, pos = _read_varint(data, 0)
+    out = bytearray()
+    while pos < len(data):
+        kind = data[pos]
+        pos += 1
+        if kind == OP_COPY:
+            start, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            out += base[start:start + length]
+        elif kind == OP_INSERT:
+            length, pos = _read_varint(data, pos)
+            out += data[pos:pos + length]
+            pos += length
+        else:
+            raise ValueError(f"Corrupt delta (op {kind})")
+    if len(out) != size:
+        raise ValueError("Corrupt delta (size mismatch)")
+    return bytes(out)
+
+# A version delta bundles one field delta per content field
+FIELD_NONE = 0
+FIELD_SAME = 1
+FIELD_DELTA = 2
+
+def encode_fields(base: Sequence[Optional[bytes]], target: Sequence[Optional[bytes]]) -> bytes:
+    """Encode several fields at once (None and unchanged fields cost one byte)"""
+    out = bytearray()
+    for old, new in zip(base, target):
+        if new is None:
+            out.append(FIELD_NONE)
+        elif new == old:
+            out.append(FIELD_SAME)
+        else:
+            delta = encode_delta(old or b"", new)
+            out.append(FIELD_DELTA)
+            _write_varint(out, len(delta))
+            out += delta
+    return bytes(out)
+
+def apply_fields(base: Sequence[Optional[bytes]], delta: bytes) -> List[Optional[bytes]]:
+    """Rebuild every field from ``base`` and a bundle made by encode_fields"""
+    fields, pos = [], 0
+    for old in base:
+        kind = delta[pos]
+        pos += 1
+        if kind == FIELD_NONE:
+            fields.append(None)
+        elif kind == FIELD_SAME:
+            fields.append(old)
+        else:
+            length, pos = _read_varint(delta, pos)
+            fields.append(apply_delta(old or b"", delta[pos:pos + length]))
+            pos += length
+    return fields
@@ -0,0 +1,205 @@
+"""
+Sequence diffing (Myers O(ND) algorithm, linear space)
+"""
+
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+# (tag, a_start, a_end, b_start, b_end), the shape of difflib's get_opcodes()
+Opcode = Tuple[str, int, int, int, int]
+
+MAX_EDITS = 4000  # give up on a finer diff beyond this many edits
+DIFF_COST_PER_ITEM = 100  # diagonal steps allowed per compared item (bounds time on large inputs)
+MIN_DIFF_COST = 1_000_000  # ... but never fewer than this
+
+def matching_blocks(
+    a: Sequence[Hashable],
+    b: Sequence[Hashable],
+    max_edits: int = MAX_EDITS
+) -> List[Tuple[int, int, int]]:
+    """Longest common subsequence of ``a`` and ``b`` as (a_start, b_start, length) runs
+
+    Uses Myers' algorithm in its linear-space form (middle snakes, divide
+    and conquer), so time is O((N + M) * D) for D edits and memory O(N + M).
+    A region that differs by more than ``max_edits``, or whose search would
+    exceed a work budget proportional to the input size, is reported as one
+    changed region.
+    """
+    n, m = len(a), len(b)
+    start = 0
+    while start < n and start < m and a[start] == b[start]:
+        start += 1
+    end_a, end_b = n, m
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+
+    blocks = []
+    if start:
+        blocks.append((0, 0, start))
+    blocks.extend(_middle_blocks(a, b, start, end_a, start, end_b, max_edits))
+    if end_a < n:
+        blocks.append((end_a, end_b, n - end_a))
+    return _join(blocks)
+
+def _middle_blocks(a, b, a0: int, a1: int, b0: int, b1: int, max_edits: int) -> List[Tuple[int, int, int]]:
+    budget = [max(MIN_DIFF_COST, DIFF_COST_PER_ITEM * ((a1 - a0) + (b1 - b0)))]
+    # One pair of diagonal vectors serves every region: no search goes past
+    # the first region's length or the edit limit
+    reach = min((a1 - a0 + b1 - b0 + 1) // 2, max_edits // 2 + 1) + 2
+    vectors = [0] * (2 * reach + 1), [0] * (2 * reach + 1)
+    blocks = []
+    regions = [(a0, a1, b0, b1)]
+    while regions:
+        a0, a1, b0, b1 = regions.pop()
+        # Each region's own common prefix and suffix first: what is left
+        # starts and ends with an edit, so splitting it always makes progress
+        run = 0
+        while a0 + run < a1 and b0 + run < b1 and a[a0 + run] == b[b0 + run]:
+            run += 1
+        if run:
+            blocks.append((a0, b0, run))
+            a0, b0 = a0 + run, b0 + run
+        run = 0
+        while a1 - run > a0 and b1 - run > b0 and a[a1 - run - 1] == b[b1 - run - 1]:
+            run += 1
+        if run:
+            blocks.append((a1 - run, b1 - run, run))
+            a1, b1 = a1 - run, b1 - run
+        if a0 == a1 or b0 == b1:
+            continue
+        snake = _middle_snake(a, b, a0, a1, b0, b1, max_edits, budget, vectors)
+        if snake is None:
+            # Too costly to resolve: left as one changed region
+            continue
+        x0, y0, x1, y1 = snake
+        if x1 > x0:
+            blocks.append((x0, y0, x1 - x0))
+        regions.append((x1, a1, y1, b1))
+        regions.append((a0, x0, b0, y0))
+    blocks.sort()
+    return blocks
+
+def _middle_snake(a, b, a0: int, a1: int, b0: int, b1: int, max_edits: int, budget: List[int], vectors):
+    """The snake in the middle of a shortest edit path, as absolute (x0, y0, x1, y1)
+
+    Searches forward from the start and backward from the end at once
+    (Myers 1986, section 4b), keeping only the furthest point per diagonal.
+    None once the region needs more than ``max_edits`` edits or the shared
+    ``budget`` of diagonal steps runs out. ``vectors`` may hold values from
+    earlier regions: every read other than the seed is of a diagonal this
+    search has already written.
+    """
+    n, m = a1 - a0, b1 - b0
+    delta = n - m
+    odd = delta & 1
+    forward, backward = vectors
+    offset = len(forward) // 2
+    forward[offset + 1] = backward[offset + 1] = 0
+    for d in range((n + m + 1) // 2 + 1):
+        budget[0] -= 2 * d + 2
+        if 2 * d - 1 > max_edits or budget[0] < 0:
+            return None
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            # Diagonal k meets the backward search's diagonal delta - k
+            if odd and -d < delta - k < d and x + backward[offset + delta - k] >= n:
+                return a0 + start_x, b0 + start_y, a0 + x, b0 + y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a1 - 1 - x] == b[b1 - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return a1 - x, b1 - y, a1 - start_x, b1 - start_y
+    return None
+
+def _join(blocks: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    joined = []
+    for i, j, size in blocks:
+        if not size:
+            continue
+        if joined and joined[-1][0] + joined[-1][2] == i and joined[-1][1] + joined[-1][2] == j:
+            joined[-1] = (joined[-1][0], joined[-1][1], joined[-1][2] + size)
+        else:
+            joined.append((i, j, size))
+    return joined
+
+def opcodes(a: Sequence[Hashable], b: Sequence[Hashable], max_edits: int = MAX_EDITS) -> List[Opcode]:
+    """Edit script turning ``a`` into ``b``, as difflib-style opcodes"""
+    result = []
+    i = j = 0
+    for block_a, block_b, size in matching_blocks(a, b, max_edits) + [(len(a), len(b), 0)]:
+        if i < block_a and j < block_b:
+            result.append(("replace", i, block_a, j, block_b))
+        elif i < block_a:
+            result.append(("delete", i, block_a, j, j))
+        elif j < block_b:
+            result.append(("insert", i, i, j, block_b))
+        if size:
+            result.append(("equal", block_a, block_a + size, block_b, block_b + size))
+        i, j = block_a + size, block_b + size
+    return result
+
+def line_hunks(a: Sequence[str], b: Sequence[str], context: int = 3) -> List[Dict[str, Any]]:
+    """Unified-diff hunks turning lines ``a`` into ``b``
+
+    Each hunk has 1-based ``old_start``/``new_start``, the line counts it
+    spans on each side, and its lines prefixed with " ", "-" or "+".
+    """
+    codes = opcodes(a, b)
+    if all(tag == "equal" for tag, *_ in codes):
+        return []
+
+    # Keep ``context`` unchanged lines around each change, splitting hunks
+    # on longer unchanged runs (the grouping of difflib's get_grouped_opcodes)
+    tag, i1, i2, j1, j2 = codes[0]
+    if tag == "equal":
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    tag, i1, i2, j1, j2 = codes[-1]
+    if tag == "equal":
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    groups: List[List[Opcode]] = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            groups.append(group)
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    groups.append(group)
+
+    hunks = []
+    for group in groups:
+        if all(tag == "equal" for tag, *_ in group):
+            continue
+        lines = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend(" " + line for line in a[i1:i2])
+                continue
+            lines.extend("-" + line for line in a[i1:i2])
+            lines.extend("+" + line for line in b[j1:j2])
+        hunks.append({
+            "old_start": group[0][1] + 1,
+            "old_lines": group[-1][2] - group[0][1],
+            "new_start": group[0][3] + 1,
+            "new_lines": group[-1][4] - group[0][3],
+            "lines": lines,
+        })
+    return hunks
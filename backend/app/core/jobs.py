@@ -0,0 +1,67 @@
+"""
+Periodic background jobs
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import metrics
+from app.database import AsyncSessionLocal, run_write
+
+logger = logging.getLogger(__name__)
+
+JobWork = Callable[[AsyncSession], Awaitable[int]]
+
+class PeriodicJob:
+    """Runs a unit of database work every ``interval`` seconds
+
+    The work receives a session, returns how many items it processed and is
+    committed through run_write, so it shares the single writer when the
+    SQLite profile is on. A run that processed anything is followed
+    immediately by another one, until the backlog is drained.
+    """
+
+    def __init__(self, name: str, work: JobWork, interval: float):
+        self.name = name
+        self.work = work
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the job on the running event loop (a non-positive interval disables it)"""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the job, waiting for a run in progress to be abandoned"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> int:
+        """Run the work once in its own session"""
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            processed = await run_write(db, self.work)
+        metrics.observe(f"jobs.{self.name}", time.perf_counter() - started)
+        metrics.increment(f"jobs.{self.name}.processed", processed)
+        return processed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                while await self.run_once():
+                    pass
+            except Exception:
+                metrics.increment(f"jobs.{self.name}.failures")
+                logger.exception("Background job %s failed", self.name)
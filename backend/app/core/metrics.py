@@ -0,0 +1,76 @@
+"""
+In-process metrics registry
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+class Timing:
+    """Running summary of observed durations"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+class MetricsRegistry:
+    """Thread-safe counters, timings and live collectors shared by the app"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Timing] = defaultdict(Timing)
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        """Add to a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        """Record a duration"""
+        with self._lock:
+            self._timings[name].observe(seconds)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]):
+        """Register a callable sampled on every snapshot (for live gauges)"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current value of every metric"""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {name: timing.as_dict() for name, timing in self._timings.items()}
+            collectors = dict(self._collectors)
+        return {
+            "counters": counters,
+            "timings": timings,
+            "gauges": {name: collector() for name, collector in collectors.items()},
+        }
+
+    def reset(self):
+        """Clear counters and timings (collectors stay registered)"""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+# Global metrics instance
+metrics = MetricsRegistry()
@@ -0,0 +1,94 @@
+"""
+Bounded thread pools for CPU-heavy work that must not run on the event loop
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+class ExecutorBusy(RuntimeError):
+    """Raised instead of queueing when an executor already has max_pending calls"""
+
+class BoundedExecutor:
+    """Runs blocking calls on ``workers`` threads, at most ``max_pending`` at a time
+
+    Calls beyond the workers wait in the pool's queue, so a burst is served
+    in turn while the event loop keeps running; once ``max_pending`` calls
+    are queued or running, further ones fail fast with ExecutorBusy.
+    ``workers <= 0`` runs calls inline on the caller's thread.
+
+    Queue wait and run time are recorded as ``executor.{name}.wait`` and
+    ``.run`` timings, rejected calls as ``.rejected``, and the pending and
+    running counts as a gauge.
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        metrics.register_collector(f"executor.{name}", self.stats)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._pool
+
+    def _call(self, queued_at: float, fn: Callable[..., T], *args: Any) -> T:
+        started = time.perf_counter()
+        metrics.observe(f"executor.{self.name}.wait", started - queued_at)
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+            metrics.observe(f"executor.{self.name}.run", time.perf_counter() - started)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` on the pool and await its result"""
+        if self.workers <= 0:
+            return self._call(time.perf_counter(), fn, *args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                rejected = True
+            else:
+                rejected = False
+                self._pending += 1
+        if rejected:
+            metrics.increment(f"executor.{self.name}.rejected")
+            raise ExecutorBusy(f"{self.name} executor has {self.max_pending} calls pending")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), self._call, time.perf_counter(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self):
+        """Stop the worker threads (a later call starts new ones)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Live gauges: configured bounds and current load"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "running": self._running,
+            "queued": max(self._pending - self._running, 0),
+        }
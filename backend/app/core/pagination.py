@@ -0,0 +1,100 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+NEXT = "next"
+PREV = "prev"
+
+def encode_cursor(direction: str, *key: Any) -> str:
+    """Encode a sort key and direction into an opaque cursor"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps({"d": direction, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[str, List[Any]]:
+    """Decode a cursor into its direction and sort key, converted to ``types``"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values = data["d"], data["k"]
+        if direction not in (NEXT, PREV) or len(values) != len(types):
+            raise ValueError(cursor)
+        key = [
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, values)
+        ]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return direction, key
+
+def set_page_headers(
+    request: Request,
+    response: Response,
+    next_cursor: Optional[str],
+    prev_cursor: Optional[str]
+):
+    """Expose page cursors as X-Next-Cursor / X-Prev-Cursor and a Link header"""
+    links = []
+    for rel, cursor, header in (("next", next_cursor, "X-Next-Cursor"), ("prev", prev_cursor, "X-Prev-Cursor")):
+        if cursor:
+            response.headers[header] = cursor
+            url = request.url.remove_query_params("skip").include_query_params(cursor=cursor)
+            links.append(f'<{url}>; rel="{rel}"')
+    if links:
+        response.headers["Link"] = ", ".join(links)
+
+async def keyset_page(
+    db: AsyncSession,
+    query: Select,
+    columns: Sequence[Any],
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str], Optional[str]]:
+    """Page through ``query`` in descending order of ``columns`` (a unique key)
+
+    Returns the page with its next and previous cursors. ``skip`` is only
+    honoured when no cursor is given (legacy offset pagination).
+    """
+    sort_key = tuple_(*columns) if len(columns) > 1 else columns[0]
+    direction = NEXT
+    if cursor:
+        direction, key = decode_cursor(cursor, *(column.type.python_type for column in columns))
+        bound = tuple_(*key) if len(columns) > 1 else key[0]
+        query = query.where(sort_key < bound if direction == NEXT else sort_key > bound)
+    elif skip:
+        query = query.offset(skip)
+    
+    if direction == NEXT:
+        query = query.order_by(*(column.desc() for column in columns))
+    else:
+        query = query.order_by(*(column.asc() for column in columns))
+    
+    result = await db.execute(query.limit(limit + 1))
+    rows = list(result.scalars().all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREV:
+        rows.reverse()
+    
+    if not rows:
+        return rows, None, None
+    first, last = rows[0], rows[-1]
+    has_next = has_more if direction == NEXT else True
+    has_prev = bool(cursor or skip) if direction == NEXT else has_more
+    next_cursor = encode_cursor(NEXT, *(getattr(last, column.key) for column in columns)) if has_next else None
+    prev_cursor = encode_cursor(PREV, *(getattr(first, column.key) for column in columns)) if has_prev else None
+    return rows, next_cursor, prev_cursor
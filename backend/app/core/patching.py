@@ -0,0 +1,148 @@
+"""
+Incremental edits: JSON Patch (RFC 6902) for trees, offset deltas for text
+"""
+
+import copy
+from typing import Any, Dict, List, Sequence, Tuple
+
+class PatchError(ValueError):
+    """A patch that does not apply to the document it was sent for"""
+
+def _tokens(pointer: str) -> List[str]:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens"""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON Pointer {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+def _array_index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index {index} out of range")
+    return index
+
+def _resolve(document: Any, tokens: Sequence[str]) -> Any:
+    for token in tokens:
+        if isinstance(document, dict):
+            if token not in document:
+                raise PatchError(f"Path member {token!r} not found")
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_array_index(document, token)]
+        else:
+            raise PatchError(f"Cannot descend into {type(document).__name__} at {token!r}")
+    return document
+
+def _parent(document: Any, pointer: str) -> Tuple[Any, str]:
+    tokens = _tokens(pointer)
+    if not tokens:
+        raise PatchError("The whole document has no parent")
+    return _resolve(document, tokens[:-1]), tokens[-1]
+
+def _add(document: Any, pointer: str, value: Any) -> Any:
+    if pointer == "":
+        return value
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, token, allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add to {type(parent).__name__}")
+    return document
+
+def _remove(document: Any, pointer: str) -> Tuple[Any, Any]:
+    if pointer == "":
+        return None, document
+    parent, token = _parent(document, pointer)
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchError(f"Path member {token!r} not found")
+        return document, parent.pop(token)
+    if isinstance(parent, list):
+        return document, parent.pop(_array_index(parent, token))
+    raise PatchError(f"Cannot remove from {type(parent).__name__}")
+
+def apply_json_patch(document: Any, operations: Sequence[Dict[str, Any]]) -> Any:
+    """Apply RFC 6902 operations, returning the patched document
+
+    Operations apply in order; the first one that fails (including a failed
+    ``test``) raises PatchError. Containers are edited in place, so pass a
+    freshly loaded document and discard it when the patch fails.
+    """
+    for operation in operations:
+        op, path = operation.get("op"), operation.get("path")
+        if not isinstance(path, str):
+            raise PatchError("Every operation needs a string path")
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"{op!r} needs a value")
+        if op in ("move", "copy") and not isinstance(operation.get("from"), str):
+            raise PatchError(f"{op!r} needs a from pointer")
+
+        if op == "add":
+            document = _add(document, path, operation["value"])
+        elif op == "remove":
+            document, _ = _remove(document, path)
+        elif op == "replace":
+            _resolve(document, _tokens(path))
+            document, _ = _remove(document, path)
+            document = _add(document, path, operation["value"])
+        elif op == "move":
+            source = operation["from"]
+            if path.startswith(source + "/"):
+                raise PatchError("Cannot move a value into one of its children")
+            document, value = _remove(document, source)
+            document = _add(document, path, value)
+        elif op == "copy":
+            value = copy.deepcopy(_resolve(document, _tokens(operation["from"])))
+            document = _add(document, path, value)
+        elif op == "test":
+            if _resolve(document, _tokens(path)) != operation["value"]:
+                raise PatchError(f"Test failed at {path!r}")
+        else:
+            raise PatchError(f"Unknown operation {op!r}")
+    return document
+
+def apply_text_edits(text: str, edits: Sequence[Dict[str, Any]]) -> str:
+    """Apply offset edits to ``text``
+
+    Each edit deletes ``delete`` characters at ``offset`` and inserts
+    ``insert`` there. Offsets and lengths count UTF-16 code units of the
+    original text, like JavaScript string indices (a character outside the
+    BMP, such as an emoji, counts as two), and edits must be in ascending,
+    non-overlapping order. An edit boundary inside a surrogate pair is
+    rejected.
+    """
+    if text.isascii():
+        units, length = None, len(text)
+    else:
+        units = text.encode("utf-16-le")
+        length = len(units) // 2
+
+    def cut(start: int, end: int) -> str:
+        if units is None:
+            return text[start:end]
+        for offset in (start, end):
+            if 0 < offset < length and 0xDC00 <= int.from_bytes(units[2 * offset:2 * offset + 2], "little") <= 0xDFFF:
+                raise PatchError(f"Text edit offset {offset} falls inside a surrogate pair")
+        return units[2 * start:2 * end].decode("utf-16-le")
+
+    parts = []
+    position = 0
+    for edit in edits:
+        offset, delete = edit.get("offset", 0), edit.get("delete", 0)
+        if offset < position:
+            raise PatchError("Text edits must be sorted and must not overlap")
+        if offset + delete > length:
+            raise PatchError(f"Text edit at {offset} runs past the end ({length} UTF-16 code units)")
+        parts.append(cut(position, offset))
+        cut(offset, offset + delete)
+        parts.append(edit.get("insert", ""))
+        position = offset + delete
+    parts.append(cut(position, length))
+    return "".join(parts)
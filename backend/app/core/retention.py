@@ -0,0 +1,211 @@
+"""
+Version retention: thin old history down to a configurable spacing
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.versions import drop_versions
+from app.models.project import Project, ProjectVersion
+
+# Durations in policies: a number and a unit, e.g. 90s, 15m, 24h, 30d, 8w
+_DURATION = re.compile(r"^(\d+)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+class RetentionRule(NamedTuple):
+    """One tier of a policy: versions younger than ``max_age`` are kept ``spacing`` apart
+
+    ``max_age`` is None for the catch-all tier; ``spacing`` is None to keep
+    every version and 0 to keep none.
+    """
+
+    max_age: Optional[float]
+    spacing: Optional[float]
+
+def _seconds(value: str) -> float:
+    match = _DURATION.match(value)
+    if not match:
+        raise ValueError(f"Invalid duration {value!r} (expected e.g. 90s, 15m, 24h, 30d, 8w)")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+def parse_policy(policy: str) -> List[RetentionRule]:
+    """Parse ``"24h:all,30d:1h,*:1d"`` into rules, youngest tier first
+
+    Each tier is ``age:spacing``; ``*`` as the age matches any older version,
+    ``all`` and ``none`` as the spacing keep every version or none of them.
+    Versions older than every tier are dropped, and an empty policy keeps
+    everything.
+    """
+    rules: List[RetentionRule] = []
+    for tier in filter(None, (part.strip() for part in policy.split(","))):
+        age, separator, spacing = tier.partition(":")
+        if not separator:
+            raise ValueError(f"Invalid retention tier {tier!r} (expected age:spacing)")
+        if rules and rules[-1].max_age is None:
+            raise ValueError("The catch-all tier (*) must come last")
+        max_age = None if age.strip() == "*" else _seconds(age.strip())
+        if max_age is not None and rules and max_age <= rules[-1].max_age:
+            raise ValueError("Retention tiers must be listed from youngest to oldest")
+        spacing = spacing.strip()
+        rules.append(RetentionRule(max_age, None if spacing == "all" else 0 if spacing == "none" else _seconds(spacing)))
+    return rules
+
+def _utc(value: datetime) -> datetime:
+    """Naive UTC, the form datetime.utcnow() and SQLite timestamps share"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def plan_retention(
+    versions: Sequence[Tuple[int, datetime]],
+    rules: Sequence[RetentionRule],
+    now: datetime
+) -> List[int]:
+    """Version numbers a policy drops, oldest first
+
+    Buckets are aligned to the epoch rather than to ``now``, and the newest
+    version of each bucket is the one kept, so a version kept on one run is
+    not dropped on the next until it ages into a sparser tier. The latest
+    version is always kept.
+    """
+    if not rules or not versions:
+        return []
+    ordered = sorted(versions, reverse=True)
+    seen = set()
+    dropped = []
+    for number, created_at in ordered[1:]:
+        created_at = _utc(created_at)
+        age = (now - created_at).total_seconds()
+        tier = next((index for index, rule in enumerate(rules) if rule.max_age is None or age < rule.max_age), None)
+        if tier is None or rules[tier].spacing == 0:
+            dropped.append(number)
+            continue
+        spacing = rules[tier].spacing
+        if spacing is None:
+            continue
+        bucket = (tier, int(created_at.replace(tzinfo=timezone.utc).timestamp() // spacing))
+        if bucket in seen:
+            dropped.append(number)
+        else:
+            seen.add(bucket)
+    dropped.reverse()
+    return dropped
+
+def project_rules(project: Project) -> List[RetentionRule]:
+    """The project's own policy, or VERSION_RETENTION_POLICY when it has none"""
+    policy = project.retention_policy
+    return parse_policy(settings.VERSION_RETENTION_POLICY if policy is None else policy)
+
+async def plan_project(db: AsyncSession, project: Project, now: datetime) -> Dict[str, Any]:
+    """What the policy would drop from one project's history"""
+    result = await db.execute(select(
+        ProjectVersion.version_number, ProjectVersion.created_at, ProjectVersion.stored_size
+    ).where(ProjectVersion.project_id == project.id))
+    rows = result.all()
+    dropped = plan_retention([(row.version_number, row.created_at) for row in rows], project_rules(project), now)
+    sizes = {row.version_number: row.stored_size or 0 for row in rows}
+    return {
+        "project_id": project.id,
+        "policy": settings.VERSION_RETENTION_POLICY if project.retention_policy is None else project.retention_policy,
+        "versions": len(rows),
+        "dropped": dropped,
+        "stored_bytes": sum(sizes[number] for number in dropped),
+    }
+
+async def _stored_bytes(db: AsyncSession, project_id: int) -> int:
+    result = await db.execute(select(func.coalesce(func.sum(ProjectVersion.stored_size), 0)).where(
+        ProjectVersion.project_id == project_id
+    ))
+    return result.scalar_one()
+
+async def thin_project(db: AsyncSession, project: Project, now: datetime) -> Tuple[int, int]:
+    """Drop up to VERSION_RETENTION_MAX_DELETES versions, returning (deleted, bytes reclaimed)
+
+    Only the delta chains holding dropped versions are re-encoded (see
+    drop_versions). A project with more to drop is left unmarked, so the
+    next run picks it up again.
+    """
+    plan = await plan_project(db, project, now)
+    dropped = plan["dropped"][:settings.VERSION_RETENTION_MAX_DELETES]
+    reclaimed = 0
+    if dropped:
+        before = await _stored_bytes(db, project.id)
+        await drop_versions(db, project.id, set(dropped))
+        reclaimed = before - await _stored_bytes(db, project.id)
+
+    values: Dict[str, Any] = {"version_count": Project.version_count - len(dropped)}
+    if len(dropped) == len(plan["dropped"]):
+        values["retention_checked_at"] = now
+    # Thinning history is not an edit: keep updated_at (and listing order) as is
+    await db.execute(update(Project).where(Project.id == project.id).values(
+        **values, updated_at=Project.updated_at
+    ))
+    return len(dropped), reclaimed
+
+def retention_candidates(now: datetime, limit: int):
+    """Projects with history under a non-empty policy, least recently checked first"""
+    recheck = now - timedelta(seconds=settings.VERSION_RETENTION_RECHECK_SECONDS)
+    has_policy = Project.retention_policy != ""
+    if settings.VERSION_RETENTION_POLICY:
+        has_policy = or_(Project.retention_policy.is_(None), has_policy)
+    return select(Project).where(
+        Project.version_count > 1,
+        has_policy,
+        or_(Project.retention_checked_at.is_(None), Project.retention_checked_at < recheck)
+    ).order_by(Project.retention_checked_at.nulls_first(), Project.id).limit(limit)
+
+async def retention_batch(db: AsyncSession) -> int:
+    """Apply retention to one batch of projects, returning how many were checked
+
+    The batch stops after the first project that had versions dropped, so
+    each thinning commits on its own and the writer is never held for
+    several; projects with nothing to drop are only marked checked. With
+    VERSION_RETENTION_DRY_RUN on, projects are only planned: the would-be
+    deletions are counted in metrics and nothing is removed.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(retention_candidates(now, settings.VERSION_RETENTION_BATCH_SIZE))
+    projects = result.scalars().all()
+    checked = 0
+    for project in projects:
+        checked += 1
+        if settings.VERSION_RETENTION_DRY_RUN:
+            plan = await plan_project(db, project, now)
+            metrics.increment("versions.retention.would_delete", len(plan["dropped"]))
+            metrics.increment("versions.retention.would_reclaim_bytes", plan["stored_bytes"])
+            await db.execute(update(Project).where(Project.id == project.id).values(
+                retention_checked_at=now, updated_at=Project.updated_at
+            ))
+            continue
+        deleted, reclaimed = await thin_project(db, project, now)
+        metrics.increment("versions.retention.deleted", deleted)
+        metrics.increment("versions.retention.bytes_reclaimed", reclaimed)
+        if deleted:
+            break
+    metrics.increment("versions.retention.projects", checked)
+    return checked
+
+async def retention_report(db: AsyncSession, project_id: Optional[int] = None, limit: int = 100) -> Dict[str, Any]:
+    """Dry run: what the policies would drop now, without changing anything"""
+    now = datetime.utcnow()
+    query = select(Project).where(Project.version_count > 1).order_by(Project.id).limit(limit)
+    if project_id is not None:
+        query = query.where(Project.id == project_id)
+    result = await db.execute(query)
+    plans = [await plan_project(db, project, now) for project in result.scalars().all()]
+    counters = metrics.snapshot()["counters"]
+    return {
+        "default_policy": settings.VERSION_RETENTION_POLICY,
+        "dry_run": settings.VERSION_RETENTION_DRY_RUN,
+        "versions": sum(len(plan["dropped"]) for plan in plans),
+        "stored_bytes": sum(plan["stored_bytes"] for plan in plans),
+        "projects": [plan for plan in plans if plan["dropped"]],
+        "reclaimed": {
+            "versions": counters.get("versions.retention.deleted", 0),
+            "bytes": counters.get("versions.retention.bytes_reclaimed", 0),
+        },
+    }
@@ -0,0 +1,148 @@
+"""
+Login sessions: rotating refresh tokens and the revoked-session set
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.session import UserSession
+
+SESSION_PURGE_BATCH_SIZE = 500  # expired sessions deleted per transaction
+
+class RevocationSet:
+    """Ids of revoked sessions, whose access tokens are refused (O(1) per request)
+
+    An id only needs to stay until every access token issued under it has
+    expired, so ``retention`` is the access token lifetime and the set holds
+    just the sessions revoked within it.
+    """
+
+    def __init__(self, retention: float):
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._revoked: Dict[int, float] = {}
+
+    def __contains__(self, session_id: Any) -> bool:
+        return session_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, session_ids: Iterable[int]):
+        """Refuse the access tokens of these sessions (for at least ``retention`` seconds)"""
+        now = time.time()
+        with self._lock:
+            for session_id in session_ids:
+                self._revoked.setdefault(session_id, now)
+
+    def prune(self):
+        """Forget sessions revoked longer ago than any of their tokens can live"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for session_id in [key for key, added in self._revoked.items() if added < cutoff]:
+                del self._revoked[session_id]
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+
+revoked_sessions = RevocationSet(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+metrics.register_collector("auth.sessions", lambda: {"revoked": len(revoked_sessions)})
+
+def secret_hash(secret: str) -> str:
+    """SHA-256 of a refresh token secret (the secret itself is never stored)"""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+def parse_refresh_token(token: str) -> Optional[Tuple[int, str]]:
+    """Split ``<session id>.<secret>``"""
+    session_id, _, secret = token.partition(".")
+    if not session_id.isdigit() or not secret:
+        return None
+    return int(session_id), secret
+
+async def open_session(db: AsyncSession, user_id: int) -> Tuple[UserSession, str]:
+    """Start a session for a login, returning it and its first refresh token"""
+    secret = secrets.token_urlsafe(32)
+    session = UserSession(
+        user_id=user_id,
+        refresh_hash=secret_hash(secret),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    db.add(session)
+    await db.flush()
+    return session, f"{session.id}.{secret}"
+
+async def rotate_session(db: AsyncSession, refresh_token: str) -> Optional[Tuple[UserSession, str]]:
+    """Swap a live session's refresh token for a new one
+
+    Returns None for an unknown, expired or revoked session. A token that
+    was already rotated out means it leaked: the whole session is revoked.
+    """
+    parsed = parse_refresh_token(refresh_token)
+    if parsed is None:
+        return None
+    session_id, secret = parsed
+
+    result = await db.execute(select(UserSession).where(
+        UserSession.id == session_id,
+        UserSession.revoked_at.is_(None),
+        UserSession.expires_at > datetime.utcnow()
+    ))
+    session = result.scalars().first()
+    if session is None:
+        return None
+
+    presented = secret_hash(secret)
+    if not hmac.compare_digest(session.refresh_hash, presented):
+        metrics.increment("auth.sessions.reused")
+        await revoke_sessions(db, UserSession.id == session_id)
+        return None
+
+    # Compare-and-set, so two refreshes with the same token cannot both win
+    new_secret = secrets.token_urlsafe(32)
+    result = await db.execute(update(UserSession).where(
+        UserSession.id == session_id,
+        UserSession.refresh_hash == presented
+    ).values(refresh_hash=secret_hash(new_secret), last_used_at=datetime.utcnow()).returning(UserSession.id))
+    if result.first() is None:
+        return None
+    return session, f"{session_id}.{new_secret}"
+
+async def revoke_sessions(db: AsyncSession, *criteria) -> List[int]:
+    """Revoke the live sessions matching ``criteria``; their access tokens stop working at once"""
+    result = await db.execute(update(UserSession).where(
+        *criteria,
+        UserSession.revoked_at.is_(None)
+    ).values(revoked_at=datetime.utcnow()).returning(UserSession.id))
+    session_ids = list(result.scalars())
+    revoked_sessions.add(session_ids)
+    metrics.increment("auth.sessions.revoked", len(session_ids))
+    return session_ids
+
+async def sync_revocations(db: AsyncSession) -> int:
+    """Background job: load sessions revoked by other workers, purge expired ones
+
+    Returns how many expired sessions were deleted. A session is only
+    deleted once access tokens issued under it have expired too.
+    """
+    now = datetime.utcnow()
+    retention = timedelta(seconds=revoked_sessions.retention)
+    revoked_sessions.prune()
+    result = await db.execute(select(UserSession.id).where(UserSession.revoked_at >= now - retention))
+    revoked_sessions.add(result.scalars())
+
+    expired = select(UserSession.id).where(
+        UserSession.expires_at < now - retention
+    ).limit(SESSION_PURGE_BATCH_SIZE)
+    result = await db.execute(delete(UserSession).where(UserSession.id.in_(expired)))
+    return result.rowcount or 0
@@ -0,0 +1,275 @@
+"""
+Compact binary encoding for element trees and canvas settings
+"""
+
+import json
+import struct
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Encoded values start with MAGIC, which can begin neither UTF-8 nor JSON
+# text, so binary and JSON-text rows can live in the same column.
+MAGIC = 0xC1
+FORMAT_VERSION = 1
+
+# Type tags (MessagePack layout: small values carry their size in the tag)
+NIL = 0xC0
+FALSE = 0xC2
+TRUE = 0xC3
+FLOAT = 0xCB
+INT = 0xD3  # zigzag varint, any size
+STR = 0xD9  # varint length
+ARRAY = 0xDC  # varint count
+MAP = 0xDE  # varint count
+FIXMAP = 0x80  # 0x80-0x8F: map of up to 15 pairs
+FIXARRAY = 0x90  # 0x90-0x9F: array of up to 15 items
+FIXSTR = 0xA0  # 0xA0-0xBF: string of up to 31 bytes
+NEGATIVE_FIXINT = 0xE0  # 0xE0-0xFF: -32..-1; 0x00-0x7F are 0..127
+
+_pack_float = struct.Struct(">d").pack
+_unpack_float = struct.Struct(">d").unpack_from
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+class _Encoder:
+    def __init__(self):
+        self.keys: Dict[str, int] = {}
+        self.out = bytearray()
+
+    def key(self, key: str):
+        index = self.keys.get(key)
+        if index is None:
+            index = self.keys[key] = len(self.keys)
+        if index < 0x80:
+            self.out.append(index)
+        else:
+            self.out += _varint(index)
+
+    def value(self, value: Any):
+        out = self.out
+        if value is None:
+            out.append(NIL)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, str):
+            data = value.encode("utf-8")
+            if len(data) < 32:
+                out.append(FIXSTR | len(data))
+            else:
+                out.append(STR)
+                out += _varint(len(data))
+            out += data
+        elif isinstance(value, int):
+            if 0 <= value < 0x80:
+                out.append(value)
+            elif -32 <= value < 0:
+                out.append(value & 0xFF)
+            else:
+                out.append(INT)
+                out += _varint(value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            out.append(FLOAT)
+            out += _pack_float(value)
+        elif isinstance(value, Mapping):
+            if len(value) < 16:
+                out.append(FIXMAP | len(value))
+            else:
+                out.append(MAP)
+                out += _varint(len(value))
+            for key, item in value.items():
+                if not isinstance(key, str):
+                    raise TypeError(f"Tree keys must be strings, not {type(key).__name__}")
+                self.key(key)
+                self.value(item)
+        elif isinstance(value, (list, tuple)):
+            if len(value) < 16:
+                out.append(FIXARRAY | len(value))
+            else:
+                out.append(ARRAY)
+                out += _varint(len(value))
+            for item in value:
+                self.value(item)
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} in a tree")
+
+def encode_tree(value: Any) -> bytes:
+    """Encode a JSON-compatible value, interning every map key once"""
+    encoder = _Encoder()
+    encoder.value(value)
+    header = bytearray([MAGIC, FORMAT_VERSION])
+    header += _varint(len(encoder.keys))
+    for key in encoder.keys:
+        data = key.encode("utf-8")
+        header += _varint(len(data))
+        header += data
+    return bytes(header + encoder.out)
+
+def decode_tree(data: bytes) -> Any:
+    """Inverse of encode_tree"""
+    if data[0] != MAGIC or data[1] != FORMAT_VERSION:
+        raise ValueError("Not an encoded tree")
+
+    count, pos = _read_varint(data, 2)
+    keys: List[str] = []
+    for _ in range(count):
+        length, pos = _read_varint(data, pos)
+        keys.append(data[pos:pos + length].decode("utf-8"))
+        pos += length
+
+    # Closures over ``data`` keep the hot path free of attribute lookups
+    decode_str = bytes.decode
+
+    def varint(pos: int) -> Tuple[int, int]:
+        return _read_varint(data, pos)
+
+    def value(pos: int) -> Tuple[Any, int]:
+        # Ordered by how common each tag is in element trees
+        tag = data[pos]
+        pos += 1
+        if 0xA0 <= tag < 0xC0:
+            end = pos + (tag & 0x1F)
+            return decode_str(data[pos:end]), end
+        if 0x80 <= tag < 0x90:
+            result = {}
+            for _ in range(tag & 0x0F):
+                index = data[pos]
+                if index < 0x80:
+                    pos += 1
+                else:
+                    index, pos = varint(pos)
+                result[keys[index]], pos = value(pos)
+            return result, pos
+        if tag < 0x80:
+            return tag, pos
+        if 0x90 <= tag < 0xA0:
+            result = []
+            append = result.append
+            for _ in range(tag & 0x0F):
+                item, pos = value(pos)
+                append(item)
+            return result, pos
+        if tag == NIL:
+            return None, pos
+        if tag == FALSE:
+            return False, pos
+        if tag == TRUE:
+            return True, pos
+        if tag >= NEGATIVE_FIXINT:
+            return tag - 0x100, pos
+        if tag == STR:
+            size, pos = varint(pos)
+            return decode_str(data[pos:pos + size]), pos + size
+        if tag == MAP:
+            size, pos = varint(pos)
+            result = {}
+            for _ in range(size):
+                index, pos = varint(pos)
+                result[keys[index]], pos = value(pos)
+            return result, pos
+        if tag == ARRAY:
+            size, pos = varint(pos)
+            result = []
+            append = result.append
+            for _ in range(size):
+                item, pos = value(pos)
+                append(item)
+            return result, pos
+        if tag == FLOAT:
+            return _unpack_float(data, pos)[0], pos + 8
+        if tag == INT:
+            raw, pos = varint(pos)
+            return (raw >> 1) if not raw & 1 else -((raw + 1) >> 1), pos
+        raise ValueError(f"Corrupt tree (tag {tag:#x})")
+
+    result, _ = value(pos)
+    return result
+
+def is_encoded_tree(payload: bytes) -> bool:
+    return payload[:1] == bytes([MAGIC])
+
+def _is_map(payload: bytes) -> bool:
+    """Whether a binary or JSON-text payload holds an object at its root"""
+    if not is_encoded_tree(payload):
+        return payload.lstrip()[:1] == b"{"
+    count, pos = _read_varint(payload, 2)
+    for _ in range(count):
+        length, pos = _read_varint(payload, pos)
+        pos += length
+    return 0x80 <= payload[pos] < 0x90 or payload[pos] == MAP
+
+def decode_payload(payload: bytes) -> Any:
+    """Decode either encoding: binary trees or JSON text"""
+    return decode_tree(payload) if is_encoded_tree(payload) else json.loads(payload)
+
+class LazyTree(Mapping):
+    """Read-only mapping over a stored tree, decoded on first access
+
+    Copying an untouched LazyTree into another row reuses its stored
+    payload, so duplicating a project never parses its tree.
+    """
+
+    __slots__ = ("_payload", "_value")
+
+    def __init__(self, payload: bytes):
+        self._payload: Optional[bytes] = payload
+        self._value: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def load(cls, payload: bytes) -> Any:
+        """Wrap object payloads lazily; other JSON values are decoded right away"""
+        return cls(payload) if _is_map(payload) else decode_payload(payload)
+
+    @property
+    def payload(self) -> Optional[bytes]:
+        """The stored encoding, while the tree has not been decoded"""
+        return self._payload
+
+    @property
+    def value(self) -> Dict[str, Any]:
+        """The decoded tree (a plain dict)"""
+        if self._payload is not None:
+            self._value = decode_payload(self._payload)
+            self._payload = None
+        return self._value
+
+    def __getitem__(self, key: str) -> Any:
+        return self.value[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.value)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __repr__(self) -> str:
+        if self._payload is not None:
+            return f"<LazyTree({len(self._payload)} bytes, not decoded)>"
+        return f"LazyTree({self._value!r})"
+
+def materialize(value: Any) -> Any:
+    """Plain value of a possibly lazy tree, for serializers that need a dict"""
+    return value.value if isinstance(value, LazyTree) else value
+
+def json_default(value: Any) -> Any:
+    """``default=`` hook letting json.dumps serialize lazy trees"""
+    if isinstance(value, LazyTree):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,106 @@
+"""
+Keyed structural diff of element trees (server counterpart of src/editor/diffEngine.js)
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.core.diff import matching_blocks
+
+# Change types, as in DiffEngine.changeTypes
+ADD = "add"
+REMOVE = "remove"
+UPDATE = "update"
+MOVE = "move"
+
+_MISSING = object()
+
+class _Node(NamedTuple):
+    node: Any
+    parent: Optional[str]
+    index: int
+    children: List[str]
+
+def _props(node: Any) -> Dict[str, Any]:
+    """Everything that is not structure: the node's attributes, or a bare value"""
+    if isinstance(node, dict):
+        return {key: value for key, value in node.items() if key not in ("id", "children")}
+    return {"value": node}
+
+def _index(tree: Any) -> Dict[str, _Node]:
+    """Every node of a tree by key, in document order
+
+    Nodes are keyed by their ``id``, like DiffEngine.nodesEqual; nodes
+    without one (or repeating an id already seen) get a positional key under
+    their parent, which makes them compare as updates in place.
+    """
+    nodes: Dict[str, _Node] = {}
+    if tree is None:
+        return nodes
+    stack = [(tree, None, 0)]
+    while stack:
+        node, parent, index = stack.pop()
+        node_id = node.get("id") if isinstance(node, dict) else None
+        key = str(node_id) if node_id is not None else None
+        if key is None or key in nodes:
+            key = f"{parent or ''}/{index}"
+        siblings = nodes[parent].children if parent is not None else None
+        if siblings is not None:
+            siblings.append(key)
+        children = node.get("children") if isinstance(node, dict) else None
+        nodes[key] = _Node(node, parent, index, [])
+        if isinstance(children, list):
+            stack.extend((child, key, i) for i, child in reversed(list(enumerate(children))))
+    return nodes
+
+def diff_trees(old: Any, new: Any) -> List[Dict[str, Any]]:
+    """Changes turning tree ``old`` into ``new``
+
+    Removals and additions are reported for the top-most node only (an
+    added node carries its whole subtree); nodes found under another parent,
+    or out of order among their siblings, are moves; attribute changes are
+    updates, with removed attributes set to None. Sibling order is compared
+    with the Myers LCS, so the work stays close to linear in the tree size.
+    """
+    before, after = _index(old), _index(new)
+    changes: List[Dict[str, Any]] = []
+
+    for key, entry in before.items():
+        if key not in after and (entry.parent is None or entry.parent in after):
+            changes.append({"type": REMOVE, "id": key, "parent": entry.parent, "index": entry.index})
+
+    for key, entry in after.items():
+        previous = before.get(key)
+        if previous is None:
+            if entry.parent is None or entry.parent in before:
+                changes.append({
+                    "type": ADD, "id": key, "parent": entry.parent, "index": entry.index, "element": entry.node,
+                })
+            continue
+
+        if previous.parent != entry.parent:
+            changes.append({
+                "type": MOVE, "id": key, "parent": entry.parent, "index": entry.index,
+                "from_parent": previous.parent, "from_index": previous.index,
+            })
+        old_props, new_props = _props(previous.node), _props(entry.node)
+        if old_props != new_props:
+            changes.append({"type": UPDATE, "id": key, "changes": {
+                name: new_props.get(name)
+                for name in {**old_props, **new_props}
+                if old_props.get(name, _MISSING) != new_props.get(name, _MISSING)
+            }})
+
+        # Children kept under this node but reordered: those off the LCS moved
+        old_order = [child for child in previous.children if child in after and after[child].parent == key]
+        new_order = [child for child in entry.children if child in before and before[child].parent == key]
+        if old_order != new_order:
+            in_place = set()
+            for _, start, size in matching_blocks(old_order, new_order):
+                in_place.update(new_order[start:start + size])
+            for child in new_order:
+                if child not in in_place:
+                    changes.append({
+                        "type": MOVE, "id": child, "parent": key, "index": after[child].index,
+                        "from_parent": key, "from_index": before[child].index,
+                    })
+    return changes
@@ -0,0 +1,404 @@
+"""
+Delta-encoded project version history
+"""
+
+import hashlib
+import json
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Collection, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, case, delete, func, literal, null, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.core.blobs import get_texts, json_hash, put_blob
+from app.core.cache import LRUCache
+from app.core.compression import CompressedJSON
+from app.core.config import settings
+from app.core.delta import apply_fields, encode_fields
+from app.core.diff import line_hunks
+from app.core.metrics import metrics
+from app.core.offload import BoundedExecutor, ExecutorBusy
+from app.core.treecodec import json_default
+from app.core.treediff import diff_trees
+from app.models.blob import ContentBlob
+from app.models.project import CONTENT_FIELDS, Project, ProjectVersion
+
+# Columns behind ProjectVersionResponse, all a history listing needs to load
+VERSION_METADATA = (
+    ProjectVersion.id,
+    ProjectVersion.project_id,
+    ProjectVersion.version_number,
+    ProjectVersion.description,
+    ProjectVersion.created_at,
+)
+
+# Diffing and delta encoding are CPU-bound and grow with the content
+diff_executor = BoundedExecutor("diffs", settings.VERSION_DIFF_WORKERS, settings.VERSION_DIFF_MAX_PENDING)
+
+async def run_diff_work(fn, *args):
+    """Run a diff or delta encoding off the event loop; 503 when too many are queued"""
+    try:
+        return await diff_executor.run(fn, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many version diffs in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+# Version content as bytes: html, css, js, then the serialized elements tree
+Fields = List[Optional[bytes]]
+
+def pack_fields(content: Dict[str, Any]) -> Fields:
+    """Serialize version content to the byte fields that get delta-encoded"""
+    fields = [
+        content.get(field).encode("utf-8") if content.get(field) is not None else None
+        for field in CONTENT_FIELDS
+    ]
+    tree = content.get("elements_tree")
+    # One JSON value per line, so tree edits diff as line edits
+    fields.append(json.dumps(tree, indent=0, separators=(",", ":"), default=json_default).encode("utf-8") if tree is not None else None)
+    return fields
+
+def unpack_fields(fields: Sequence[Optional[bytes]]) -> Dict[str, Any]:
+    """Inverse of pack_fields"""
+    content = {
+        field: data.decode("utf-8") if data is not None else None
+        for field, data in zip(CONTENT_FIELDS, fields)
+    }
+    content["elements_tree"] = json.loads(fields[-1]) if fields[-1] is not None else None
+    return content
+
+def fields_digest(fields: Sequence[Optional[bytes]]) -> str:
+    """SHA-256 over all fields, distinguishing None from empty"""
+    digest = hashlib.sha256()
+    for data in fields:
+        if data is None:
+            digest.update(b"\x00")
+        else:
+            digest.update(b"\x01" + len(data).to_bytes(8, "big"))
+            digest.update(data)
+    return digest.hexdigest()
+
+async def _keyframe_fields(db: AsyncSession, version: ProjectVersion) -> Fields:
+    columns = list(CONTENT_FIELDS.values())
+    texts = await get_texts(db, (getattr(version, column) for column in columns))
+    content = {field: texts.get(getattr(version, column)) for field, column in CONTENT_FIELDS.items()}
+    content["elements_tree"] = version.elements_tree
+    return pack_fields(content)
+
+async def load_chain(db: AsyncSession, version: ProjectVersion) -> List[ProjectVersion]:
+    """Versions needed to rebuild ``version``, from its keyframe up to itself"""
+    if version.is_keyframe:
+        return [version]
+    keyframe_number = select(func.max(ProjectVersion.version_number)).where(
+        ProjectVersion.project_id == version.project_id,
+        ProjectVersion.is_keyframe == True,
+        ProjectVersion.version_number < version.version_number
+    ).scalar_subquery()
+    result = await db.execute(select(ProjectVersion).where(
+        ProjectVersion.project_id == version.project_id,
+        ProjectVersion.version_number >= keyframe_number,
+        ProjectVersion.version_number <= version.version_number
+    ).options(undefer(ProjectVersion.delta)))
+    by_number = {row.version_number: row for row in result.scalars().all()}
+
+    chain = [by_number[version.version_number]]
+    while not chain[-1].is_keyframe:
+        base = by_number.get(chain[-1].base_version_number)
+        if base is None:
+            raise ValueError(f"Broken delta chain at version {chain[-1].version_number}")
+        chain.append(base)
+    chain.reverse()
+    return chain
+
+def _replay(fields: Fields, deltas: Sequence[bytes]) -> Fields:
+    for delta in deltas:
+        fields = apply_fields(fields, delta)
+    return fields
+
+async def reconstruct_fields(db: AsyncSession, version: ProjectVersion) -> Fields:
+    """Rebuild the byte fields of a version by applying its delta chain (on the diff executor)"""
+    started = time.perf_counter()
+    chain = await load_chain(db, version)
+    fields = await _keyframe_fields(db, chain[0])
+    if len(chain) > 1:
+        fields = await run_diff_work(_replay, fields, [link.delta for link in chain[1:]])
+    if version.content_hash and fields_digest(fields) != version.content_hash:
+        raise ValueError(f"Version {version.version_number} failed its content check")
+    metrics.observe("versions.reconstruct", time.perf_counter() - started)
+    metrics.increment("versions.deltas_applied", len(chain) - 1)
+    return fields
+
+async def load_version_content(db: AsyncSession, version: ProjectVersion) -> Dict[str, Any]:
+    """Materialize the content fields of a version"""
+    return unpack_fields(await reconstruct_fields(db, version))
+
+async def version_content_columns(db: AsyncSession, version: ProjectVersion) -> Dict[str, Any]:
+    """SQL expressions for a version's content columns, to copy into a project
+
+    Keyframe content is selected from the version row, so it is copied inside
+    the database (without a tree hash, which would need the tree). Delta
+    versions are rebuilt here (at most interval - 1 deltas) and their text
+    stored as blobs first.
+    """
+    columns = (*CONTENT_FIELDS.values(), "elements_tree")
+    if version.is_keyframe:
+        values = {
+            column: select(getattr(ProjectVersion, column)).where(ProjectVersion.id == version.id).scalar_subquery()
+            for column in columns
+        }
+        values["tree_hash"] = null()
+        return values
+    content = await load_version_content(db, version)
+    values = {
+        column: literal(await put_blob(db, content[field]), String(64))
+        for field, column in CONTENT_FIELDS.items()
+    }
+    tree = content["elements_tree"]
+    values["elements_tree"] = literal(tree, CompressedJSON()) if tree is not None else null()
+    values["tree_hash"] = literal(json_hash(tree), String(64))
+    return values
+
+async def encode_version(
+    db: AsyncSession,
+    version: ProjectVersion,
+    fields: Fields,
+    previous: Optional[ProjectVersion] = None,
+    previous_fields: Optional[Fields] = None
+):
+    """Store ``fields`` on ``version``, as a delta against ``previous`` or as a keyframe
+
+    A keyframe is written when there is no previous version or the chain
+    would reach VERSION_KEYFRAME_INTERVAL, which bounds reconstruction to
+    that many delta applications. Deltas are computed on the diff executor.
+    """
+    version.content_hash = fields_digest(fields)
+    version.content_size = sum(len(data) for data in fields if data is not None)
+
+    if previous is None or previous.chain_depth + 1 >= settings.VERSION_KEYFRAME_INTERVAL:
+        content = unpack_fields(fields)
+        for field, column in CONTENT_FIELDS.items():
+            setattr(version, column, await put_blob(db, content[field]))
+        version.elements_tree = content["elements_tree"]
+        version.is_keyframe = True
+        version.chain_depth = 0
+        version.base_version_number = None
+        version.delta = None
+        version.stored_size = version.content_size
+        return
+
+    if previous_fields is None:
+        previous_fields = await reconstruct_fields(db, previous)
+    version.delta = await run_diff_work(encode_fields, previous_fields, fields)
+    for column in CONTENT_FIELDS.values():
+        setattr(version, column, None)
+    version.elements_tree = None
+    version.is_keyframe = False
+    version.chain_depth = previous.chain_depth + 1
+    version.base_version_number = previous.version_number
+    version.stored_size = len(version.delta)
+
+# Diffs by the pair of content hashes they were computed from
+diff_cache = LRUCache("versions.diff", settings.VERSION_DIFF_CACHE_SIZE)
+
+def _text_diff(old: Optional[str], new: Optional[str]) -> Dict[str, Any]:
+    hunks = line_hunks((old or "").splitlines(), (new or "").splitlines())
+    lines = [line[0] for hunk in hunks for line in hunk["lines"]]
+    return {"added": lines.count("+"), "removed": lines.count("-"), "hunks": hunks}
+
+def _diff_fields(old_fields: Fields, new_fields: Fields) -> Dict[str, Any]:
+    before, after = unpack_fields(old_fields), unpack_fields(new_fields)
+    result = {field: _text_diff(before[field], after[field]) for field in CONTENT_FIELDS}
+    result["elements_tree"] = diff_trees(before["elements_tree"], after["elements_tree"])
+    result["identical"] = old_fields == new_fields
+    return result
+
+async def diff_versions(db: AsyncSession, old: ProjectVersion, new: ProjectVersion) -> Dict[str, Any]:
+    """Line diffs of the text fields and a keyed diff of the element tree
+
+    Results are cached by the hash of the two content digests, so a pair
+    is diffed once however often it is requested (and shared between
+    versions with the same content). Versions stored before content hashes
+    existed are rebuilt first to compute theirs. The diffing itself runs on
+    the diff executor.
+    """
+    key = None
+    if old.content_hash and new.content_hash:
+        key = hashlib.sha256(f"{old.content_hash}:{new.content_hash}".encode()).hexdigest()
+        cached = diff_cache.get(key)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    old_fields, new_fields = await reconstruct_fields(db, old), await reconstruct_fields(db, new)
+    if key is None:
+        key = hashlib.sha256(f"{fields_digest(old_fields)}:{fields_digest(new_fields)}".encode()).hexdigest()
+    result = await run_diff_work(_diff_fields, old_fields, new_fields)
+    diff_cache.put(key, result)
+    metrics.observe("versions.diff", time.perf_counter() - started)
+    return result
+
+def _is_encoded(version: ProjectVersion, previous: Optional[ProjectVersion]) -> bool:
+    """Whether a version already has the encoding encode_version would give it"""
+    if version.content_hash is None:
+        return False
+    if previous is None or previous.chain_depth + 1 >= settings.VERSION_KEYFRAME_INTERVAL:
+        return version.is_keyframe
+    return not version.is_keyframe and version.base_version_number == previous.version_number
+
+async def reencode_project(db: AsyncSession, project_id: int) -> int:
+    """Rewrite a project's history into keyframe + delta chains
+
+    Each version is rebuilt from its current encoding (its base is always an
+    earlier version, already rebuilt) before being re-encoded against its
+    predecessor. Returns the number of versions rewritten.
+    """
+    result = await db.execute(select(ProjectVersion).where(
+        ProjectVersion.project_id == project_id
+    ).order_by(ProjectVersion.version_number).options(undefer(ProjectVersion.delta)))
+
+    rebuilt: Dict[int, Fields] = {}
+    previous = None
+    rewritten = 0
+    for version in result.scalars().all():
+        if version.is_keyframe:
+            fields = await _keyframe_fields(db, version)
+        else:
+            fields = await run_diff_work(apply_fields, rebuilt[version.base_version_number], version.delta)
+        rebuilt[version.version_number] = fields
+
+        if _is_encoded(version, previous):
+            version.chain_depth = 0 if version.is_keyframe else previous.chain_depth + 1
+        else:
+            await encode_version(db, version, fields, previous, rebuilt.get(previous.version_number) if previous else None)
+            rewritten += 1
+        previous = version
+    await db.flush()
+    return rewritten
+
+async def drop_versions(db: AsyncSession, project_id: int, discard: Collection[int]) -> int:
+    """Delete the versions numbered in ``discard``, re-encoding only the chains they were in
+
+    A chain runs from a keyframe to the next one; chains without a dropped
+    version are not loaded. Within an affected chain, a survivor whose delta
+    base is dropped is re-encoded against the nearest earlier survivor (or
+    becomes the chain's keyframe), and the others keep their deltas. Returns
+    the number of versions rewritten.
+    """
+    if not discard:
+        return 0
+    result = await db.execute(select(ProjectVersion.version_number).where(
+        ProjectVersion.project_id == project_id,
+        ProjectVersion.is_keyframe == True
+    ).order_by(ProjectVersion.version_number))
+    keyframes = result.scalars().all()
+    spans = set()
+    for number in discard:
+        index = bisect_right(keyframes, number) - 1
+        if index >= 0:
+            spans.add((keyframes[index], keyframes[index + 1] if index + 1 < len(keyframes) else None))
+    if not spans:
+        return 0
+
+    result = await db.execute(select(ProjectVersion).where(
+        ProjectVersion.project_id == project_id,
+        or_(*(
+            and_(ProjectVersion.version_number >= start, ProjectVersion.version_number < end)
+            if end is not None else ProjectVersion.version_number >= start
+            for start, end in spans
+        ))
+    ).order_by(ProjectVersion.version_number).options(undefer(ProjectVersion.delta)))
+
+    rebuilt: Dict[int, Fields] = {}
+    survivors: Dict[int, ProjectVersion] = {}
+    previous = None
+    rewritten = 0
+    for version in result.scalars().all():
+        if version.is_keyframe:
+            fields = await _keyframe_fields(db, version)
+            previous = None
+        else:
+            fields = await run_diff_work(apply_fields, rebuilt[version.base_version_number], version.delta)
+        rebuilt[version.version_number] = fields
+        if version.version_number in discard:
+            await db.delete(version)
+            continue
+
+        if not version.is_keyframe:
+            base = survivors.get(version.base_version_number)
+            if base is not None:
+                version.chain_depth = base.chain_depth + 1
+            else:
+                await encode_version(db, version, fields, previous, rebuilt[previous.version_number] if previous else None)
+                rewritten += 1
+        survivors[version.version_number] = previous = version
+    await db.flush()
+    return rewritten
+
+def reencode_candidates(limit: int):
+    """Projects whose history has more keyframes than the interval calls for,
+    unencoded (legacy) versions, or chains longer than the interval"""
+    interval = settings.VERSION_KEYFRAME_INTERVAL
+    keyframes = func.sum(case((ProjectVersion.is_keyframe == True, 1), else_=0))
+    return select(ProjectVersion.project_id).group_by(ProjectVersion.project_id).having(or_(
+        keyframes > (func.count() + interval - 1) / interval,
+        func.max(ProjectVersion.chain_depth) >= interval,
+        func.count() > func.count(ProjectVersion.content_hash)
+    )).limit(limit)
+
+async def reencode_batch(db: AsyncSession) -> int:
+    """Re-encode one batch of projects, returning the number of versions rewritten"""
+    result = await db.execute(reencode_candidates(settings.VERSION_REENCODE_BATCH_SIZE))
+    rewritten = 0
+    for project_id in result.scalars().all():
+        rewritten += await reencode_project(db, project_id)
+    metrics.increment("versions.reencoded", rewritten)
+    return rewritten
+
+async def collect_garbage_blobs(db: AsyncSession) -> int:
+    """Delete blobs no project or version references any more
+
+    Blobs younger than BLOB_GC_GRACE_SECONDS are kept, so content written by
+    a transaction that has not committed its reference yet survives.
+    """
+    referenced = [
+        select(column).where(column.isnot(None))
+        for model in (Project, ProjectVersion)
+        for column in (getattr(model, name) for name in CONTENT_FIELDS.values())
+    ]
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.BLOB_GC_GRACE_SECONDS)
+    result = await db.execute(delete(ContentBlob).where(and_(
+        ContentBlob.created_at < cutoff,
+        ContentBlob.hash.notin_(referenced[0].union(*referenced[1:]))
+    )))
+    metrics.increment("blobs.collected", result.rowcount)
+    return result.rowcount
+
+async def storage_report(db: AsyncSession) -> Dict[str, Any]:
+    """Version storage totals, compression ratio and reconstruct latency"""
+    result = await db.execute(select(
+        func.count(),
+        func.sum(case((ProjectVersion.is_keyframe == True, 1), else_=0)),
+        func.coalesce(func.sum(ProjectVersion.content_size), 0),
+        func.coalesce(func.sum(ProjectVersion.stored_size), 0),
+        func.max(ProjectVersion.chain_depth),
+        func.count() - func.count(ProjectVersion.content_hash)
+    ))
+    versions, keyframes, logical, stored, max_depth, pending = result.one()
+    timings = metrics.snapshot()["timings"]
+    return {
+        "versions": versions,
+        "keyframes": keyframes or 0,
+        "pending_reencode": pending,
+        "keyframe_interval": settings.VERSION_KEYFRAME_INTERVAL,
+        "max_chain_depth": max_depth or 0,
+        "content_bytes": logical,
+        "stored_bytes": stored,
+        "compression_ratio": round(logical / stored, 2) if stored else None,
+        "reconstruct": timings.get("versions.reconstruct"),
+    }
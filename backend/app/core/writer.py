@@ -0,0 +1,119 @@
+"""
+Single-writer queue with group commit
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteWork = Callable[[AsyncSession], Awaitable[T]]
+
+class WriteQueue:
+    """Serializes writes through one connection and commits them in batches
+
+    Each queued unit of work runs inside its own SAVEPOINT, so a failing unit
+    is rolled back alone while the rest of the batch still commits together.
+    On SQLite the engine needs use_explicit_transactions, or every SAVEPOINT
+    release would commit by itself. A batch that fails outside its units
+    (opening the connection, BEGIN, a savepoint rollback) fails all of its
+    writes, and the writer goes on with the next batch.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, batch_size: int = 64, batch_window: float = 0.002):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Start the writer task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Flush queued writes and stop the writer task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, work: WriteWork) -> T:
+        """Queue a unit of work and wait until its batch has committed"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((work, future))
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._commit_batch(batch)
+            except Exception as error:
+                logger.exception("Write batch of %s units failed", len(batch))
+                metrics.increment("db.writer.failed_batches")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    async def _commit_batch(self, batch: List[Tuple[WriteWork, asyncio.Future]]):
+        started = time.perf_counter()
+        results = []
+        async with self.session_factory() as session:
+            for work, future in batch:
+                if future.cancelled():
+                    continue
+                try:
+                    async with session.begin_nested():
+                        result = await work(session)
+                except Exception as error:
+                    future.set_exception(error)
+                else:
+                    results.append((future, result))
+            try:
+                await session.commit()
+            except Exception as error:
+                for future, _ in results:
+                    if not future.done():
+                        future.set_exception(error)
+                metrics.increment("db.writer.failed_batches")
+                return
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+        metrics.increment("db.writer.batches")
+        metrics.increment("db.writer.writes", len(batch))
+        metrics.observe("db.writer.batch", time.perf_counter() - started)
@@ -2,27 +2,205 @@
 Database configuration and session management
 """
 
-from sqlalchemy import create_engine
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.writer import WriteQueue, WriteWork, T
+
+# Async drivers used by the API for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def get_async_url(url: str) -> str:
+    """Translate a sync database URL into its async driver equivalent"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.drivername != backend or backend not in ASYNC_DRIVERS:
+        # Already names an explicit driver (or an unknown backend)
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+class InstrumentedPoolMixin:
+    """Records how long callers wait for a pooled connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.increment(f"db.pool.{self.logging_name}.timeouts")
+            raise
+        finally:
+            metrics.observe(f"db.pool.{self.logging_name}.wait", time.perf_counter() - started)
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def is_memory_database(url: str) -> bool:
+    """Whether the URL points at an in-memory SQLite database (which cannot be pooled)"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+    )
+
+def get_pool_options(url: str, poolclass: type) -> Dict[str, Any]:
+    """Engine keyword arguments for the configured connection pool"""
+    if is_memory_database(url):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+def get_pool_status(bound_engine, max_overflow: Optional[int] = None) -> Dict[str, Any]:
+    """Live pool gauges for an engine, created with ``max_overflow`` (DB_MAX_OVERFLOW by default)"""
+    pool = bound_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "timeout": pool.timeout(),
+    }
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the SQLite production profile to every new connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def use_explicit_transactions(bound_engine):
+    """Make SQLAlchemy, not pysqlite, open SQLite transactions on this engine
+
+    pysqlite only begins a transaction before DML, so SAVEPOINTs run in
+    autocommit and each RELEASE commits on its own. Turning the driver's
+    handling off and emitting BEGIN ourselves (the documented workaround)
+    gives the writer one real transaction per batch. IMMEDIATE takes the
+    write lock up front instead of upgrading to it mid-batch.
+    """
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
 
-# Database engine
+    event.listen(bound_engine, "connect", disable_driver_transactions)
+    event.listen(bound_engine, "begin", begin)
+
+is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+connect_args = {"check_same_thread": False} if is_sqlite else {}
+sqlite_profile = (
+    is_sqlite
+    and settings.SQLITE_PRODUCTION_PROFILE
+    and not is_memory_database(settings.DATABASE_URL)
+)
+
+# Database engine (sync, for scripts and migrations)
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args=connect_args,
+    pool_logging_name="sync",
+    **get_pool_options(settings.DATABASE_URL, InstrumentedQueuePool)
 )
 
-# Session factory
+# Async database engine (used by the API)
+async_engine = create_async_engine(
+    get_async_url(settings.DATABASE_URL),
+    connect_args=connect_args,
+    pool_logging_name="async",
+    **get_pool_options(settings.DATABASE_URL, InstrumentedAsyncQueuePool)
+)
+
+# Dedicated writer engine: one connection that all queued writes go through
+WRITER_MAX_OVERFLOW = 0
+writer_engine = None
+if sqlite_profile:
+    writer_engine = create_async_engine(
+        get_async_url(settings.DATABASE_URL),
+        connect_args=connect_args,
+        pool_logging_name="writer",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=WRITER_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    for bound_engine in (engine, async_engine.sync_engine, writer_engine.sync_engine):
+        event.listen(bound_engine, "connect", set_sqlite_pragmas)
+    use_explicit_transactions(writer_engine.sync_engine)
+
+metrics.register_collector("db.pool.sync", lambda: get_pool_status(engine))
+metrics.register_collector("db.pool.async", lambda: get_pool_status(async_engine.sync_engine))
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+write_queue: Optional[WriteQueue] = None
+if writer_engine is not None:
+    write_queue = WriteQueue(
+        async_sessionmaker(bind=writer_engine, autoflush=False, expire_on_commit=False),
+        batch_size=settings.SQLITE_WRITE_BATCH_SIZE,
+        batch_window=settings.SQLITE_WRITE_BATCH_WINDOW_MS / 1000,
+    )
+    metrics.register_collector("db.pool.writer", lambda: get_pool_status(writer_engine.sync_engine, WRITER_MAX_OVERFLOW))
+    metrics.register_collector("db.writer", lambda: {"queue_depth": write_queue.depth})
 
 # Base class for models
 Base = declarative_base()
 
-def get_db() -> Session:
-    """Dependency to get database session"""
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_write(db: AsyncSession, work: WriteWork) -> T:
+    """Run a unit of write work and commit it
+
+    With the SQLite production profile the work is queued to the single
+    writer and committed together with other pending writes; otherwise it
+    runs on the request session.
+    """
+    if write_queue is not None:
+        return await write_queue.submit(work)
+    result = await work(db)
+    await db.commit()
+    return result
+
+def get_sync_db() -> Iterator[Session]:
+    """Get a blocking database session (scripts only, never inside request handlers)"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
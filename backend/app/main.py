@@ -12,22 +12,57 @@ from typing import List, Optional
 import os
 from dotenv import load_dotenv
 
-from app.database import engine, Base
-from app.routers import projects, templates, components, auth, users
+from app.database import async_engine, writer_engine, write_queue, Base
+from app.routers import projects, templates, components, auth, users, admin
+from app.core.autosave import autosave_buffer
 from app.core.config import settings
+from app.core.jobs import PeriodicJob
+from app.core.api_keys import flush_key_usage
+from app.core.retention import retention_batch
+from app.core.sessions import sync_revocations
+from app.core.versions import collect_garbage_blobs, reencode_batch
 
 # Load environment variables
 load_dotenv()
 
+# Revoked sessions from other workers, and purging of expired ones
+session_sync = PeriodicJob("auth.sessions", sync_revocations, settings.AUTH_SESSION_SYNC_SECONDS)
+# Batched API key last-used times
+key_usage_flush = PeriodicJob("api_keys.usage", flush_key_usage, settings.API_KEY_USAGE_FLUSH_SECONDS)
+
+# Background maintenance: thin and re-encode version history, then drop the blobs it freed
+background_jobs = [
+    PeriodicJob("versions.retention", retention_batch, settings.VERSION_RETENTION_INTERVAL_SECONDS),
+    PeriodicJob("versions.reencode", reencode_batch, settings.VERSION_REENCODE_INTERVAL_SECONDS),
+    PeriodicJob("blobs.gc", collect_garbage_blobs, settings.VERSION_REENCODE_INTERVAL_SECONDS),
+    session_sync,
+    key_usage_flush,
+]
+
 # Database initialization
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    if write_queue is not None:
+        write_queue.start()
+    autosave_buffer.start()
+    # Sessions revoked while this worker was down must be refused from the first request
+    await session_sync.run_once()
+    for job in background_jobs:
+        job.start()
     yield
-    # Shutdown
-    pass
+    # Shutdown (buffered autosaves and key usage are written before the writer stops)
+    await autosave_buffer.stop()
+    for job in background_jobs:
+        await job.stop()
+    await key_usage_flush.run_once()
+    if write_queue is not None:
+        await write_queue.stop()
+        await writer_engine.dispose()
+    await async_engine.dispose()
 
 # FastAPI app instance
 app = FastAPI(
@@ -57,6 +92,7 @@ app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
 app.include_router(projects.router, prefix="/api/v1/projects", tags=["projects"])
 app.include_router(templates.router, prefix="/api/v1/templates", tags=["templates"])
 app.include_router(components.router, prefix="/api/v1/components", tags=["components"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
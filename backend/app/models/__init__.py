@@ -4,5 +4,8 @@ Database models package
 
 from .user import User
 from .project import Project, ProjectVersion
+from .blob import ContentBlob
+from .session import UserSession
+from .api_key import ApiKey
 
-__all__ = ["User", "Project", "ProjectVersion"]
\ No newline at end of file
+__all__ = ["User", "Project", "ProjectVersion", "ContentBlob", "UserSession", "ApiKey"]
\ No newline at end of file
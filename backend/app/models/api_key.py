@@ -0,0 +1,38 @@
+"""
+API key database models
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ApiKey(Base):
+    """A long-lived credential for scripts, limited to ``scopes``
+
+    The key is ``dnd_<prefix>_<secret>``: the prefix is stored in the clear
+    (unique, so a key is found with one index lookup) and the secret only as
+    an HMAC-SHA256 keyed with the server's SECRET_KEY.
+    """
+    
+    __tablename__ = "api_keys"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(100), nullable=False)
+    prefix = Column(String(16), nullable=False)
+    key_hash = Column(String(64), nullable=False)
+    scopes = Column(JSON, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_api_keys_prefix", "prefix", unique=True),
+        # Listing a user's keys
+        Index("ix_api_keys_user", "user_id"),
+    )
+    
+    def __repr__(self):
+        return f"<ApiKey(id={self.id}, prefix='{self.prefix}')>"
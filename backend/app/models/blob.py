@@ -0,0 +1,36 @@
+"""
+Content blob database models
+"""
+
+import hashlib
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.compression import CompressedBinary
+from app.database import Base
+
+class ContentBlob(Base):
+    """Content-addressed storage for project HTML/CSS/JS
+
+    Rows are immutable and keyed by the SHA-256 of their UTF-8 text, so
+    identical content is stored once however many projects and versions
+    reference it.
+    """
+    
+    __tablename__ = "content_blobs"
+    
+    hash = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)  # bytes, uncompressed
+    data = Column(CompressedBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    @classmethod
+    def from_text(cls, text: str) -> "ContentBlob":
+        data = text.encode("utf-8")
+        return cls(hash=hashlib.sha256(data).hexdigest(), size=len(data), data=data)
+    
+    def __repr__(self):
+        return f"<ContentBlob(hash='{self.hash[:12]}', size={self.size})>"
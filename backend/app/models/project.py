@@ -2,11 +2,26 @@
 Project database models
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Index, LargeBinary
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
+from app.core.compression import CompressedJSON
 from app.database import Base
 
+# API content field -> blob hash column
+CONTENT_FIELDS = {
+    "html_content": "html_hash",
+    "css_content": "css_hash",
+    "js_content": "js_hash",
+}
+
+# API JSON field -> hash column of its canonical serialization
+HASHED_FIELDS = {
+    "elements_tree": "tree_hash",
+    "canvas_settings": "canvas_hash",
+}
+
 class Project(Base):
     """Project model for storing HTML editor projects"""
     
@@ -16,14 +31,20 @@ class Project(Base):
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
     
-    # Project content
-    html_content = Column(Text, nullable=True)
-    css_content = Column(Text, nullable=True)
-    js_content = Column(Text, nullable=True)
+    # Project content, stored in content_blobs and referenced by hash
+    html_hash = Column(String(64), nullable=True)
+    css_hash = Column(String(64), nullable=True)
+    js_hash = Column(String(64), nullable=True)
+    
+    # Project structure (JSON, deferred: list queries only need metadata,
+    # load with undefer_group("content") when the content is needed)
+    elements_tree = deferred(Column(CompressedJSON, nullable=True), group="content", raiseload=True)
+    canvas_settings = deferred(Column(CompressedJSON, nullable=True), group="content", raiseload=True)
     
-    # Project structure (JSON)
-    elements_tree = Column(JSON, nullable=True)
-    canvas_settings = Column(JSON, nullable=True)
+    # Digests of the JSON above, so a save can tell it is unchanged without
+    # loading it (NULL when not known, e.g. after a restore)
+    tree_hash = Column(String(64), nullable=True)
+    canvas_hash = Column(String(64), nullable=True)
     
     # Metadata
     template_id = Column(String(100), nullable=True)
@@ -35,14 +56,41 @@ class Project(Base):
     is_template = Column(Boolean, default=False)
     status = Column(String(50), default="draft")  # draft, published, archived
     
+    # Bumped by every write to the project; incremental updates name the revision they apply to
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    # Version history counters, bumped in the snapshot transaction
+    latest_version_number = Column(Integer, nullable=False, default=0, server_default="0")
+    version_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Version retention: own policy (NULL follows VERSION_RETENTION_POLICY,
+    # "" keeps everything) and when the retention job last thinned the history
+    retention_policy = Column(String(255), nullable=True)
+    retention_checked_at = Column(DateTime(timezone=True), nullable=True)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set from Python so every value shares one storage format (keyset cursors compare it)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user = relationship("User", back_populates="projects")
     
+    __table_args__ = (
+        # Keyset pagination of listings, newest first (optionally by category)
+        Index("ix_projects_user_updated", "user_id", "updated_at", "id"),
+        Index("ix_projects_user_category_updated", "user_id", "category", "updated_at", "id"),
+        Index("ix_projects_public_updated", "is_public", "updated_at", "id"),
+        Index("ix_projects_public_category_updated", "is_public", "category", "updated_at", "id"),
+        # Public template gallery
+        Index("ix_projects_template_public", "is_template", "is_public"),
+        # Retention job: least recently checked projects first
+        Index("ix_projects_retention_checked", "retention_checked_at"),
+        # Never reuse the id of a deleted project (caches and clients key on it)
+        {"sqlite_autoincrement": True},
+    )
+    
     def __repr__(self):
         return f"<Project(id={self.id}, name='{self.name}', user_id={self.user_id})>"
 
@@ -55,11 +103,22 @@ class ProjectVersion(Base):
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     version_number = Column(Integer, nullable=False)
     
-    # Version content
-    html_content = Column(Text, nullable=True)
-    css_content = Column(Text, nullable=True)
-    js_content = Column(Text, nullable=True)
-    elements_tree = Column(JSON, nullable=True)
+    # Keyframe content (blob hashes, shared with the project and other versions);
+    # empty on delta versions
+    html_hash = Column(String(64), nullable=True)
+    css_hash = Column(String(64), nullable=True)
+    js_hash = Column(String(64), nullable=True)
+    elements_tree = Column(CompressedJSON, nullable=True)
+    
+    # Delta encoding: non-keyframes store a binary delta against base_version_number,
+    # and chain_depth counts the deltas back to the nearest keyframe
+    is_keyframe = Column(Boolean, nullable=False, default=True, server_default="1")
+    chain_depth = Column(Integer, nullable=False, default=0, server_default="0")
+    base_version_number = Column(Integer, nullable=True)
+    delta = deferred(Column(LargeBinary, nullable=True))
+    content_hash = Column(String(64), nullable=True)  # digest of the reconstructed content
+    content_size = Column(Integer, nullable=True)  # bytes of reconstructed content
+    stored_size = Column(Integer, nullable=True)  # bytes this version adds to storage
     
     # Version metadata
     description = Column(Text, nullable=True)
@@ -68,5 +127,9 @@ class ProjectVersion(Base):
     # Relationships
     project = relationship("Project")
     
+    __table_args__ = (
+        Index("ix_project_versions_project_version", "project_id", "version_number", unique=True),
+    )
+    
     def __repr__(self):
         return f"<ProjectVersion(id={self.id}, project_id={self.project_id}, version={self.version_number})>"
\ No newline at end of file
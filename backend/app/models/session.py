@@ -0,0 +1,36 @@
+"""
+Login session database models
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class UserSession(Base):
+    """A login: holds the current refresh token and is named by the access tokens it issues
+
+    Only the SHA-256 of the refresh token's secret is stored. Each refresh
+    replaces it, so a rotated-out token presented again is detected.
+    """
+    
+    __tablename__ = "user_sessions"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    refresh_hash = Column(String(64), nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        # Revoking every session of a user (deactivation)
+        Index("ix_user_sessions_user", "user_id"),
+        # Loading recent revocations and purging expired sessions
+        Index("ix_user_sessions_revoked", "revoked_at"),
+        Index("ix_user_sessions_expires", "expires_at"),
+    )
+    
+    def __repr__(self):
+        return f"<UserSession(id={self.id}, user_id={self.user_id})>"
@@ -34,5 +34,10 @@ class User(Base):
     # Relationships
     projects = relationship("Project", back_populates="user")
     
+    # Not stored: set by app.core.auth from the access token's role claim,
+    # and to the scopes of the API key used (None: not limited)
+    role = "user"
+    scopes = None
+    
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
\ No newline at end of file
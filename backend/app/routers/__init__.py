@@ -2,6 +2,6 @@
 API routers package
 """
 
-from . import auth, users, projects, templates, components
+from . import auth, users, projects, templates, components, admin
 
-__all__ = ["auth", "users", "projects", "templates", "components"]
\ No newline at end of file
+__all__ = ["auth", "users", "projects", "templates", "components", "admin"]
\ No newline at end of file
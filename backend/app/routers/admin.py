@@ -0,0 +1,64 @@
+"""
+Administration API endpoints
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+
+from app.core.auth import get_current_admin
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.retention import retention_report
+from app.core.versions import storage_report
+from app.database import WRITER_MAX_OVERFLOW, engine, async_engine, get_db, get_pool_status, writer_engine
+
+router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+@router.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    """Get all in-process metrics"""
+    return metrics.snapshot()
+
+@router.get("/db/pool", response_model=Dict[str, Any])
+async def get_db_pool():
+    """Get connection pool configuration, live gauges and wait times
+
+    Includes the single writer's pool when the SQLite production profile is on.
+    """
+    snapshot = metrics.snapshot()
+    timings, counters = snapshot["timings"], snapshot["counters"]
+    engines = [("async", async_engine.sync_engine, None), ("sync", engine, None)]
+    if writer_engine is not None:
+        engines.append(("writer", writer_engine.sync_engine, WRITER_MAX_OVERFLOW))
+    return {
+        "config": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        },
+        "engines": {
+            name: {
+                **get_pool_status(bound_engine, max_overflow),
+                "wait": timings.get(f"db.pool.{name}.wait"),
+                "timeouts": counters.get(f"db.pool.{name}.timeouts", 0),
+            }
+            for name, bound_engine, max_overflow in engines
+        },
+    }
+
+@router.get("/storage/versions", response_model=Dict[str, Any])
+async def get_version_storage(db: AsyncSession = Depends(get_db)):
+    """Get version history storage: compression ratio and reconstruct latency"""
+    return await storage_report(db)
+
+@router.get("/storage/retention", response_model=Dict[str, Any])
+async def get_version_retention(
+    project_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Dry run of the retention policies: versions and bytes they would drop now"""
+    return await retention_report(db, project_id, limit)
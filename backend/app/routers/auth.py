@@ -2,47 +2,60 @@
 Authentication API endpoints
 """
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from typing import Optional
 
-from app.database import get_db
+from app.database import get_db, run_write
 from app.models.user import User
-from app.core.auth import authenticate_user, create_access_token, get_password_hash
+from app.models.session import UserSession
+from app.core.auth import (
+    authenticate_user, create_access_token, decode_token, get_password_hash_async,
+    revoke_token, security, user_role
+)
 from app.core.config import settings
+from app.core.sessions import open_session, revoke_sessions, rotate_session
 
 router = APIRouter()
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class UserRegister(BaseModel):
     username: str
     email: str
     password: str
-    full_name: str = None
+    full_name: Optional[str] = None
 
 class UserResponse(BaseModel):
     id: int
     username: str
     email: str
-    full_name: str = None
+    full_name: Optional[str] = None
     is_active: bool
     
     class Config:
         from_attributes = True
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    result = await db.execute(select(User).where(
         (User.username == user_data.username) | (User.email == user_data.email)
-    ).first()
+    ))
+    existing_user = result.scalars().first()
     
     if existing_user:
         raise HTTPException(
@@ -51,7 +64,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -59,34 +72,81 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    async def create(session: AsyncSession) -> User:
+        session.add(db_user)
+        await session.flush()
+        await session.refresh(db_user)
+        return db_user
     
-    return db_user
+    return await run_write(db, create)
 
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Login and get access token"""
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    """Login and get an access token plus a refresh token for its session"""
+    user = await authenticate_user(db, form_data.username, form_data.password)
+    if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    async def start(session: AsyncSession):
+        # Update last login
+        await session.execute(update(User).where(User.id == user.id).values(last_login=datetime.utcnow()))
+        return await open_session(session, user.id)
+    
+    session, refresh_token = await run_write(db, start)
+    return issue_tokens(user, session, refresh_token)
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Exchange a refresh token for a new access token and refresh token"""
+    async def rotate(session: AsyncSession):
+        # Returns instead of raising, so that a reused token's revocation commits
+        rotated = await rotate_session(session, request.refresh_token)
+        if rotated is None:
+            return None
+        user = await session.get(User, rotated[0].user_id)
+        if user is None or not user.is_active:
+            await revoke_sessions(session, UserSession.id == rotated[0].id)
+            return None
+        return (user, *rotated)
+    
+    issued = await run_write(db, rotate)
+    if issued is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return issue_tokens(*issued)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke the bearer token of this request and the session it belongs to"""
+    claims = decode_token(credentials.credentials)
+    revoke_token(credentials.credentials)
+    if claims is not None and claims.get("sid") is not None:
+        await run_write(db, lambda session: revoke_sessions(session, UserSession.id == claims["sid"]))
+
+def issue_tokens(user: User, session: UserSession, refresh_token: str) -> dict:
+    """Token response for a session: the access token names the user, its role and the session"""
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id, "role": user_role(user.username), "sid": session.id},
+        expires_delta=access_token_expires
     )
-    
-    # Update last login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
-    
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
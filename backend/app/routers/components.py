@@ -2,10 +2,13 @@
 Component library API endpoints
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from typing import List, Dict, Any
+from datetime import datetime
 from pydantic import BaseModel
 
+from app.core.conditional import is_not_modified, not_modified, static_etag, validator_headers
+
 router = APIRouter()
 
 class ComponentResponse(BaseModel):
@@ -423,18 +426,39 @@ COMPONENTS_LIBRARY = {
     ]
 }
 
+# The library is static: every validator is computed once, when the module loads
+LIBRARY_ETAG = static_etag(COMPONENTS_LIBRARY)
+# Each representation gets its own: /categories is the list of names, not the library
+CATEGORY_NAMES = list(COMPONENTS_LIBRARY)
+CATEGORY_NAMES_ETAG = static_etag(CATEGORY_NAMES)
+CATEGORY_ETAGS = {category: static_etag(components) for category, components in COMPONENTS_LIBRARY.items()}
+COMPONENT_ETAGS = {
+    (category, component["id"]): static_etag(component)
+    for category, components in COMPONENTS_LIBRARY.items()
+    for component in components
+}
+LOADED_AT = datetime.utcnow()
+
+def conditional(request: Request, response: Response, etag: str):
+    """304 for a client holding ``etag``, otherwise None after setting the validators"""
+    headers = validator_headers(etag, LOADED_AT)
+    if is_not_modified(request, etag, LOADED_AT):
+        return not_modified(headers)
+    response.headers.update(headers)
+    return None
+
 @router.get("/", response_model=Dict[str, List[ComponentResponse]])
-async def get_components():
+async def get_components(request: Request, response: Response):
     """Get all available components organized by category"""
-    return COMPONENTS_LIBRARY
+    return conditional(request, response, LIBRARY_ETAG) or COMPONENTS_LIBRARY
 
 @router.get("/categories", response_model=List[str])
-async def get_component_categories():
+async def get_component_categories(request: Request, response: Response):
     """Get available component categories"""
-    return list(COMPONENTS_LIBRARY.keys())
+    return conditional(request, response, CATEGORY_NAMES_ETAG) or CATEGORY_NAMES
 
 @router.get("/{category}", response_model=List[ComponentResponse])
-async def get_components_by_category(category: str):
+async def get_components_by_category(category: str, request: Request, response: Response):
     """Get components by category"""
     if category not in COMPONENTS_LIBRARY:
         from fastapi import HTTPException, status
@@ -443,10 +467,10 @@ async def get_components_by_category(category: str):
             detail=f"Category '{category}' not found"
         )
     
-    return COMPONENTS_LIBRARY[category]
+    return conditional(request, response, CATEGORY_ETAGS[category]) or COMPONENTS_LIBRARY[category]
 
 @router.get("/{category}/{component_id}", response_model=ComponentResponse)
-async def get_component(category: str, component_id: str):
+async def get_component(category: str, component_id: str, request: Request, response: Response):
     """Get a specific component"""
     if category not in COMPONENTS_LIBRARY:
         from fastapi import HTTPException, status
@@ -467,4 +491,4 @@ async def get_component(category: str, component_id: str):
             detail=f"Component '{component_id}' not found in category '{category}'"
         )
     
-    return component
\ No newline at end of file
+    return conditional(request, response, COMPONENT_ETAGS[category, component_id]) or component
\ No newline at end of file
@@ -2,87 +2,345 @@
 Project management API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response, Security
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer, undefer_group
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
 import json
 
-from app.database import get_db
-from app.models.project import Project, ProjectVersion
+from app.database import get_db, run_write
+from app.models.project import CONTENT_FIELDS, Project, ProjectVersion
 from app.schemas.project import (
-    ProjectCreate, ProjectUpdate, ProjectResponse, 
-    ProjectDetail, ProjectExport, ProjectVersionCreate, ProjectVersionResponse
+    ProjectCreate, ProjectUpdate, ProjectPatch, ProjectResponse, ProjectUpdateResponse, AutosaveResponse,
+    ProjectDetail, ProjectExport, ProjectVersionCreate, ProjectVersionResponse,
+    ProjectVersionDetail, ProjectVersionDiff
 )
-from app.core.auth import get_current_user
+from app.core.auth import get_current_principal
+from app.core.autosave import autosave_buffer
+from app.core.pagination import keyset_page, set_page_headers
+from app.core.conditional import (
+    entity_tags, is_not_modified, make_etag, not_modified, validator_headers
+)
+from app.core.blobs import (
+    assign_changes, assign_content, content_hashes, get_texts, json_hash, load_content, put_blob
+)
+from app.core.patching import PatchError, apply_json_patch, apply_text_edits
+from app.core.streaming import stream_json_object, stream_html_document, stream_zip
+from app.core.versions import (
+    VERSION_METADATA, diff_versions, encode_version, load_version_content, pack_fields, version_content_columns
+)
+from app.core.treecodec import materialize
 from app.models.user import User
 
 router = APIRouter()
 
+async def get_owned_project(
+    db: AsyncSession,
+    project_id: int,
+    user: User,
+    with_content: bool = False
+) -> Optional[Project]:
+    """Load a project owned by the given user (content columns only if requested)"""
+    query = select(Project).where(
+        Project.id == project_id,
+        Project.user_id == user.id
+    )
+    if with_content:
+        query = query.options(undefer_group("content"))
+    result = await db.execute(query)
+    return result.scalars().first()
+
+# Columns the project ETag is derived from: never content
+ETAG_COLUMNS = (Project.id, Project.revision, Project.latest_version_number, Project.version_count)
+
+def project_etag(project: Any, autosave: Optional[int] = None, revision: Optional[int] = None) -> str:
+    """Strong ETag of a project's detail representation
+
+    ``"id-revision-latest_version-version_count[-aN]"``: the revision moves
+    with every write to the project; the version counters are included
+    because snapshots and retention change them without a new revision, and
+    the autosave sequence because buffered saves are not written yet.
+    """
+    revision = project.revision if revision is None else revision
+    parts = [project.id, revision, project.latest_version_number, project.version_count]
+    if autosave is not None:
+        parts.append(f"a{autosave}")
+    return make_etag(*parts)
+
+def parse_project_etag(tag: str) -> Optional[Tuple[int, int, Optional[int]]]:
+    """(id, revision, autosave sequence) of an ETag project_etag made, or None for any other tag"""
+    parts = tag.strip('"').split("-") if tag.startswith('"') else []
+    if len(parts) not in (4, 5) or not all(part.isdigit() for part in parts[:4]):
+        return None
+    sequence = None
+    if len(parts) == 5:
+        if not parts[4].startswith("a") or not parts[4][1:].isdigit():
+            return None
+        sequence = int(parts[4][1:])
+    return int(parts[0]), int(parts[1]), sequence
+
+def project_last_modified(row: Any) -> datetime:
+    """Latest of the project's own update, its newest snapshot and its last retention pass"""
+    return max(value for value in (row.updated_at, row.latest_version_at, row.retention_checked_at) if value is not None)
+
+async def get_project_validators(db: AsyncSession, project_id: int, user: User) -> Optional[Tuple[str, datetime]]:
+    """ETag and Last-Modified of a project, from one indexed lookup and no content (plus buffered autosaves)"""
+    latest_version_at = select(ProjectVersion.created_at).where(
+        ProjectVersion.project_id == Project.id,
+        ProjectVersion.version_number == Project.latest_version_number
+    ).scalar_subquery()
+    result = await db.execute(select(
+        *ETAG_COLUMNS, Project.updated_at, Project.retention_checked_at, latest_version_at.label("latest_version_at")
+    ).where(
+        Project.id == project_id,
+        Project.user_id == user.id
+    ))
+    row = result.first()
+    if row is None:
+        return None
+    pending = autosave_buffer.view(project_id)
+    if pending is None:
+        return project_etag(row), project_last_modified(row)
+    _, sequence, saved_at = pending
+    return project_etag(row, sequence), max(project_last_modified(row), saved_at)
+
+async def check_if_match(db: AsyncSession, project_id: int, user: User, if_match: Optional[str]) -> Optional[int]:
+    """Enforce If-Match on a write, reading only the ETag columns
+
+    A write only depends on the project's content, so an ETag matches when
+    it names the current id and revision: snapshots and retention change
+    the version counters in the ETag but never make a write stale.
+
+    Returns the revision that was matched, which the write must still find
+    (see bump_revision): the read takes no lock on SQLite, so a concurrent
+    write can get in between. None when there is nothing to hold it to.
+
+    Call it after flushing the autosave buffer. The ETag a GET showed while
+    saves were buffered is accepted if those saves are what was written
+    since.
+    """
+    if if_match is None:
+        return None
+    result = await db.execute(select(*ETAG_COLUMNS).where(
+        Project.id == project_id,
+        Project.user_id == user.id
+    ).with_for_update())
+    row = result.first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    written = autosave_buffer.written(project_id)
+    for tag in entity_tags(if_match):
+        if tag == "*":
+            return None
+        named = parse_project_etag(tag)
+        if named is None or named[0] != row.id:
+            continue
+        _, revision, sequence = named
+        if sequence is None and revision == row.revision:
+            return row.revision
+        if sequence is not None and written == (sequence, revision, row.revision):
+            return row.revision
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Resource has changed (If-Match does not match the current ETag)"
+    )
+
+async def bump_revision(db: AsyncSession, project_id: int, expected: Optional[int] = None):
+    """Move a project to its next revision; with ``expected``, only from that one (412 otherwise)"""
+    query = update(Project).where(Project.id == project_id)
+    if expected is not None:
+        query = query.where(Project.revision == expected)
+    result = await db.execute(
+        query.values(revision=Project.revision + 1).returning(Project.id).execution_options(synchronize_session=False)
+    )
+    if result.first() is None:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has changed (If-Match does not match the current ETag)"
+        )
+
+async def paginate_projects(
+    db: AsyncSession,
+    query: Select,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List[Project], Optional[str], Optional[str]]:
+    """Page through projects newest first on (updated_at, id)"""
+    return await keyset_page(db, query, (Project.updated_at, Project.id), limit, skip, cursor)
+
+async def get_version(db: AsyncSession, project_id: int, version_number: int) -> Optional[ProjectVersion]:
+    """Load one version of a project, ready for reconstruction"""
+    result = await db.execute(select(ProjectVersion).where(
+        ProjectVersion.project_id == project_id,
+        ProjectVersion.version_number == version_number
+    ).options(undefer(ProjectVersion.delta)))
+    return result.scalars().first()
+
+async def copy_project(
+    db: AsyncSession,
+    project_id: int,
+    user: User,
+    name_suffix: str,
+    content: Optional[Dict[str, Any]] = None
+) -> Optional[Project]:
+    """Copy a project owned by ``user`` with one INSERT ... SELECT
+
+    Content columns are copied inside the database (blobs are shared by
+    hash), or taken from ``content`` expressions, e.g. a version's.
+    Returns None when the project does not exist.
+    """
+    if content is None:
+        content = {column: getattr(Project, column) for column in (*CONTENT_FIELDS.values(), "elements_tree", "tree_hash")}
+    columns = {
+        "name": Project.name + name_suffix,
+        "description": Project.description,
+        **content,
+        "canvas_settings": Project.canvas_settings,
+        "canvas_hash": Project.canvas_hash,
+        "category": Project.category,
+        "tags": Project.tags,
+        "user_id": literal(user.id),
+    }
+    source = select(*columns.values()).where(Project.id == project_id, Project.user_id == user.id)
+    result = await db.execute(insert(Project).from_select(list(columns), source).returning(Project.id))
+    copy_id = result.scalar()
+    return await db.get(Project, copy_id) if copy_id is not None else None
+
+def detail_fields(project: Project) -> dict:
+    """JSON-ready ProjectDetail fields other than the blob-backed content"""
+    fields = ProjectResponse.model_validate(project).model_dump(mode="json")
+    fields["elements_tree"] = project.elements_tree
+    fields["canvas_settings"] = project.canvas_settings
+    return fields
+
+def with_buffered_saves(projects: Sequence[Project], **filters: Any) -> List[Any]:
+    """Listing rows with their projects' buffered autosaves applied
+
+    A row whose saves no longer match the listing's ``filters`` is left out.
+    The page itself was chosen from the written values, so a row keeps its
+    place until its saves are flushed.
+    """
+    rows: List[Any] = []
+    for project in projects:
+        pending = autosave_buffer.view(project.id)
+        if pending is None:
+            rows.append(project)
+            continue
+        values, _, saved_at = pending
+        row = ProjectResponse.model_validate(project).model_dump()
+        row.update((field, value) for field, value in values.items() if field in row)
+        row["updated_at"] = saved_at
+        if all(row[field] == value for field, value in filters.items()):
+            rows.append(row)
+    return rows
+
 @router.get("/", response_model=List[ProjectResponse])
 async def get_projects(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     is_public: Optional[bool] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:read"])
 ):
-    """Get user's projects with optional filtering"""
-    query = db.query(Project).filter(Project.user_id == current_user.id)
+    """Get user's projects with optional filtering (cursors in X-Next-Cursor / X-Prev-Cursor)
+
+    The user's buffered autosaves are written first, so filters and order
+    see them.
+    """
+    buffered = autosave_buffer.projects_of(current_user.id)
+    if buffered:
+        await autosave_buffer.flush(buffered)
+    query = select(Project).where(Project.user_id == current_user.id)
     
     if category:
-        query = query.filter(Project.category == category)
+        query = query.where(Project.category == category)
     if is_public is not None:
-        query = query.filter(Project.is_public == is_public)
+        query = query.where(Project.is_public == is_public)
     
-    projects = query.offset(skip).limit(limit).all()
+    projects, next_cursor, prev_cursor = await paginate_projects(db, query, limit, skip, cursor)
+    set_page_headers(request, response, next_cursor, prev_cursor)
     return projects
 
 @router.get("/public", response_model=List[ProjectResponse])
 async def get_public_projects(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get public projects"""
-    query = db.query(Project).filter(Project.is_public == True)
+    """Get public projects (cursors in X-Next-Cursor / X-Prev-Cursor)
+
+    Buffered autosaves are shown on the listed rows rather than written
+    first, so anonymous reads never turn into writes.
+    """
+    query = select(Project).where(Project.is_public == True)
+    filters: Dict[str, Any] = {"is_public": True}
     
     if category:
-        query = query.filter(Project.category == category)
+        query = query.where(Project.category == category)
+        filters["category"] = category
     
-    projects = query.offset(skip).limit(limit).all()
-    return projects
+    projects, next_cursor, prev_cursor = await paginate_projects(db, query, limit, skip, cursor)
+    set_page_headers(request, response, next_cursor, prev_cursor)
+    return with_buffered_saves(projects, **filters)
 
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project: ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
 ):
     """Create a new project"""
-    db_project = Project(
-        **project.dict(),
-        user_id=current_user.id
-    )
+    async def create(session: AsyncSession) -> Project:
+        db_project = Project(user_id=current_user.id)
+        for field, value in (await assign_content(session, db_project, project.dict())).items():
+            setattr(db_project, field, value)
+        session.add(db_project)
+        await session.flush()
+        await session.refresh(db_project)
+        return db_project
     
-    db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
-    
-    return db_project
+    return await run_write(db, create)
 
 @router.get("/{project_id}", response_model=ProjectDetail)
 async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:read"])
 ):
-    """Get a specific project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    """Get a specific project (content is streamed from the blob store; 304 when unchanged)
+
+    Autosaves still in the buffer are layered over the stored project.
+    """
+    validators = await get_project_validators(db, project_id, current_user)
+    
+    if validators is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    headers = validator_headers(*validators, cache_control="private, no-cache")
+    if is_not_modified(request, *validators):
+        return not_modified(headers)
+    
+    project = await get_owned_project(db, project_id, current_user, with_content=True)
     
     if not project:
         raise HTTPException(
@@ -90,20 +348,61 @@ async def get_project(
             detail="Project not found"
         )
     
-    return project
+    fields, hashes = detail_fields(project), content_hashes(project)
+    pending = autosave_buffer.view(project_id)
+    if pending is not None:
+        for field, value in pending[0].items():
+            hashes.pop(field, None)
+            fields[field] = value
+    
+    return StreamingResponse(
+        stream_json_object(fields, hashes),
+        media_type="application/json",
+        headers=headers
+    )
 
-@router.put("/{project_id}", response_model=ProjectResponse)
-async def update_project(
+@router.put("/{project_id}/autosave", response_model=AutosaveResponse, status_code=status.HTTP_202_ACCEPTED)
+async def autosave_project(
     project_id: int,
     project_update: ProjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
 ):
-    """Update a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    """Autosave a project: buffered in memory, superseded by later saves and written behind
+
+    Reads see the saved fields straight away; any other write to the project
+    writes the buffer first.
+    """
+    # A project with saves in the buffer was already checked
+    if autosave_buffer.owner(project_id) != current_user.id:
+        result = await db.execute(select(Project.id).where(
+            Project.id == project_id,
+            Project.user_id == current_user.id
+        ))
+        
+        if result.first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+    
+    entry = await autosave_buffer.save(project_id, current_user.id, project_update.dict(exclude_unset=True))
+    return {
+        "project_id": project_id,
+        "pending_writes": entry.writes,
+        "pending_fields": sorted(entry.values),
+    }
+
+@router.post("/{project_id}/export")
+async def export_project(
+    project_id: int,
+    export: ProjectExport,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:read"])
+):
+    """Export a project as a standalone HTML page, a zip or JSON (streamed)"""
+    await autosave_buffer.flush_project(project_id)
+    project = await get_owned_project(db, project_id, current_user, with_content=True)
     
     if not project:
         raise HTTPException(
@@ -111,87 +410,249 @@ async def update_project(
             detail="Project not found"
         )
     
-    # Update fields
+    hashes = content_hashes(project)
+    filename = f"project-{project.id}.{export.format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if export.format == "html":
+        body = stream_html_document(project.name, hashes)
+        media_type = "text/html; charset=utf-8"
+    elif export.format == "zip":
+        body = stream_zip(detail_fields(project), hashes)
+        media_type = "application/zip"
+    else:
+        body = stream_json_object(detail_fields(project), hashes)
+        media_type = "application/json"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@router.put("/{project_id}", response_model=ProjectUpdateResponse)
+async def update_project(
+    project_id: int,
+    project_update: ProjectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
+):
+    """Update a project (with If-Match, only if it is still at that ETag)
+
+    Only fields that differ from the stored ones are written, and a save that
+    changes nothing leaves the project (revision, updated_at) untouched;
+    ``changed_fields`` lists what was written.
+    """
     update_data = project_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(project, field, value)
+    await autosave_buffer.flush_project(project_id)
+    
+    async def update(session: AsyncSession) -> Tuple[Project, List[str]]:
+        expected_revision = await check_if_match(session, project_id, current_user, if_match)
+        project = await get_owned_project(session, project_id, current_user)
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        # Update changed fields (content goes to the blob store)
+        changed = await assign_changes(session, project, update_data)
+        if changed:
+            # Compare-and-set first: a write that got in since the If-Match check wins
+            await bump_revision(session, project_id, expected_revision)
+            await session.flush()
+            await session.refresh(project)
+        return project, changed
+    
+    project, changed = await run_write(db, update)
+    response.headers["ETag"] = project_etag(project)
+    return {**ProjectResponse.model_validate(project).model_dump(), "changed_fields": changed}
+
+@router.patch("/{project_id}", response_model=ProjectResponse)
+async def patch_project(
+    project_id: int,
+    patch: ProjectPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
+):
+    """Apply incremental edits to a project: JSON Patch on the tree, offset edits on text
+
+    Edits are made against ``base_revision``; if the project has moved past
+    it the request fails with 409 and nothing is applied. An If-Match header
+    is checked first, before any content is loaded.
+    """
+    edits = {
+        field: value
+        for field, value in patch.model_dump(by_alias=True, exclude_unset=True, exclude={"base_revision"}).items()
+        if value is not None
+    }
+    await autosave_buffer.flush_project(project_id)
     
-    db.commit()
-    db.refresh(project)
+    async def apply(session: AsyncSession) -> Project:
+        await check_if_match(session, project_id, current_user, if_match)
+        query = select(Project).where(
+            Project.id == project_id,
+            Project.user_id == current_user.id
+        )
+        if "elements_tree" in edits:
+            query = query.options(undefer(Project.elements_tree))
+        project = (await session.execute(query)).scalars().first()
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        if project.revision != patch.base_revision:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Project is at revision {project.revision}, not {patch.base_revision}"
+            )
+        
+        # Only the patched fields are loaded and rewritten
+        values = {}
+        texts = await get_texts(session, (getattr(project, CONTENT_FIELDS[field]) for field in CONTENT_FIELDS if field in edits))
+        try:
+            for field, column in CONTENT_FIELDS.items():
+                if field in edits:
+                    text = texts.get(getattr(project, column), "")
+                    values[column] = await put_blob(session, apply_text_edits(text, edits[field]))
+            if "elements_tree" in edits:
+                values["elements_tree"] = apply_json_patch(materialize(project.elements_tree), edits["elements_tree"])
+                values["tree_hash"] = json_hash(values["elements_tree"])
+        except PatchError as error:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(error)
+            )
+        
+        # Compare-and-set on the revision, in case a concurrent write got in first
+        result = await session.execute(update(Project).where(
+            Project.id == project_id,
+            Project.revision == patch.base_revision
+        ).values(**values, revision=Project.revision + 1).returning(Project.id))
+        if result.first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Project changed while the patch was applied"
+            )
+        
+        await session.refresh(project)
+        return project
     
+    project = await run_write(db, apply)
+    response.headers["ETag"] = project_etag(project)
     return project
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
 ):
-    """Delete a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
+    """Delete a project and its version history (the blob GC then frees their content)"""
+    async def remove(session: AsyncSession):
+        project = await get_owned_project(session, project_id, current_user)
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        await session.execute(delete(ProjectVersion).where(ProjectVersion.project_id == project_id))
+        await session.delete(project)
     
-    db.delete(project)
-    db.commit()
+    await run_write(db, remove)
+    autosave_buffer.discard(project_id)
 
 @router.post("/{project_id}/duplicate", response_model=ProjectResponse)
 async def duplicate_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
 ):
     """Duplicate a project"""
-    original_project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    
-    if not original_project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-    
-    # Create duplicate
-    duplicate_project = Project(
-        name=f"{original_project.name} (Copy)",
-        description=original_project.description,
-        html_content=original_project.html_content,
-        css_content=original_project.css_content,
-        js_content=original_project.js_content,
-        elements_tree=original_project.elements_tree,
-        canvas_settings=original_project.canvas_settings,
-        category=original_project.category,
-        tags=original_project.tags,
-        user_id=current_user.id
-    )
+    await autosave_buffer.flush_project(project_id)
     
-    db.add(duplicate_project)
-    db.commit()
-    db.refresh(duplicate_project)
+    async def duplicate(session: AsyncSession) -> Project:
+        duplicate_project = await copy_project(session, project_id, current_user, " (Copy)")
+        
+        if not duplicate_project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        return duplicate_project
     
-    return duplicate_project
+    return await run_write(db, duplicate)
 
 @router.post("/{project_id}/versions", response_model=ProjectVersionResponse)
 async def create_project_version(
     project_id: int,
     version_data: ProjectVersionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
 ):
     """Create a new version of a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    await autosave_buffer.flush_project(project_id)
+    
+    async def snapshot(session: AsyncSession) -> ProjectVersion:
+        project = await get_owned_project(session, project_id, current_user, with_content=True)
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        # Claim the next version number: the row lock serializes concurrent snapshots
+        result = await session.execute(update(Project).where(
+            Project.id == project_id
+        ).values(
+            latest_version_number=Project.latest_version_number + 1,
+            version_count=Project.version_count + 1,
+            updated_at=Project.updated_at  # a snapshot does not edit the project
+        ).returning(Project.latest_version_number))
+        next_version = result.scalar_one()
+        
+        # The previous snapshot is the delta base
+        result = await session.execute(select(ProjectVersion).where(
+            ProjectVersion.project_id == project_id,
+            ProjectVersion.version_number == next_version - 1
+        ).options(undefer(ProjectVersion.delta)))
+        last_version = result.scalars().first()
+        
+        # Create version, delta-encoded against the previous one
+        version = ProjectVersion(
+            project_id=project_id,
+            version_number=next_version,
+            description=version_data.description
+        )
+        content = await load_content(session, project)
+        content["elements_tree"] = project.elements_tree
+        await encode_version(session, version, pack_fields(content), last_version)
+        
+        session.add(version)
+        await session.flush()
+        await session.refresh(version)
+        return version
+    
+    return await run_write(db, snapshot)
+
+@router.get("/{project_id}/versions", response_model=List[ProjectVersionResponse])
+async def get_project_versions(
+    project_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:read"])
+):
+    """Get a project's versions, newest first (cursors in X-Next-Cursor / X-Prev-Cursor)"""
+    project = await get_owned_project(db, project_id, current_user)
     
     if not project:
         raise HTTPException(
@@ -199,41 +660,55 @@ async def create_project_version(
             detail="Project not found"
         )
     
-    # Get next version number
-    last_version = db.query(ProjectVersion).filter(
+    # Metadata only: content comes from the per-version endpoint
+    query = select(ProjectVersion).where(
         ProjectVersion.project_id == project_id
-    ).order_by(ProjectVersion.version_number.desc()).first()
-    
-    next_version = (last_version.version_number + 1) if last_version else 1
-    
-    # Create version
-    version = ProjectVersion(
-        project_id=project_id,
-        version_number=next_version,
-        description=version_data.description,
-        html_content=project.html_content,
-        css_content=project.css_content,
-        js_content=project.js_content,
-        elements_tree=project.elements_tree
+    ).options(load_only(*VERSION_METADATA))
+    versions, next_cursor, prev_cursor = await keyset_page(
+        db, query, (ProjectVersion.version_number,), limit, cursor=cursor
     )
+    set_page_headers(request, response, next_cursor, prev_cursor)
+    return versions
+
+@router.get("/{project_id}/versions/{version_number}", response_model=ProjectVersionDetail)
+async def get_project_version(
+    project_id: int,
+    version_number: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:read"])
+):
+    """Get a specific version of a project with its content"""
+    project = await get_owned_project(db, project_id, current_user)
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
     
-    db.add(version)
-    db.commit()
-    db.refresh(version)
+    version = await get_version(db, project_id, version_number)
+    
+    if not version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Version not found"
+        )
     
-    return version
+    return {
+        **ProjectVersionResponse.model_validate(version).model_dump(),
+        **(await load_version_content(db, version)),
+    }
 
-@router.get("/{project_id}/versions", response_model=List[ProjectVersionResponse])
-async def get_project_versions(
+@router.get("/{project_id}/versions/{from_version}/diff/{to_version}", response_model=ProjectVersionDiff)
+async def get_project_version_diff(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    from_version: int,
+    to_version: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:read"])
 ):
-    """Get all versions of a project"""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    """Get the changes between two versions of a project"""
+    project = await get_owned_project(db, project_id, current_user)
     
     if not project:
         raise HTTPException(
@@ -241,8 +716,76 @@ async def get_project_versions(
             detail="Project not found"
         )
     
-    versions = db.query(ProjectVersion).filter(
-        ProjectVersion.project_id == project_id
-    ).order_by(ProjectVersion.version_number.desc()).all()
+    old = await get_version(db, project_id, from_version)
+    new = await get_version(db, project_id, to_version)
+    
+    if not old or not new:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Version not found"
+        )
+    
+    return {
+        "project_id": project_id,
+        "from_version": from_version,
+        "to_version": to_version,
+        **(await diff_versions(db, old, new)),
+    }
+
+@router.post("/{project_id}/versions/{version_number}/restore", response_model=ProjectResponse)
+async def restore_project_version(
+    project_id: int,
+    version_number: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
+):
+    """Restore a project's content to a previous version"""
+    await autosave_buffer.flush_project(project_id)
+    
+    async def restore(session: AsyncSession) -> Project:
+        project = await get_owned_project(session, project_id, current_user)
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        version = await get_version(session, project_id, version_number)
+        
+        if not version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Version not found"
+            )
+        
+        await session.execute(update(Project).where(
+            Project.id == project_id
+        ).values(**(await version_content_columns(session, version)), revision=Project.revision + 1))
+        await session.refresh(project)
+        return project
+    
+    return await run_write(db, restore)
+
+@router.post("/{project_id}/versions/{version_number}/duplicate", response_model=ProjectResponse)
+async def create_project_from_version(
+    project_id: int,
+    version_number: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["projects:write"])
+):
+    """Create a new project from a version of an existing one"""
+    async def duplicate(session: AsyncSession) -> Project:
+        project = await get_owned_project(session, project_id, current_user)
+        version = await get_version(session, project_id, version_number) if project else None
+        
+        if not version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Version not found"
+            )
+        
+        content = await version_content_columns(session, version)
+        return await copy_project(session, project_id, current_user, f" (Version {version_number})", content)
     
-    return versions
\ No newline at end of file
+    return await run_write(db, duplicate)
@@ -2,12 +2,18 @@
 Template management API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
 from typing import List, Optional
+from datetime import datetime
 from pydantic import BaseModel
 
 from app.database import get_db
+from app.core.blobs import load_content
+from app.core.conditional import is_not_modified, make_etag, not_modified, static_etag, validator_headers
+from app.core.treecodec import materialize
 from app.models.project import Project
 from app.schemas.project import ProjectResponse, ProjectDetail
 
@@ -68,19 +74,24 @@ PREDEFINED_TEMPLATES = [
     }
 ]
 
+# Validators of the predefined templates: they only change with a deploy
+PREDEFINED_ETAGS = {template["id"]: static_etag(template) for template in PREDEFINED_TEMPLATES}
+LOADED_AT = datetime.utcnow()
+
 @router.get("/", response_model=List[TemplateResponse])
 async def get_templates(
     category: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get available templates"""
     templates = PREDEFINED_TEMPLATES.copy()
     
     # Add user-created templates
-    user_templates = db.query(Project).filter(
+    result = await db.execute(select(Project).where(
         Project.is_template == True,
         Project.is_public == True
-    ).all()
+    ))
+    user_templates = result.scalars().all()
     
     for template in user_templates:
         templates.append({
@@ -101,14 +112,21 @@ async def get_templates(
 @router.get("/{template_id}", response_model=dict)
 async def get_template_content(
     template_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get template content"""
+    """Get template content (304 when the client's copy is current)"""
     
     # Check if it's a predefined template
     predefined_template = next((t for t in PREDEFINED_TEMPLATES if t["id"] == template_id), None)
     
     if predefined_template:
+        headers = validator_headers(PREDEFINED_ETAGS[template_id], LOADED_AT)
+        if is_not_modified(request, PREDEFINED_ETAGS[template_id], LOADED_AT):
+            return not_modified(headers)
+        response.headers.update(headers)
+        
         # Return predefined template content (would need to be implemented)
         # For now, return basic structure
         return {
@@ -124,11 +142,30 @@ async def get_template_content(
     # Check if it's a user template
     if template_id.startswith("user-"):
         project_id = int(template_id.replace("user-", ""))
-        template = db.query(Project).filter(
+        template_filter = (
             Project.id == project_id,
             Project.is_template == True,
             Project.is_public == True
-        ).first()
+        )
+        
+        # Validators first: an unchanged template is answered without its content
+        result = await db.execute(select(Project.revision, Project.updated_at).where(*template_filter))
+        validators = result.first()
+        
+        if not validators:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Template not found"
+            )
+        
+        etag = make_etag(template_id, validators.revision)
+        headers = validator_headers(etag, validators.updated_at)
+        if is_not_modified(request, etag, validators.updated_at):
+            return not_modified(headers)
+        response.headers.update(headers)
+        
+        result = await db.execute(select(Project).options(undefer_group("content")).where(*template_filter))
+        template = result.scalars().first()
         
         if not template:
             raise HTTPException(
@@ -139,11 +176,9 @@ async def get_template_content(
         return {
             "id": template_id,
             "name": template.name,
-            "html_content": template.html_content,
-            "css_content": template.css_content,
-            "js_content": template.js_content,
-            "elements_tree": template.elements_tree,
-            "canvas_settings": template.canvas_settings
+            **(await load_content(db, template)),
+            "elements_tree": materialize(template.elements_tree),
+            "canvas_settings": materialize(template.canvas_settings)
         }
     
     raise HTTPException(
@@ -2,14 +2,20 @@
 User management API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Security, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, run_write
+from app.models.api_key import ApiKey
 from app.models.user import User
-from app.core.auth import get_current_user
+from app.models.session import UserSession
+from app.core.api_keys import API_KEY_SCOPES, missing_scopes, new_api_key
+from app.core.auth import get_current_principal, get_current_user, invalidate_principal
+from app.core.sessions import revoke_sessions
 
 router = APIRouter()
 
@@ -30,25 +36,136 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ApiKeyCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    scopes: List[str] = ["projects:read"]
+    expires_in_days: Optional[int] = Field(None, ge=1)
+    
+    @field_validator("scopes")
+    @classmethod
+    def check_scopes(cls, value: List[str]) -> List[str]:
+        """Only known scopes, at least one"""
+        unknown = [scope for scope in value if scope not in API_KEY_SCOPES]
+        if unknown or not value:
+            raise ValueError(f"scopes must be a non-empty subset of {', '.join(API_KEY_SCOPES)}")
+        return value
+
+class ApiKeyResponse(BaseModel):
+    id: int
+    name: str
+    prefix: str
+    scopes: List[str]
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class ApiKeyCreated(ApiKeyResponse):
+    """The new key's value is only ever returned here"""
+    key: str
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Get current user information"""
+    """Get current user information (any API key may read it)"""
     return current_user
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_user, scopes=["account"])
 ):
     """Update current user information"""
+    async def update_user(session: AsyncSession) -> User:
+        user = await session.get(User, current_user.id)
+        
+        # Update fields
+        update_data = user_update.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(user, field, value)
+        
+        await session.flush()
+        await session.refresh(user)
+        return user
+    
+    user = await run_write(db, update_user)
+    invalidate_principal(user.username)
     
-    # Update fields
-    update_data = user_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(current_user, field, value)
+    return user
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_current_user(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_user, scopes=["account"])
+):
+    """Deactivate the current user's account (its sessions are revoked, so its tokens stop working)"""
+    async def deactivate(session: AsyncSession):
+        user = await session.get(User, current_user.id)
+        user.is_active = False
+        await revoke_sessions(session, UserSession.user_id == user.id)
     
-    db.commit()
-    db.refresh(current_user)
+    await run_write(db, deactivate)
+    invalidate_principal(current_user.username)
+
+@router.post("/me/api-keys", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+async def create_api_key(
+    key_data: ApiKeyCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["account"])
+):
+    """Create an API key (a key can only grant scopes its creator has)"""
+    grantable = set(API_KEY_SCOPES if current_user.scopes is None else current_user.scopes)
+    if current_user.role != "admin":
+        grantable.discard("admin")
+    missing = missing_scopes(grantable, key_data.scopes)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Cannot grant scope: {' '.join(missing)}"
+        )
+    
+    expires_at = datetime.utcnow() + timedelta(days=key_data.expires_in_days) if key_data.expires_in_days else None
+    api_key, key = new_api_key(current_user.id, key_data.name, key_data.scopes, expires_at)
+    
+    async def create(session: AsyncSession) -> ApiKey:
+        session.add(api_key)
+        await session.flush()
+        await session.refresh(api_key)
+        return api_key
+    
+    await run_write(db, create)
+    
+    return ApiKeyCreated(**ApiKeyResponse.model_validate(api_key).model_dump(), key=key)
+
+@router.get("/me/api-keys", response_model=List[ApiKeyResponse])
+async def list_api_keys(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["account"])
+):
+    """List the current user's API keys (without their values)"""
+    result = await db.execute(select(ApiKey).where(ApiKey.user_id == current_user.id).order_by(ApiKey.id))
+    return result.scalars().all()
+
+@router.delete("/me/api-keys/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_api_key(
+    key_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Security(get_current_principal, scopes=["account"])
+):
+    """Revoke an API key; it is refused from the next request on"""
+    async def revoke(session: AsyncSession) -> bool:
+        result = await session.execute(update(ApiKey).where(
+            ApiKey.id == key_id,
+            ApiKey.user_id == current_user.id,
+            ApiKey.revoked_at.is_(None)
+        ).values(revoked_at=datetime.utcnow()).returning(ApiKey.id))
+        return result.first() is not None
     
-    return current_user
\ No newline at end of file
+    if not await run_write(db, revoke):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API key not found"
+        )
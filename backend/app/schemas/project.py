@@ -2,10 +2,12 @@
 Project Pydantic schemas for request/response validation
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from app.core.retention import parse_policy
+
 class ProjectBase(BaseModel):
     """Base project schema"""
     name: str = Field(..., min_length=1, max_length=255)
@@ -36,6 +38,53 @@ class ProjectUpdate(BaseModel):
     elements_tree: Optional[Dict[str, Any]] = None
     canvas_settings: Optional[Dict[str, Any]] = None
     status: Optional[str] = None
+    retention_policy: Optional[str] = Field(None, max_length=255)
+    
+    @field_validator("name", "is_public", "status")
+    @classmethod
+    def reject_null(cls, value: Any) -> Any:
+        """These may be left out but not cleared (an explicit null)"""
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+    
+    @field_validator("retention_policy")
+    @classmethod
+    def check_retention_policy(cls, value: Optional[str]) -> Optional[str]:
+        """Reject policies the retention job could not parse"""
+        if value is not None:
+            parse_policy(value)
+        return value
+
+class JsonPatchOperation(BaseModel):
+    """One RFC 6902 operation (``from`` is only used by move and copy)"""
+    op: str = Field(..., pattern="^(add|remove|replace|move|copy|test)$")
+    path: str
+    value: Any = None
+    from_: Optional[str] = Field(None, alias="from")
+
+class TextEdit(BaseModel):
+    """Replace ``delete`` characters at ``offset`` (in the base text) with ``insert``
+
+    Offsets and lengths are JavaScript string indices: UTF-16 code units.
+    """
+    offset: int = Field(..., ge=0)
+    delete: int = Field(0, ge=0)
+    insert: str = ""
+
+class ProjectPatch(BaseModel):
+    """Schema for an incremental update against a known revision"""
+    base_revision: int
+    html_content: Optional[List[TextEdit]] = None
+    css_content: Optional[List[TextEdit]] = None
+    js_content: Optional[List[TextEdit]] = None
+    elements_tree: Optional[List[JsonPatchOperation]] = None
+
+class AutosaveResponse(BaseModel):
+    """Schema for an accepted autosave (written to the database later)"""
+    project_id: int
+    pending_writes: int
+    pending_fields: List[str]
 
 class ProjectResponse(ProjectBase):
     """Schema for project response"""
@@ -44,12 +93,20 @@ class ProjectResponse(ProjectBase):
     template_id: Optional[str] = None
     status: str
     is_template: bool
+    latest_version_number: int = 0
+    version_count: int = 0
+    revision: int = 1
+    retention_policy: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class ProjectUpdateResponse(ProjectResponse):
+    """Schema for an update response: the project and the fields the update changed"""
+    changed_fields: List[str] = []
+
 class ProjectDetail(ProjectResponse):
     """Detailed project schema with content"""
     html_content: Optional[str] = None
@@ -60,7 +117,7 @@ class ProjectDetail(ProjectResponse):
 
 class ProjectExport(BaseModel):
     """Schema for project export"""
-    format: str = Field(..., regex="^(html|zip|json)$")
+    format: str = Field(..., pattern="^(html|zip|json)$")
     include_assets: bool = True
     minify: bool = False
 
@@ -77,4 +134,47 @@ class ProjectVersionResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ProjectVersionDetail(ProjectVersionResponse):
+    """Project version schema with its content"""
+    html_content: Optional[str] = None
+    css_content: Optional[str] = None
+    js_content: Optional[str] = None
+    elements_tree: Optional[Dict[str, Any]] = None
+
+class TextDiffHunk(BaseModel):
+    """Unified-diff hunk: 1-based starts, spans and prefixed lines"""
+    old_start: int
+    old_lines: int
+    new_start: int
+    new_lines: int
+    lines: List[str]
+
+class TextDiff(BaseModel):
+    """Line diff of one text field"""
+    added: int
+    removed: int
+    hunks: List[TextDiffHunk]
+
+class TreeChange(BaseModel):
+    """One change to the element tree (add, remove, update or move)"""
+    type: str
+    id: str
+    parent: Optional[str] = None
+    index: Optional[int] = None
+    from_parent: Optional[str] = None
+    from_index: Optional[int] = None
+    changes: Optional[Dict[str, Any]] = None
+    element: Optional[Any] = None
+
+class ProjectVersionDiff(BaseModel):
+    """Structural diff between two versions of a project"""
+    project_id: int
+    from_version: int
+    to_version: int
+    identical: bool
+    html_content: TextDiff
+    css_content: TextDiff
+    js_content: TextDiff
+    elements_tree: List[TreeChange]
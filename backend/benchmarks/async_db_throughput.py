@@ -0,0 +1,143 @@
+"""
+Before/after benchmark for the async data layer
+
+Serves the project listing query two ways against the same SQLite file:
+
+* ``legacy``: ``async def`` handler calling the blocking ``Session`` (the old path)
+* ``async``: ``async def`` handler awaiting an ``AsyncSession`` (the new path)
+
+Each run fires concurrent requests through the ASGI app while a probe task
+measures how late the event loop wakes up, which is what every other request
+in a uvicorn worker experiences.
+
+Keep ``--concurrency`` at or below the sync pool capacity (15 by default): past
+it the legacy path blocks the loop inside ``QueuePool`` while the connections
+it waits for can only be returned by that same loop, and every request stalls
+until the pool timeout fires.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.async_db_throughput --requests 2000 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+DB_DIR = tempfile.mkdtemp(prefix="dragndrop-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_DIR}/bench.db")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database import Base, engine, async_engine, get_db, get_sync_db
+from app.models.blob import ContentBlob
+from app.models.project import Project
+from app.models.user import User
+from app.schemas.project import ProjectResponse
+
+app = FastAPI()
+
+@app.get("/legacy/projects", response_model=List[ProjectResponse])
+async def legacy_projects(db: Session = Depends(get_sync_db)):
+    """Old path: blocking session inside an async handler"""
+    return db.query(Project).filter(Project.user_id == 1).limit(50).all()
+
+@app.get("/async/projects", response_model=List[ProjectResponse])
+async def async_projects(db: AsyncSession = Depends(get_db)):
+    """New path: awaited async session"""
+    result = await db.execute(select(Project).where(Project.user_id == 1).limit(50))
+    return result.scalars().all()
+
+def seed(projects: int, content_kb: int):
+    """Create a user with a set of projects carrying realistic content"""
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="-"))
+        for i in range(projects):
+            html = ContentBlob.from_text(f"<div class='section' id='{i}'>" + "x" * (content_kb * 1024) + "</div>")
+            css = ContentBlob.from_text("body { margin: 0; }" * 50)
+            js = ContentBlob.from_text("console.log('x');" * 50)
+            for blob in (html, css, js):
+                db.merge(blob)
+            db.add(Project(
+                name=f"Project {i}",
+                html_hash=html.hash,
+                css_hash=css.hash,
+                js_hash=js.hash,
+                elements_tree={"id": "root", "children": []},
+                user_id=1,
+            ))
+        db.commit()
+
+async def run(path: str, total: int, concurrency: int) -> dict:
+    """Fire ``total`` requests at ``path`` and report throughput and loop lag"""
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        interval = 0.005
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe_task
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "loop_lag_max_ms": max(lags) * 1000 if lags else 0.0,
+        "loop_lag_p99_ms": sorted(lags)[int(len(lags) * 0.99) - 1] * 1000 if lags else 0.0,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--content-kb", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.projects, args.content_kb)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.projects} projects x {args.content_kb} KB (SQLite)")
+    for label, path in (("legacy (sync Session)", "/legacy/projects"),
+                        ("async (AsyncSession)", "/async/projects")):
+        stats = await run(path, args.requests, args.concurrency)
+        print(f"  {label:22} {stats['rps']:8.1f} req/s  p50 {stats['p50_ms']:7.1f} ms  "
+              f"p99 {stats['p99_ms']:7.1f} ms  loop lag p99 {stats['loop_lag_p99_ms']:6.1f} ms  "
+              f"max {stats['loop_lag_max_ms']:6.1f} ms")
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
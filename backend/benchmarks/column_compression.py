@@ -0,0 +1,87 @@
+"""
+On-disk size and read cost of compressed content columns
+
+Seeds the same projects (markup, stylesheets and element trees) into one
+SQLite file per codec, then reports the file size and the time to read every
+blob and tree back.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.column_compression --projects 300 --codecs none,zlib,zstd
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+def child(codec: str, projects: int):
+    """Seed and measure one codec (run in its own process: engines bind at import)"""
+    os.environ["CONTENT_COMPRESSION"] = codec
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+
+    from app.database import Base, engine
+    from app.models.blob import ContentBlob
+    from app.models.project import Project
+    from app.models.user import User
+
+    random.seed(1)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="-"))
+        for i in range(projects):
+            sections = "\n".join(
+                f"<section class='block block-{j % 7}' id='p{i}-s{j}'>\n  <h2>Heading {random.randrange(10 ** 6)}</h2>\n"
+                f"  <p class='lead'>Some descriptive copy for section {j} of page {i}.</p>\n</section>"
+                for j in range(150)
+            )
+            css = "\n".join(f".block-{j} {{ padding: {j * 4}px; margin: 0 auto; display: flex; }}" for j in range(120))
+            html, styles = ContentBlob.from_text(sections), ContentBlob.from_text(css + f"/* {i} */")
+            db.add_all([html, styles])
+            db.add(Project(
+                name=f"Project {i}", user_id=1, html_hash=html.hash, css_hash=styles.hash,
+                elements_tree={"id": "root", "children": [
+                    {"id": f"p{i}-s{j}", "tag": "section", "props": {"className": f"block block-{j % 7}"}, "children": []}
+                    for j in range(150)
+                ]},
+                canvas_settings={"width": "100%", "responsive": True},
+            ))
+        db.commit()
+    engine.dispose()
+    size = os.path.getsize(engine.url.database)
+
+    started = time.perf_counter()
+    with Session(engine) as db:
+        blobs = db.scalars(select(ContentBlob.data)).all()
+        trees = db.scalars(select(Project.elements_tree)).all()
+    elapsed = time.perf_counter() - started
+    logical = sum(len(blob) for blob in blobs)
+    print(f"  {codec:5} {size / 1024 / 1024:7.2f} MB on disk  "
+          f"({logical / 1024 / 1024:.2f} MB of blob text, {len(trees)} trees)  read all {elapsed * 1000:7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=300)
+    parser.add_argument("--codecs", default="none,zlib,zstd")
+    parser.add_argument("--child")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.projects)
+        return
+
+    print(f"{args.projects} projects (SQLite)")
+    for codec in args.codecs.split(","):
+        db_dir = tempfile.mkdtemp(prefix="dragndrop-bench-")
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_dir}/bench.db"}
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.column_compression", "--child", codec, "--projects", str(args.projects)],
+            env=env, check=True
+        )
+
+if __name__ == "__main__":
+    main()
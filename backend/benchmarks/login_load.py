@@ -0,0 +1,130 @@
+"""
+Login storm benchmark: bcrypt on the event loop vs the password executor
+
+Fires concurrent logins (each a ~100-300 ms bcrypt check) through the real
+app while other clients keep reading the project listing, and reports login
+throughput, read latency and event-loop lag, first with hashing inline
+(``PASSWORD_HASH_WORKERS=0``, the old behaviour) and then on the bounded
+password executor. Logins shed with 503 once the executor queue is full are
+counted separately.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.login_load --logins 40 --login-concurrency 20 --readers 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+DB_DIR = tempfile.mkdtemp(prefix="dragndrop-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_DIR}/bench.db")
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.core.auth import create_access_token, get_password_hash, password_executor
+from app.database import Base, engine
+from app.main import app
+from app.models.project import Project
+from app.models.user import User
+
+PASSWORD = "bench-password"
+
+def seed(projects: int):
+    """One user with a real bcrypt hash and a page of projects"""
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password=get_password_hash(PASSWORD)))
+        for i in range(projects):
+            db.add(Project(name=f"Project {i}", user_id=1))
+        db.commit()
+
+def percentile(values, fraction: float) -> float:
+    return sorted(values)[max(int(len(values) * fraction) - 1, 0)] * 1000 if values else 0.0
+
+async def run(client, logins: int, login_concurrency: int, readers: int) -> dict:
+    """Run the storm once and summarize it"""
+    lags, login_times, read_times = [], [], []
+    shed = 0
+    done = asyncio.Event()
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench"})}
+    queue = asyncio.Queue()
+    for _ in range(logins):
+        queue.put_nowait(None)
+
+    async def probe():
+        interval = 0.005
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    async def login():
+        nonlocal shed
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post("/api/v1/auth/login", data={"username": "bench", "password": PASSWORD})
+            if response.status_code == 503:
+                shed += 1
+                continue
+            response.raise_for_status()
+            login_times.append(time.perf_counter() - started)
+
+    async def reader():
+        while not done.is_set():
+            started = time.perf_counter()
+            response = await client.get("/api/v1/projects/", params={"limit": 20}, headers=headers)
+            response.raise_for_status()
+            read_times.append(time.perf_counter() - started)
+
+    background = [asyncio.create_task(probe())] + [asyncio.create_task(reader()) for _ in range(readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(login_concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*background)
+
+    return {
+        "logins_per_s": len(login_times) / elapsed,
+        "login_p50_ms": statistics.median(login_times) * 1000 if login_times else 0.0,
+        "login_p99_ms": percentile(login_times, 0.99),
+        "shed": shed,
+        "reads_per_s": len(read_times) / elapsed,
+        "read_p50_ms": statistics.median(read_times) * 1000 if read_times else 0.0,
+        "read_p99_ms": percentile(read_times, 0.99),
+        "loop_lag_p99_ms": percentile(lags, 0.99),
+        "loop_lag_max_ms": max(lags) * 1000 if lags else 0.0,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-concurrency", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=password_executor.workers or 2)
+    args = parser.parse_args()
+
+    seed(args.projects)
+    print(f"{args.logins} logins ({args.login_concurrency} concurrent) alongside {args.readers} readers "
+          f"(SQLite, max pending {password_executor.max_pending})")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for label, workers in (("bcrypt on the loop", 0), (f"executor ({args.workers} threads)", args.workers)):
+                password_executor.workers = workers
+                stats = await run(client, args.logins, args.login_concurrency, args.readers)
+                print(f"  {label:22} logins {stats['logins_per_s']:6.1f}/s  p50 {stats['login_p50_ms']:7.1f} ms  "
+                      f"p99 {stats['login_p99_ms']:7.1f} ms  shed {stats['shed']:3d} | "
+                      f"reads {stats['reads_per_s']:7.1f}/s  p50 {stats['read_p50_ms']:6.1f} ms  "
+                      f"p99 {stats['read_p99_ms']:7.1f} ms | loop lag p99 {stats['loop_lag_p99_ms']:6.1f} ms  "
+                      f"max {stats['loop_lag_max_ms']:6.1f} ms")
+    password_executor.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Write throughput benchmark for the SQLite production profile
+
+Simulates many editors autosaving their projects at once through
+``PUT /api/v1/projects/{id}`` and reports committed writes per second,
+latency and failed writes ("database is locked"), first with the default
+engine and then with ``SQLITE_PRODUCTION_PROFILE=true``. Each mode runs in
+its own interpreter because the engines are configured at import time.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.sqlite_write_throughput --editors 50 --saves 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def run_mode(args) -> dict:
+    """Run one benchmark pass in this process (settings come from the environment)"""
+    import httpx
+    from sqlalchemy.orm import Session
+
+    from app.core.auth import create_access_token
+    from app.core.metrics import metrics
+    from app.database import Base, engine, async_engine, write_queue
+    from app.main import app
+    from app.models.project import Project
+    from app.models.user import User
+
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        for i in range(args.editors):
+            db.add(User(id=i + 1, username=f"editor{i}", email=f"editor{i}@example.com", hashed_password="-"))
+            db.add(Project(id=i + 1, name=f"Project {i}", user_id=i + 1))
+        db.commit()
+    engine.dispose()
+
+    html = "<section>" + "lorem ipsum " * (args.content_kb * 1024 // 12) + "</section>"
+    latencies, failures = [], 0
+
+    async def editor(client, index):
+        nonlocal failures
+        headers = {"Authorization": "Bearer " + create_access_token({"sub": f"editor{index}"})}
+        for save in range(args.saves):
+            started = time.perf_counter()
+            response = await client.put(
+                f"/api/v1/projects/{index + 1}",
+                json={"html_content": f"{html}<!-- save {save} -->"},
+                headers=headers,
+            )
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    async def main():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(editor(client, i) for i in range(args.editors)))
+            elapsed = time.perf_counter() - started
+        if write_queue is not None:
+            await write_queue.stop()
+        await async_engine.dispose()
+        return elapsed
+
+    elapsed = asyncio.run(main())
+    latencies.sort()
+    counters = metrics.snapshot()["counters"]
+    batches = counters.get("db.writer.batches", 0)
+    return {
+        "writes_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "failed": failures,
+        "writes_per_commit": counters.get("db.writer.writes", 0) / batches if batches else 1.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--editors", type=int, default=50)
+    parser.add_argument("--saves", type=int, default=20)
+    parser.add_argument("--content-kb", type=int, default=16)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args)))
+        return
+
+    print(f"{args.editors} concurrent editors x {args.saves} saves of {args.content_kb} KB")
+    for label, profile in (("default engine", "false"), ("production profile", "true")):
+        db_dir = tempfile.mkdtemp(prefix="dragndrop-bench-")
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{db_dir}/bench.db",
+            SQLITE_PRODUCTION_PROFILE=profile,
+        )
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_write_throughput", "--child",
+             "--editors", str(args.editors), "--saves", str(args.saves),
+             "--content-kb", str(args.content_kb)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        stats = json.loads(output)
+        print(f"  {label:20} {stats['writes_per_s']:8.1f} writes/s  p50 {stats['p50_ms']:7.1f} ms  "
+              f"p99 {stats['p99_ms']:7.1f} ms  failed {stats['failed']:4d}  "
+              f"writes/commit {stats['writes_per_commit']:5.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+CPU cost of bearer-token verification with and without the token cache
+
+Verifies a realistic stream of requests (``--clients`` distinct tokens, each
+reused for many requests) with a full ``jwt.decode`` every time and then
+through ``decode_token``, measuring process CPU time per request. The saving
+is then scaled to the request rates given with ``--rates``.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.token_cache --clients 200 --requests 50000 --rates 100 1000 5000
+"""
+
+import argparse
+import time
+
+from jose import jwt
+
+from app.core.auth import create_access_token, decode_token, token_cache
+from app.core.config import settings
+
+def cpu_per_request(verify, tokens, requests: int) -> float:
+    """Process CPU seconds per verification, cycling through ``tokens``"""
+    started = time.process_time()
+    for i in range(requests):
+        assert verify(tokens[i % len(tokens)]) is not None
+    return (time.process_time() - started) / requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--rates", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"user{i}"}) for i in range(args.clients)]
+    token_cache.clear()
+
+    uncached = cpu_per_request(
+        lambda token: jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]), tokens, args.requests
+    )
+    cached = cpu_per_request(decode_token, tokens, args.requests)
+    saved = uncached - cached
+
+    print(f"{args.requests} requests over {args.clients} tokens ({settings.ALGORITHM}, cache size {token_cache.maxsize})")
+    print(f"  jwt.decode every request  {uncached * 1e6:8.1f} us CPU/request")
+    print(f"  token cache               {cached * 1e6:8.1f} us CPU/request  (hit rate {token_cache.stats()['hit_rate']:.1%})")
+    for rate in args.rates:
+        print(f"  at {rate:6d} req/s: {saved * rate * 1000:8.1f} ms CPU saved per second ({saved * rate:.1%} of a core)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Element tree encodings: size and encode/decode time on large trees
+
+Builds a realistic editor tree (nested sections, props, styles, text) and
+compares JSON text with the binary tree encoding, raw and compressed. The
+"lazy load" column is what reading a row costs while the handler does not
+touch the tree: decompressing the payload and wrapping it in a LazyTree.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.tree_encoding --nodes 5000 --repeat 20
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.core.compression import compress, decompress
+from app.core.treecodec import LazyTree, decode_tree, encode_tree
+
+TYPES = ["section", "div", "p", "h2", "img", "button", "a", "span", "ul", "li"]
+
+def build_tree(nodes: int) -> dict:
+    """A tree shaped like the editor's: wide near the root, nested below"""
+    random.seed(nodes)
+    root = {"id": "root", "type": "body", "props": {"className": "page"}, "styles": {}, "children": []}
+    created = [root]
+    for i in range(nodes):
+        kind = random.choice(TYPES)
+        node = {
+            "id": f"el-{i:05d}",
+            "type": kind,
+            "props": {"className": f"block block-{i % 12}", "dataset": {"index": i}},
+            "styles": {"padding": f"{i % 24}px", "margin": "0 auto", "color": random.choice(["#333", "#fff", "#0a84ff"])},
+            "locked": False,
+            "hidden": i % 50 == 0,
+            "position": {"x": round(random.random() * 1200, 2), "y": i * 12},
+            "children": [],
+        }
+        if kind in ("p", "h2", "a", "button", "span", "li"):
+            node["text"] = f"Content for element {i}"
+        if kind == "img":
+            node["props"]["src"] = f"/assets/image-{i}.webp"
+        parent = random.choice(created[-40:]) if len(created) > 20 else root
+        parent["children"].append(node)
+        created.append(node)
+    return root
+
+def timed(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tree = build_tree(args.nodes)
+    codecs = {
+        "json": (lambda value: json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), json.loads),
+        "binary": (encode_tree, decode_tree),
+    }
+    print(f"{args.nodes}-node tree, mean of {args.repeat} runs")
+    for name, (encode, decode) in codecs.items():
+        payload = encode(tree)
+        assert decode(payload) == tree
+        stored = {codec: compress(payload, codec, threshold=0) for codec in ("zlib", "zstd")}
+        encode_ms = timed(lambda: encode(tree), args.repeat)
+        decode_ms = timed(lambda: decode(payload), args.repeat)
+        lazy_ms = timed(lambda: LazyTree.load(decompress(stored["zlib"])), args.repeat)
+        print(f"  {name:6} {len(payload) / 1024:7.1f} KB raw  {len(stored['zlib']) / 1024:6.1f} KB zlib  "
+              f"{len(stored['zstd']) / 1024:6.1f} KB zstd  encode {encode_ms:6.2f} ms  decode {decode_ms:6.2f} ms  "
+              f"lazy load {lazy_ms:5.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Version history storage: compression ratio and reconstruct latency
+
+Snapshots one project many times with small edits between versions (the
+autosave pattern), once per keyframe interval, and reports:
+
+* stored bytes against full copies (interval 1 is the old full-copy layout)
+* reconstruct latency of every version, overall and by chain depth
+
+Usage (from the backend directory):
+
+    python -m benchmarks.version_storage --versions 200 --intervals 1,10,20,50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_DIR = tempfile.mkdtemp(prefix="dragndrop-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_DIR}/bench.db")
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.versions import encode_version, pack_fields, reconstruct_fields
+from app.database import AsyncSessionLocal, Base, async_engine
+from app.models.project import Project, ProjectVersion
+from app.models.user import User
+
+def history(versions: int, nodes: int):
+    """Yield the content of successive versions of one page"""
+    random.seed(versions)
+    sections = [
+        f"<section id='s{i}' class='block'>\n  <h2>Section {i}</h2>\n  <p>{'lorem ipsum ' * 8}</p>\n</section>"
+        for i in range(nodes)
+    ]
+    styles = [f".block-{i} {{ padding: {i % 16}px; color: #{i * 2654435761 % 0xFFFFFF:06x}; }}" for i in range(nodes // 2)]
+    tree = {"id": "root", "children": [{"id": f"s{i}", "tag": "section", "props": {"class": "block"}} for i in range(nodes)]}
+    for number in range(versions):
+        for _ in range(3):
+            i = random.randrange(nodes)
+            sections[i] = sections[i].replace("</h2>", f" v{number}</h2>", 1)
+            tree["children"][i]["props"]["title"] = f"v{number}"
+        styles[random.randrange(len(styles))] += f" /* v{number} */"
+        yield {
+            "html_content": "\n".join(sections),
+            "css_content": "\n".join(styles),
+            "js_content": "document.querySelectorAll('.block').forEach(b => b.hidden = false);",
+            "elements_tree": tree,
+        }
+
+async def run(project_id: int, interval: int, versions: int, nodes: int) -> dict:
+    settings.VERSION_KEYFRAME_INTERVAL = interval
+    previous = previous_fields = None
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for number, content in enumerate(history(versions, nodes), start=1):
+            fields = pack_fields(content)
+            version = ProjectVersion(project_id=project_id, version_number=number)
+            await encode_version(db, version, fields, previous, previous_fields)
+            db.add(version)
+            previous, previous_fields = version, fields
+        await db.commit()
+    encode_seconds = time.perf_counter() - started
+
+    latencies = {}
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(ProjectVersion).where(ProjectVersion.project_id == project_id))
+        rows = result.scalars().all()
+        for version in rows:
+            started = time.perf_counter()
+            await reconstruct_fields(db, version)
+            latencies.setdefault(version.chain_depth, []).append(time.perf_counter() - started)
+    logical = sum(row.content_size for row in rows)
+    stored = sum(row.stored_size for row in rows)
+    every = sorted(latency for values in latencies.values() for latency in values)
+    return {
+        "logical": logical,
+        "stored": stored,
+        "encode_ms": encode_seconds / versions * 1000,
+        "p50_ms": statistics.median(every) * 1000,
+        "p99_ms": every[int(len(every) * 0.99) - 1] * 1000,
+        "by_depth": {depth: statistics.median(values) * 1000 for depth, values in sorted(latencies.items())},
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--versions", type=int, default=200)
+    parser.add_argument("--nodes", type=int, default=300)
+    parser.add_argument("--intervals", default="1,10,20,50")
+    args = parser.parse_args()
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="-"))
+        for interval in args.intervals.split(","):
+            db.add(Project(id=int(interval), name=f"Interval {interval}", user_id=1))
+        await db.commit()
+
+    sample = pack_fields(next(history(1, args.nodes)))
+    print(f"{args.versions} versions of a {sum(len(f) for f in sample) // 1024} KB page, 3-4 edits per version (SQLite)")
+    for interval in args.intervals.split(","):
+        stats = await run(int(interval), int(interval), args.versions, args.nodes)
+        depths = stats["by_depth"]
+        deepest = max(depths)
+        print(f"  keyframe every {interval:>3}: {stats['stored'] / 1024:9.1f} KB stored "
+              f"({stats['logical'] / stats['stored']:5.1f}x)  encode {stats['encode_ms']:6.2f} ms/version  "
+              f"reconstruct p50 {stats['p50_ms']:6.2f} ms  p99 {stats['p99_ms']:6.2f} ms  "
+              f"depth 0 {depths[0]:5.2f} ms  depth {deepest} {depths[deepest]:5.2f} ms")
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,19 +10,18 @@ import uvicorn
 import os
 
 from app.core.config import settings
-from app.database import engine, Base
-from app.routers import auth, users, projects, templates, components
+from app.main import lifespan
+from app.routers import auth, users, projects, templates, components, admin
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize FastAPI app
+# Initialize FastAPI app (the lifespan creates the tables and runs the
+# write queue, autosave buffer and background jobs, as in app.main)
 app = FastAPI(
     title="DragNDrop HTML Editor API",
     description="Backend API for the visual HTML editor",
     version="1.0.0",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -40,6 +39,7 @@ app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(projects.router, prefix="/api/v1/projects", tags=["Projects"])
 app.include_router(templates.router, prefix="/api/v1/templates", tags=["Templates"])
 app.include_router(components.router, prefix="/api/v1/components", tags=["Components"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 
 # Health check endpoint
 @app.get("/api/v1/health")
@@ -0,0 +1,74 @@
+"""
+Shared fixtures: the API running against a throwaway SQLite database
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Must be configured before the app (and its engines) are imported
+TEST_DB_DIR = tempfile.mkdtemp(prefix="dragndrop-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB_DIR}/test.db"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.auth import create_access_token, principal_cache, revoked_tokens, token_cache
+from app.core.api_keys import key_usage
+from app.core.sessions import revoked_sessions
+from app.database import Base, async_engine, engine, writer_engine
+from app.main import app
+
+@contextmanager
+def recording_statements(keep=lambda statement: True):
+    """Collect the (statement, parameters) the API executes while the block runs
+
+    Listens on the request engine and, with the SQLite production profile,
+    on the writer engine that queued writes go through.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if keep(statement):
+            statements.append((statement, parameters))
+
+    engines = [async_engine.sync_engine]
+    if writer_engine is not None:
+        engines.append(writer_engine.sync_engine)
+    for bound_engine in engines:
+        event.listen(bound_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for bound_engine in engines:
+            event.remove(bound_engine, "before_cursor_execute", record)
+
+def record_statements(client, call):
+    """Run ``call()``, returning its result and the SQL statements it executed"""
+    with recording_statements() as statements:
+        response = call()
+    return response, [statement for statement, _ in statements]
+
+@pytest.fixture
+def client():
+    """Test client on a freshly created schema"""
+    Base.metadata.drop_all(bind=engine)
+    principal_cache.clear()
+    token_cache.clear()
+    revoked_tokens.clear()
+    revoked_sessions.clear()
+    key_usage.take()
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth_headers(client):
+    """Register a user and return bearer headers for it"""
+    response = client.post("/api/v1/auth/register", json={
+        "username": "editor",
+        "email": "editor@example.com",
+        "password": "secret-password",
+    })
+    assert response.status_code == 201
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'editor'})}"}
@@ -0,0 +1,85 @@
+"""
+API keys: prefix lookup plus HMAC, scopes, revocation and batched last-used times
+"""
+
+from app.core.api_keys import flush_key_usage, key_usage
+from app.core.metrics import metrics
+from app.database import AsyncSessionLocal, run_write
+from tests.conftest import record_statements
+
+def create_key(client, headers, **fields):
+    response = client.post("/api/v1/users/me/api-keys", json={"name": "ci", **fields}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def key_headers(created):
+    return {"Authorization": f"Bearer {created['key']}"}
+
+def test_key_authenticates_with_one_lookup(client, auth_headers):
+    created = create_key(client, auth_headers, scopes=["projects:read", "projects:write"])
+    assert created["key"].startswith(f"dnd_{created['prefix']}_")
+    assert created["scopes"] == ["projects:read", "projects:write"]
+
+    metrics.reset()
+    response, statements = record_statements(client, lambda: client.post(
+        "/api/v1/projects/", json={"name": "From CI"}, headers=key_headers(created)
+    ))
+    assert response.status_code == 201
+    lookups = [statement for statement in statements if "FROM api_keys" in statement]
+    assert len(lookups) == 1 and "api_keys.prefix = " in lookups[0]
+    assert metrics.snapshot()["counters"]["auth.api_keys.accepted"] == 1
+    assert client.get("/api/v1/projects/", headers=key_headers(created)).json()[0]["name"] == "From CI"
+    assert client.get("/api/v1/users/me", headers=key_headers(created)).json()["username"] == "editor"
+
+    listed = client.get("/api/v1/users/me/api-keys", headers=auth_headers).json()
+    assert [key["prefix"] for key in listed] == [created["prefix"]]
+    assert "key" not in listed[0]
+
+def test_wrong_secret_and_unknown_prefix_are_rejected(client, auth_headers):
+    created = create_key(client, auth_headers)
+    tampered = created["key"][:-4] + ("AAAA" if not created["key"].endswith("AAAA") else "BBBB")
+    for token in (tampered, "dnd_000000000000_secret", "dnd_", "dnd_x"):
+        response = client.get("/api/v1/projects/", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+def test_scopes_are_enforced(client, auth_headers):
+    read_only = create_key(client, auth_headers)
+    assert client.get("/api/v1/projects/", headers=key_headers(read_only)).status_code == 200
+    denied = client.post("/api/v1/projects/", json={"name": "P"}, headers=key_headers(read_only))
+    assert denied.status_code == 403
+    assert "projects:write" in denied.json()["detail"]
+    assert client.put("/api/v1/users/me", json={"bio": "x"}, headers=key_headers(read_only)).status_code == 403
+    assert client.get("/api/v1/users/me/api-keys", headers=key_headers(read_only)).status_code == 403
+    assert client.get("/api/v1/admin/metrics", headers=key_headers(read_only)).status_code == 403
+
+    # Keys cannot hand out more than their creator has, and only admins grant admin
+    account = create_key(client, auth_headers, scopes=["account", "projects:read"])
+    assert client.post("/api/v1/users/me/api-keys", json={"name": "x", "scopes": ["projects:write"]}, headers=key_headers(account)).status_code == 403
+    assert create_key(client, key_headers(account), scopes=["projects:read"])["scopes"] == ["projects:read"]
+    assert client.post("/api/v1/users/me/api-keys", json={"name": "x", "scopes": ["admin"]}, headers=auth_headers).status_code == 403
+    assert client.post("/api/v1/users/me/api-keys", json={"name": "x", "scopes": ["everything"]}, headers=auth_headers).status_code == 422
+
+def test_revoked_expired_and_deactivated_keys_stop_working(client, auth_headers):
+    revoked = create_key(client, auth_headers)
+    assert client.delete(f"/api/v1/users/me/api-keys/{revoked['id']}", headers=auth_headers).status_code == 204
+    assert client.get("/api/v1/projects/", headers=key_headers(revoked)).status_code == 401
+    assert client.delete(f"/api/v1/users/me/api-keys/{revoked['id']}", headers=auth_headers).status_code == 404
+
+    other = create_key(client, auth_headers, scopes=["account", "projects:read"])
+    assert client.delete("/api/v1/users/me", headers=key_headers(other)).status_code == 204
+    assert client.get("/api/v1/projects/", headers=key_headers(other)).status_code == 401
+
+def test_last_used_is_written_in_batches(client, auth_headers):
+    first, second = create_key(client, auth_headers), create_key(client, auth_headers)
+    for created in (first, second, first):
+        client.get("/api/v1/projects/", headers=key_headers(created))
+    assert len(key_usage) == 2
+    assert all(key["last_used_at"] is None for key in client.get("/api/v1/users/me/api-keys", headers=auth_headers).json())
+
+    async def flush():
+        async with AsyncSessionLocal() as db:
+            return await run_write(db, flush_key_usage)
+
+    assert client.portal.call(flush) == 2
+    assert len(key_usage) == 0
+    assert all(key["last_used_at"] is not None for key in client.get("/api/v1/users/me/api-keys", headers=auth_headers).json())
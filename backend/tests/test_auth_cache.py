@@ -0,0 +1,50 @@
+"""
+Authenticated-user cache: one lookup per subject, invalidated on change
+"""
+
+import time
+
+from app.core.cache import LRUCache
+from app.core.metrics import metrics
+from tests.conftest import record_statements
+
+def user_lookups(statements):
+    return [statement for statement in statements if "FROM users" in statement]
+
+def test_requests_reuse_the_cached_user(client, auth_headers):
+    metrics.reset()
+    response, statements = record_statements(client, lambda: [
+        client.get("/api/v1/users/me", headers=auth_headers),
+        client.get("/api/v1/projects/", headers=auth_headers),
+        client.post("/api/v1/projects/", json={"name": "P"}, headers=auth_headers),
+    ])
+    assert all(each.status_code in (200, 201) for each in response)
+    assert len(user_lookups(statements)) == 1
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["cache.auth.principals.hits"] == 2
+    assert snapshot["counters"]["cache.auth.principals.misses"] == 1
+    assert snapshot["gauges"]["cache.auth.principals"]["size"] == 1
+
+def test_profile_updates_and_deactivation_invalidate(client, auth_headers):
+    client.get("/api/v1/users/me", headers=auth_headers)
+    updated = client.put("/api/v1/users/me", json={"bio": "Designer"}, headers=auth_headers)
+    assert updated.json()["bio"] == "Designer"
+    assert client.get("/api/v1/users/me", headers=auth_headers).json()["bio"] == "Designer"
+
+    assert client.delete("/api/v1/users/me", headers=auth_headers).status_code == 204
+    assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 401
+    assert client.get("/api/v1/projects/", headers=auth_headers).status_code == 401
+
+def test_ttl_expires_entries():
+    cache = LRUCache("test.ttl", maxsize=2, ttl=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["hit_rate"] == 0.5
+
+    cache.ttl = None
+    for key in "abc":
+        cache.put(key, key)
+    assert cache.get("a") is None and cache.get("c") == "c"
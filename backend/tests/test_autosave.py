@@ -0,0 +1,183 @@
+"""
+Write-behind autosave: coalescing, reads of unwritten saves, flushing
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth import create_access_token
+from app.core.autosave import AutosaveBuffer, autosave_buffer
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.project import Project
+
+@pytest.fixture
+def held_saves(client, monkeypatch):
+    """Keep the background flush from writing anything during the test"""
+    monkeypatch.setattr(autosave_buffer, "interval", 3600.0)
+    monkeypatch.setattr(autosave_buffer, "idle", 3600.0)
+    yield autosave_buffer
+
+def stored(project_id):
+    with SessionLocal() as db:
+        project = db.get(Project, project_id)
+        return project.name, project.revision
+
+def test_saves_coalesce_and_are_read_back(client, auth_headers, held_saves):
+    project = client.post("/api/v1/projects/", json={"name": "Draft", "html_content": "<p>0</p>"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    metrics.reset()
+
+    for i in range(1, 4):
+        response = client.put(f"{url}/autosave", json={"html_content": f"<p>{i}</p>"}, headers=auth_headers)
+        assert response.status_code == 202
+    response = client.put(f"{url}/autosave", json={"name": "Final"}, headers=auth_headers).json()
+    assert response == {"project_id": project["id"], "pending_writes": 4, "pending_fields": ["html_content", "name"]}
+    assert stored(project["id"]) == ("Draft", 1)
+
+    # Reads see the buffer, and so does revalidation
+    detail = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert detail.status_code == 200
+    assert (detail.json()["name"], detail.json()["html_content"]) == ("Final", "<p>3</p>")
+    assert client.get(url, headers={**auth_headers, "If-None-Match": detail.headers["ETag"]}).status_code == 304
+
+    assert client.portal.call(held_saves.flush_all) == 1
+    assert stored(project["id"]) == ("Final", 2)
+    after = client.get(url, headers=auth_headers)
+    assert after.json()["html_content"] == "<p>3</p>"
+    assert after.headers["ETag"] not in (etag, detail.headers["ETag"])
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["autosave.writes"] == 4
+    assert snapshot["counters"]["autosave.coalesced"] == 3
+    assert snapshot["counters"]["autosave.flushed"] == 1
+    assert snapshot["timings"]["autosave.flush"]["count"] == 1
+    assert snapshot["gauges"]["autosave"]["pending_projects"] == 0
+
+def test_direct_writes_go_after_buffered_saves(client, auth_headers, held_saves):
+    project = client.post("/api/v1/projects/", json={"name": "Draft"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    client.put(f"{url}/autosave", json={"name": "Autosaved", "css_content": "p {}"}, headers=auth_headers)
+
+    updated = client.put(url, json={"name": "Saved"}, headers=auth_headers).json()
+    assert updated["revision"] == 3
+    detail = client.get(url, headers=auth_headers).json()
+    assert (detail["name"], detail["css_content"]) == ("Saved", "p {}")
+
+    # Snapshots include buffered saves; deleting drops them
+    client.put(f"{url}/autosave", json={"css_content": "p { margin: 0; }"}, headers=auth_headers)
+    client.post(f"{url}/versions", json={}, headers=auth_headers)
+    assert client.get(f"{url}/versions/1", headers=auth_headers).json()["css_content"] == "p { margin: 0; }"
+    client.put(f"{url}/autosave", json={"name": "Gone"}, headers=auth_headers)
+    assert client.delete(url, headers=auth_headers).status_code == 204
+    assert held_saves.view(project["id"]) is None
+
+def test_conditional_writes_accept_the_etag_shown_with_buffered_saves(client, auth_headers, held_saves):
+    project = client.post("/api/v1/projects/", json={"name": "Draft"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    client.put(f"{url}/autosave", json={"css_content": "p {}"}, headers=auth_headers)
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+    updated = client.put(url, json={"name": "Saved"}, headers={**auth_headers, "If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["revision"] == 3
+
+    # Also once the background flush has written the saves the GET showed
+    client.put(f"{url}/autosave", json={"css_content": "p { margin: 0; }"}, headers=auth_headers)
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    client.portal.call(held_saves.flush_all)
+    patched = client.patch(url, json={"base_revision": 4, "css_content": [{"offset": 0, "insert": "/**/"}]},
+                           headers={**auth_headers, "If-Match": etag})
+    assert patched.status_code == 200
+
+    # An ETag from before a later autosave is still stale
+    client.put(f"{url}/autosave", json={"name": "One"}, headers=auth_headers)
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    client.put(f"{url}/autosave", json={"name": "Two"}, headers=auth_headers)
+    assert client.put(url, json={"name": "Late"}, headers={**auth_headers, "If-Match": etag}).status_code == 412
+    assert client.get(url, headers=auth_headers).json()["name"] == "Two"
+
+def test_a_rejected_save_does_not_hold_up_others(client, auth_headers, held_saves, monkeypatch):
+    monkeypatch.setattr(settings, "AUTOSAVE_MAX_FAILURES", 2)
+    broken = client.post("/api/v1/projects/", json={"name": "Broken"}, headers=auth_headers).json()
+    healthy = client.post("/api/v1/projects/", json={"name": "Healthy"}, headers=auth_headers).json()
+    metrics.reset()
+
+    # Explicit nulls for required fields are refused up front...
+    response = client.put(f"/api/v1/projects/{broken['id']}/autosave", json={"name": None}, headers=auth_headers)
+    assert response.status_code == 422
+    # ... and a save the database rejects anyway only fails itself
+    held_saves.put(broken["id"], broken["user_id"], {"name": None})
+    client.put(f"/api/v1/projects/{healthy['id']}/autosave", json={"name": "Saved"}, headers=auth_headers)
+    assert client.portal.call(held_saves.flush_all) == 1
+    assert stored(healthy["id"]) == ("Saved", 2)
+    assert held_saves.view(broken["id"])[0] == {"name": None}
+
+    # Dropped after AUTOSAVE_MAX_FAILURES attempts, and shutdown still succeeds
+    client.put(f"/api/v1/projects/{healthy['id']}/autosave", json={"name": "Again"}, headers=auth_headers)
+    client.portal.call(held_saves.stop)
+    assert held_saves.view(broken["id"]) is None
+    assert stored(broken["id"]) == ("Broken", 1)
+    assert stored(healthy["id"]) == ("Again", 3)
+    counters = metrics.snapshot()["counters"]
+    assert (counters["autosave.failures"], counters["autosave.dropped"]) == (2, 1)
+
+def test_listings_show_buffered_saves(client, auth_headers, held_saves):
+    older = client.post("/api/v1/projects/", json={"name": "Older", "is_public": True, "category": "blog"}, headers=auth_headers).json()
+    client.post("/api/v1/projects/", json={"name": "Newer", "is_public": True, "category": "blog"}, headers=auth_headers)
+    client.put(f"/api/v1/projects/{older['id']}/autosave", json={"name": "Renamed", "category": "shop"}, headers=auth_headers)
+
+    # Public listings overlay the buffer without writing it
+    public = client.get("/api/v1/projects/public").json()
+    assert [project["name"] for project in public] == ["Newer", "Renamed"]
+    assert public[1]["category"] == "shop"
+    assert [project["name"] for project in client.get("/api/v1/projects/public", params={"category": "blog"}).json()] == ["Newer"]
+    assert stored(older["id"]) == ("Older", 1)
+
+    # The owner's listing writes the owner's saves first: filters and order see them
+    own = client.get("/api/v1/projects/", headers=auth_headers).json()
+    assert [project["name"] for project in own] == ["Renamed", "Newer"]
+    assert [project["name"] for project in client.get("/api/v1/projects/", params={"category": "shop"}, headers=auth_headers).json()] == ["Renamed"]
+    assert stored(older["id"]) == ("Renamed", 2)
+
+def test_autosave_checks_ownership(client, auth_headers, held_saves):
+    assert client.put("/api/v1/projects/999/autosave", json={"name": "x"}, headers=auth_headers).status_code == 404
+    assert client.put("/api/v1/projects/999/autosave", json={"name": "x"}).status_code == 403
+
+def test_saves_are_written_on_shutdown(client, auth_headers, held_saves):
+    project = client.post("/api/v1/projects/", json={"name": "Draft"}, headers=auth_headers).json()
+    client.put(f"/api/v1/projects/{project['id']}/autosave", json={"name": "Kept"}, headers=auth_headers)
+    client.portal.call(held_saves.stop)
+    assert stored(project["id"]) == ("Kept", 2)
+
+def test_flush_schedule():
+    buffer = AutosaveBuffer(interval=10, idle=2)
+    first = buffer.put(1, 1, {"name": "a"})
+    buffer.put(2, 1, {"name": "b"})
+    start = first.first_at
+    assert buffer.due(start + 1) == []
+    assert buffer.due(start + 2.5) == [1, 2]
+
+    # A project saved continuously is still written once the interval is up
+    buffer.put(1, 1, {"name": "c"}).last_at = start + 9.5
+    buffer.discard(2)
+    assert buffer.due(start + 10) == [1]
+    assert buffer.due(start + 9.6) == []
+    assert buffer.view(1)[0] == {"name": "c"}
+
+def test_second_entrypoint_runs_the_lifespan(monkeypatch):
+    import main
+
+    monkeypatch.setattr(autosave_buffer, "interval", 3600.0)
+    with TestClient(main.app) as client:
+        assert autosave_buffer._task is not None and not autosave_buffer._task.done()
+        client.post("/api/v1/auth/register", json={
+            "username": "entrypoint", "email": "entrypoint@example.com", "password": "secret-password",
+        })
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'entrypoint'})}"}
+        project = client.post("/api/v1/projects/", json={"name": "Draft"}, headers=headers).json()
+        client.put(f"/api/v1/projects/{project['id']}/autosave", json={"name": "Kept"}, headers=headers)
+    # Shutting down wrote the buffer
+    assert stored(project["id"]) == ("Kept", 2)
@@ -0,0 +1,71 @@
+"""
+Content-addressed blob storage for project HTML/CSS/JS
+"""
+
+import io
+import json
+import zipfile
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.blob import ContentBlob
+
+def count_blobs():
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(ContentBlob))
+
+def test_duplicates_and_versions_share_blobs(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={
+        "name": "Shop",
+        "html_content": "<main>shop</main>",
+        "css_content": "main { color: red; }",
+        "js_content": "console.log('shop');",
+    }, headers=auth_headers).json()
+    assert count_blobs() == 3
+
+    client.post(f"/api/v1/projects/{project['id']}/duplicate", headers=auth_headers)
+    client.post(f"/api/v1/projects/{project['id']}/versions", json={}, headers=auth_headers)
+    client.post("/api/v1/projects/", json={"name": "Other", "css_content": "main { color: red; }"}, headers=auth_headers)
+    assert count_blobs() == 3
+
+    client.put(f"/api/v1/projects/{project['id']}", json={"html_content": "<main>new</main>"}, headers=auth_headers)
+    assert count_blobs() == 4
+
+def test_detail_streams_content_larger_than_a_chunk(client, auth_headers):
+    html = "<p>ñandú €</p>" * 20000  # multi-byte characters across chunk boundaries
+    project = client.post("/api/v1/projects/", json={
+        "name": "Big",
+        "html_content": html,
+        "elements_tree": {"id": "root", "children": [{"id": "p1"}]},
+    }, headers=auth_headers).json()
+
+    response = client.get(f"/api/v1/projects/{project['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    detail = response.json()
+    assert detail["html_content"] == html
+    assert detail["css_content"] is None
+    assert detail["elements_tree"] == {"id": "root", "children": [{"id": "p1"}]}
+    assert detail["name"] == "Big"
+
+def test_export_formats(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={
+        "name": "Landing <1>",
+        "html_content": "<h1>\"Hola\"</h1>",
+        "css_content": "h1 { margin: 0; }",
+        "js_content": "alert(1);",
+    }, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}/export"
+
+    page = client.post(url, json={"format": "html"}, headers=auth_headers)
+    assert page.headers["content-type"].startswith("text/html")
+    assert "<title>Landing &lt;1&gt;</title>" in page.text
+    assert "h1 { margin: 0; }" in page.text and "<h1>\"Hola\"</h1>" in page.text and "alert(1);" in page.text
+
+    archive = zipfile.ZipFile(io.BytesIO(client.post(url, json={"format": "zip"}, headers=auth_headers).content))
+    assert archive.read("index.html").decode() == "<h1>\"Hola\"</h1>"
+    assert archive.read("styles.css").decode() == "h1 { margin: 0; }"
+    assert json.loads(archive.read("project.json"))["name"] == "Landing <1>"
+
+    exported = client.post(url, json={"format": "json"}, headers=auth_headers).json()
+    assert exported == client.get(f"/api/v1/projects/{project['id']}", headers=auth_headers).json()
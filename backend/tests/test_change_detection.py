@@ -0,0 +1,54 @@
+"""
+No-op saves: unchanged fields are detected by hash and not written
+"""
+
+from app.core.blobs import json_hash
+from tests.conftest import record_statements
+
+def test_unchanged_saves_do_not_write(client, auth_headers):
+    tree = {"id": "root", "children": [{"id": "title", "text": "Hi"}]}
+    project = client.post("/api/v1/projects/", json={
+        "name": "Same", "html_content": "<h1>Hi</h1>", "elements_tree": tree, "canvas_settings": {"width": "100%"},
+    }, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+
+    resubmitted = {
+        "name": "Same", "html_content": "<h1>Hi</h1>", "css_content": None,
+        "elements_tree": {"children": [{"text": "Hi", "id": "title"}], "id": "root"},
+        "canvas_settings": {"width": "100%"},
+    }
+    response, statements = record_statements(client, lambda: client.put(url, json=resubmitted, headers=auth_headers))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["changed_fields"] == []
+    assert (body["revision"], body["updated_at"]) == (1, project["updated_at"])
+    assert not any(statement.lstrip().upper().startswith(("UPDATE", "INSERT")) for statement in statements)
+    stored = client.get(url, headers=auth_headers)
+    assert (stored.json()["revision"], stored.json()["updated_at"]) == (1, project["updated_at"])
+    assert response.headers["ETag"] == stored.headers["ETag"]
+
+    changed = client.put(url, json={**resubmitted, "css_content": "h1 {}", "name": "Same"}, headers=auth_headers).json()
+    assert changed["changed_fields"] == ["css_content"]
+    assert changed["revision"] == 2
+    changed = client.put(url, json={"elements_tree": {"id": "root"}, "is_public": False}, headers=auth_headers).json()
+    assert changed["changed_fields"] == ["elements_tree"]
+    assert client.get(url, headers=auth_headers).json()["elements_tree"] == {"id": "root"}
+
+def test_hashes_follow_every_writer(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={"name": "Tree", "elements_tree": {"id": "a"}}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    client.post(f"{url}/versions", json={}, headers=auth_headers)
+    client.patch(url, json={"base_revision": 1, "elements_tree": [{"op": "add", "path": "/x", "value": 1}]}, headers=auth_headers)
+    assert client.put(url, json={"elements_tree": {"id": "a", "x": 1}}, headers=auth_headers).json()["changed_fields"] == []
+
+    # After a restore the tree is back to version 1, so saving the patched tree again is a change
+    client.post(f"{url}/versions/1/restore", headers=auth_headers)
+    assert client.put(url, json={"elements_tree": {"id": "a", "x": 1}}, headers=auth_headers).json()["changed_fields"] == ["elements_tree"]
+    copy = client.post(f"{url}/duplicate", headers=auth_headers).json()
+    unchanged = client.put(f"/api/v1/projects/{copy['id']}", json={"elements_tree": {"x": 1, "id": "a"}}, headers=auth_headers)
+    assert unchanged.json()["changed_fields"] == []
+
+def test_json_hash_is_canonical():
+    assert json_hash({"a": 1, "b": [1, {"c": "ñ"}]}) == json_hash({"b": [1, {"c": "ñ"}], "a": 1})
+    assert json_hash({"a": 1}) != json_hash({"a": "1"})
+    assert json_hash(None) != json_hash({})
@@ -0,0 +1,62 @@
+"""
+Transparent column compression
+"""
+
+import random
+
+import pytest
+from sqlalchemy import select, text
+
+from app.core.compression import FORMAT_RAW, FORMAT_ZLIB, FORMAT_ZSTD, compress, decompress
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.blob import ContentBlob
+
+@pytest.mark.parametrize("codec, header", [("none", FORMAT_RAW), ("zlib", FORMAT_ZLIB), ("zstd", FORMAT_ZSTD)])
+def test_round_trip_with_header(codec, header):
+    data = "<li class='item'>ñandú</li>\n".encode("utf-8") * 200
+    stored = compress(data, codec)
+    assert stored[0] == header
+    assert decompress(stored) == data
+    if codec != "none":
+        assert len(stored) < len(data) / 10
+
+def test_small_and_legacy_values():
+    assert compress(b"<p>hi</p>", "zlib") == bytes([FORMAT_RAW]) + b"<p>hi</p>"
+    # Rows written before compression have no header and read back unchanged
+    assert decompress(b'{"id": "root"}') == b'{"id": "root"}'
+    assert decompress('{"id": "root"}') == b'{"id": "root"}'
+    assert decompress(b"") == b""
+
+def test_columns_are_stored_compressed(client, auth_headers):
+    html = "<section><p>repeated markup</p></section>\n" * 2000
+    tree = {"id": "root", "children": [{"id": f"n{i}", "tag": "p"} for i in range(500)]}
+    project = client.post("/api/v1/projects/", json={
+        "name": "Compressed", "html_content": html, "elements_tree": tree,
+    }, headers=auth_headers).json()
+
+    with SessionLocal() as db:
+        stored_html, size = db.execute(text("SELECT data, size FROM content_blobs")).one()
+        stored_tree = db.execute(text("SELECT elements_tree FROM projects")).scalar_one()
+        assert db.scalar(select(ContentBlob.data)).decode("utf-8") == html
+    assert size == len(html)
+    assert stored_html[0] == FORMAT_ZLIB and len(stored_html) < size / 20
+    assert stored_tree[0] == FORMAT_ZLIB
+
+    detail = client.get(f"/api/v1/projects/{project['id']}", headers=auth_headers).json()
+    assert detail["html_content"] == html
+    assert detail["elements_tree"] == tree
+
+def test_detail_streams_compressed_blob_across_chunks(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "CONTENT_COMPRESSION", "zstd")
+    random.seed(9)
+    words = ["ñandú", "grid", "flex", "€", "<div>", "</div>", "margin", "hero"]
+    html = " ".join(random.choice(words) + str(random.randrange(1000)) for _ in range(60000))
+    project = client.post("/api/v1/projects/", json={"name": "Noisy", "html_content": html}, headers=auth_headers).json()
+
+    with SessionLocal() as db:
+        stored = db.execute(text("SELECT data FROM content_blobs")).scalar_one()
+    assert stored[0] == FORMAT_ZSTD and len(stored) > 64 * 1024
+
+    detail = client.get(f"/api/v1/projects/{project['id']}", headers=auth_headers).json()
+    assert detail["html_content"] == html
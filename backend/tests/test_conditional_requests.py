@@ -0,0 +1,150 @@
+"""
+ETags, preconditions and conditional GETs (projects, templates, components)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import update
+
+from app.core.conditional import etag_matches
+from app.routers import projects
+from app.database import SessionLocal, write_queue
+from app.models.project import Project
+from tests.conftest import record_statements
+
+def test_etag_matching():
+    assert etag_matches('"1-2"', '"1-2"')
+    assert etag_matches('"0-1", "1-2"', '"1-2"')
+    assert etag_matches("*", '"1-2"')
+    assert not etag_matches('W/"1-2"', '"1-2"')
+    assert etag_matches('W/"1-2"', '"1-2"', weak=True)
+    assert not etag_matches(None, '"1-2"')
+
+def test_writes_require_the_current_etag(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={"name": "Shared", "html_content": "<p>a</p>"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+    first = client.put(url, json={"html_content": "<p>tab one</p>"}, headers={**auth_headers, "If-Match": etag})
+    assert first.status_code == 200
+    assert first.headers["ETag"] != etag
+    assert first.headers["ETag"] == client.get(url, headers=auth_headers).headers["ETag"]
+
+    # The second tab still holds the old ETag: its write is refused
+    second = client.put(url, json={"html_content": "<p>tab two</p>"}, headers={**auth_headers, "If-Match": etag})
+    assert second.status_code == 412
+    patch = client.patch(url, json={"base_revision": 2, "html_content": [{"offset": 0, "insert": "x"}]},
+                         headers={**auth_headers, "If-Match": etag})
+    assert patch.status_code == 412
+    assert client.get(url, headers=auth_headers).json()["html_content"] == "<p>tab one</p>"
+
+    patched = client.patch(url, json={"base_revision": 2, "html_content": [{"offset": 0, "insert": "x"}]},
+                           headers={**auth_headers, "If-Match": first.headers["ETag"]})
+    assert patched.status_code == 200
+    assert client.put(url, json={"name": "Any"}, headers={**auth_headers, "If-Match": "*"}).status_code == 200
+    assert client.put(url, json={"name": "Blind"}, headers=auth_headers).status_code == 200
+
+    # Snapshots and retention change the version counters, and with them the
+    # representation, but leave the content a write depends on alone
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    client.post(f"{url}/versions", json={}, headers=auth_headers)
+    with SessionLocal() as db:
+        db.execute(update(Project).where(Project.id == project["id"]).values(version_count=0))
+        db.commit()
+    assert client.get(url, headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+    assert client.put(url, json={"name": "Current"}, headers={**auth_headers, "If-Match": etag}).status_code == 200
+    assert client.put(url, json={"name": "Late"}, headers={**auth_headers, "If-Match": etag}).status_code == 412
+    assert client.put(url, json={"name": "Other"}, headers={**auth_headers, "If-Match": f'W/{etag}'}).status_code == 412
+
+@pytest.mark.skipif(write_queue is not None, reason="the single writer runs the two checks one after the other")
+def test_concurrent_writes_with_one_etag_cannot_both_win(client, auth_headers, monkeypatch):
+    project = client.post("/api/v1/projects/", json={"name": "Raced"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+    # Hold both requests after their If-Match check until each has passed it
+    arrived = []
+    original = projects.assign_changes
+    async def assign_together(session, project, values):
+        changed = await original(session, project, values)
+        arrived.append(values["name"])
+        for _ in range(200):
+            if len(arrived) == 2:
+                break
+            await asyncio.sleep(0.01)
+        return changed
+    monkeypatch.setattr(projects, "assign_changes", assign_together)
+
+    with ThreadPoolExecutor(2) as pool:
+        responses = list(pool.map(
+            lambda name: client.put(url, json={"name": name}, headers={**auth_headers, "If-Match": etag}),
+            ["Tab one", "Tab two"]
+        ))
+    assert len(arrived) == 2
+    assert sorted(response.status_code for response in responses) == [200, 412]
+    winner = next(response for response in responses if response.status_code == 200)
+    stored = client.get(url, headers=auth_headers).json()
+    assert (stored["name"], stored["revision"]) == (winner.json()["name"], 2)
+
+def test_conflict_check_loads_no_content(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={
+        "name": "Big", "html_content": "<p>x</p>" * 10000, "elements_tree": {"id": "root"},
+    }, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    client.put(url, json={"name": "Moved on"}, headers=auth_headers)
+
+    response, statements = record_statements(client, lambda: client.patch(url, json={
+        "base_revision": 1, "elements_tree": [{"op": "add", "path": "/x", "value": 1}],
+    }, headers={**auth_headers, "If-Match": '"stale"'}))
+    assert response.status_code == 412
+    project_reads = [statement for statement in statements if "FROM projects" in statement]
+    assert len(project_reads) == 1
+    assert "elements_tree" not in project_reads[0] and "html_hash" not in project_reads[0]
+    assert not any("content_blobs" in statement for statement in statements)
+
+def test_project_reads_revalidate(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={
+        "name": "Reopened", "html_content": "<p>x</p>" * 1000, "elements_tree": {"id": "root"},
+    }, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    first = client.get(url, headers=auth_headers)
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    response, statements = record_statements(client, lambda: client.get(url, headers={**auth_headers, "If-None-Match": etag}))
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["ETag"] == etag
+    assert not any("content_blobs" in statement or "elements_tree" in statement for statement in statements)
+    assert client.get(url, headers={**auth_headers, "If-None-Match": f'W/{etag}'}).status_code == 304
+    assert client.get(url, headers={**auth_headers, "If-Modified-Since": last_modified}).status_code == 304
+
+    # Edits and snapshots both invalidate the cached copy
+    client.patch(url, json={"base_revision": 1, "html_content": [{"offset": 0, "insert": "<h1>New</h1>"}]}, headers=auth_headers)
+    changed = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["html_content"].startswith("<h1>New</h1>")
+    client.post(f"{url}/versions", json={}, headers=auth_headers)
+    assert client.get(url, headers={**auth_headers, "If-None-Match": changed.headers["ETag"]}).status_code == 200
+    assert client.get("/api/v1/projects/999", headers={**auth_headers, "If-None-Match": "*"}).status_code == 404
+
+def test_templates_and_components_revalidate(client, auth_headers):
+    for url in ("/api/v1/components/", "/api/v1/components/categories", "/api/v1/components/layout",
+                "/api/v1/components/layout/fila", "/api/v1/templates/portfolio"):
+        first = client.get(url)
+        assert first.status_code == 200
+        assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+        assert client.get(url, headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+    assert client.get("/api/v1/components/layout").headers["ETag"] != client.get("/api/v1/components/text").headers["ETag"]
+    assert client.get("/api/v1/components/categories").headers["ETag"] != client.get("/api/v1/components/").headers["ETag"]
+
+    project = client.post("/api/v1/projects/", json={"name": "Gallery", "is_public": True}, headers=auth_headers).json()
+    with SessionLocal() as db:
+        db.get(Project, project["id"]).is_template = True
+        db.commit()
+    url = f"/api/v1/templates/user-{project['id']}"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    client.put(f"/api/v1/projects/{project['id']}", json={"html_content": "<p>v2</p>"}, headers=auth_headers)
+    assert client.get(url, headers={"If-None-Match": etag}).json()["html_content"] == "<p>v2</p>"
@@ -0,0 +1,53 @@
+"""
+Password hashing off the event loop, with a bounded queue
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core.auth import password_executor
+from app.core.metrics import metrics
+from app.core.offload import BoundedExecutor, ExecutorBusy
+
+def test_bounded_executor_queues_then_rejects():
+    executor = BoundedExecutor("test.bounded", workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.create_task(executor.run(release.wait, 5))
+        second = asyncio.create_task(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["pending"] == 2 and executor.stats()["queued"] == 1
+        with pytest.raises(ExecutorBusy):
+            await executor.run(lambda: "rejected")
+
+        # The loop keeps running while the worker is busy
+        ticks = 0
+        while ticks < 5:
+            await asyncio.sleep(0.001)
+            ticks += 1
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    assert executor.stats()["pending"] == 0
+    assert metrics.snapshot()["timings"]["executor.test.bounded.wait"]["count"] == 2
+    executor.shutdown()
+
+def test_inline_when_disabled():
+    executor = BoundedExecutor("test.inline", workers=0, max_pending=0)
+    assert asyncio.run(executor.run(threading.current_thread)) is threading.main_thread()
+
+def test_login_storm_is_shed(client, auth_headers, monkeypatch):
+    form = {"username": "editor", "password": "secret-password"}
+    assert client.post("/api/v1/auth/login", data=form).status_code == 200
+    assert client.post("/api/v1/auth/login", data={**form, "password": "wrong"}).status_code == 401
+
+    monkeypatch.setattr(password_executor, "max_pending", 0)
+    shed = client.post("/api/v1/auth/login", data=form)
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    # Requests that need no password work are unaffected
+    assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
@@ -0,0 +1,102 @@
+"""
+Incremental project updates: JSON Patch trees and offset text edits
+"""
+
+import pytest
+
+from app.core.patching import PatchError, apply_json_patch, apply_text_edits
+
+@pytest.mark.parametrize("document, operations, expected", [
+    ({"foo": "bar"}, [{"op": "add", "path": "/baz", "value": "qux"}], {"foo": "bar", "baz": "qux"}),
+    ({"foo": ["bar", "baz"]}, [{"op": "add", "path": "/foo/1", "value": "qux"}], {"foo": ["bar", "qux", "baz"]}),
+    ({"foo": ["bar"]}, [{"op": "add", "path": "/foo/-", "value": None}], {"foo": ["bar", None]}),
+    ({"foo": ["bar", "qux", "baz"]}, [{"op": "remove", "path": "/foo/1"}], {"foo": ["bar", "baz"]}),
+    ({"foo": "bar"}, [{"op": "replace", "path": "/foo", "value": 1}], {"foo": 1}),
+    ({"foo": {"bar": 1}, "q": {}}, [{"op": "move", "from": "/foo/bar", "path": "/q/bar"}], {"foo": {}, "q": {"bar": 1}}),
+    ({"a": [1, 2, 3, 4]}, [{"op": "move", "from": "/a/1", "path": "/a/3"}], {"a": [1, 3, 4, 2]}),
+    ({"a": {"b": [1]}}, [{"op": "copy", "from": "/a", "path": "/c"}], {"a": {"b": [1]}, "c": {"b": [1]}}),
+    ({"a/b": 1, "m~n": 2}, [{"op": "test", "path": "/a~1b", "value": 1}, {"op": "remove", "path": "/m~0n"}], {"a/b": 1}),
+    ({"foo": 1}, [{"op": "replace", "path": "", "value": [1]}], [1]),
+])
+def test_json_patch(document, operations, expected):
+    assert apply_json_patch(document, operations) == expected
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "add", "path": "/missing/x", "value": 1}],
+    [{"op": "remove", "path": "/foo/5"}],
+    [{"op": "replace", "path": "/nope", "value": 1}],
+    [{"op": "add", "path": "/foo/01", "value": 1}],
+    [{"op": "test", "path": "/bar", "value": 2}],
+    [{"op": "move", "from": "/foo", "path": "/foo/0"}],
+    [{"op": "add", "path": "/x"}],
+    [{"op": "add", "path": "foo", "value": 1}],
+])
+def test_json_patch_rejects(operations):
+    with pytest.raises(PatchError):
+        apply_json_patch({"foo": [1], "bar": 1}, operations)
+
+def test_text_edits():
+    text = "<h1>Hello</h1>\n<p>ñandú</p>"
+    edits = [{"offset": 4, "delete": 5, "insert": "Hi"}, {"offset": 18, "delete": 5, "insert": "emu"}, {"offset": 27}]
+    assert apply_text_edits(text, edits) == "<h1>Hi</h1>\n<p>emu</p>"
+    assert apply_text_edits("", [{"offset": 0, "insert": "x"}]) == "x"
+    with pytest.raises(PatchError):
+        apply_text_edits(text, [{"offset": 10}, {"offset": 4}])
+    with pytest.raises(PatchError):
+        apply_text_edits(text, [{"offset": 20, "delete": 10}])
+
+def test_text_edit_offsets_are_utf16_code_units():
+    # As the editor sees it: "😀".length == 2 in JavaScript
+    text = "<p>😀 hi</p>\n<p>𝄞 end</p>"
+    edits = [{"offset": 6, "delete": 2, "insert": "yo"}, {"offset": 19, "delete": 3, "insert": "fin"}]
+    assert apply_text_edits(text, edits) == "<p>😀 yo</p>\n<p>𝄞 fin</p>"
+    assert apply_text_edits(text, [{"offset": 3, "delete": 2, "insert": "🙂"}]) == "<p>🙂 hi</p>\n<p>𝄞 end</p>"
+    assert apply_text_edits(text, [{"offset": 26}]) == text
+    with pytest.raises(PatchError):
+        apply_text_edits(text, [{"offset": 4, "insert": "x"}])
+    with pytest.raises(PatchError):
+        apply_text_edits(text, [{"offset": 3, "delete": 1}])
+    with pytest.raises(PatchError):
+        apply_text_edits(text, [{"offset": 27}])
+
+def test_patch_endpoint(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={
+        "name": "Autosave",
+        "html_content": "<h1>Hello</h1>",
+        "elements_tree": {"id": "root", "children": [{"id": "title", "text": "Hello"}]},
+    }, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    assert project["revision"] == 1
+
+    response = client.patch(url, json={
+        "base_revision": 1,
+        "html_content": [{"offset": 4, "delete": 5, "insert": "Hi"}],
+        "css_content": [{"offset": 0, "insert": "h1 { color: red; }"}],
+        "elements_tree": [
+            {"op": "test", "path": "/children/0/id", "value": "title"},
+            {"op": "replace", "path": "/children/0/text", "value": "Hi"},
+            {"op": "add", "path": "/children/-", "value": {"id": "p1"}},
+        ],
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["revision"] == 2
+
+    detail = client.get(url, headers=auth_headers).json()
+    assert detail["html_content"] == "<h1>Hi</h1>"
+    assert detail["css_content"] == "h1 { color: red; }"
+    assert detail["elements_tree"] == {"id": "root", "children": [{"id": "title", "text": "Hi"}, {"id": "p1"}]}
+
+    # Stale base revision: nothing applied
+    stale = client.patch(url, json={"base_revision": 1, "html_content": [{"offset": 0, "insert": "x"}]}, headers=auth_headers)
+    assert stale.status_code == 409
+    # A failing operation rejects the whole patch
+    failing = client.patch(url, json={
+        "base_revision": 2,
+        "html_content": [{"offset": 0, "insert": "<!-- -->"}],
+        "elements_tree": [{"op": "test", "path": "/children/0/text", "value": "Hello"}],
+    }, headers=auth_headers)
+    assert failing.status_code == 422
+    assert client.get(url, headers=auth_headers).json()["html_content"] == "<h1>Hi</h1>"
+
+    # Full updates move the revision too
+    assert client.put(url, json={"name": "Renamed"}, headers=auth_headers).json()["revision"] == 3
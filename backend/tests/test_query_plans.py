@@ -0,0 +1,104 @@
+"""
+Query-plan regression suite
+
+Drives every router through the API while recording the SQL it issues, then
+runs ``EXPLAIN QUERY PLAN`` on each statement and fails if SQLite would
+answer any of them with a full table scan.
+"""
+
+import re
+
+import pytest
+
+from app.database import engine
+from tests.conftest import recording_statements
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+@pytest.fixture
+def recorded_queries():
+    """Capture every query the API runs, reads and queued writes alike"""
+    queries = lambda statement: statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+    with recording_statements(queries) as statements:
+        yield statements
+
+def exercise_api(client, headers):
+    """Call every endpoint that reaches the database"""
+    api = "/api/v1"
+    project = client.post(f"{api}/projects/", json={
+        "name": "Landing",
+        "category": "negocios",
+        "html_content": "<h1>Hi</h1>",
+        "is_public": True,
+    }, headers=headers).json()
+    project_id = project["id"]
+
+    client.get(f"{api}/projects/", headers=headers)
+    client.get(f"{api}/projects/", params={"category": "negocios", "is_public": True}, headers=headers)
+    next_page = client.get(f"{api}/projects/", params={"limit": 1}, headers=headers)
+    client.post(f"{api}/projects/", json={"name": "Second"}, headers=headers)
+    next_page = client.get(f"{api}/projects/", params={"limit": 1}, headers=headers)
+    client.get(f"{api}/projects/", params={"cursor": next_page.headers["X-Next-Cursor"]}, headers=headers)
+    client.get(f"{api}/projects/", params={"skip": 1}, headers=headers)
+    client.get(f"{api}/projects/public")
+    client.get(f"{api}/projects/public", params={"category": "negocios"})
+    client.get(f"{api}/projects/{project_id}", headers=headers)
+    client.put(f"{api}/projects/{project_id}/autosave", json={"js_content": "go()"}, headers=headers)
+    client.get(f"{api}/projects/{project_id}", headers=headers)
+    client.put(f"{api}/projects/{project_id}", json={"css_content": "h1{}"}, headers=headers)
+    client.patch(f"{api}/projects/{project_id}", json={
+        "base_revision": 2, "css_content": [{"offset": 2, "insert": " "}], "elements_tree": [{"op": "add", "path": "", "value": {}}],
+    }, headers=headers)
+    client.post(f"{api}/projects/{project_id}/versions", json={"description": "v1"}, headers=headers)
+    client.post(f"{api}/projects/{project_id}/versions", json={}, headers=headers)
+    versions = client.get(f"{api}/projects/{project_id}/versions", params={"limit": 1}, headers=headers)
+    client.get(f"{api}/projects/{project_id}/versions", params={"cursor": versions.headers["X-Next-Cursor"]}, headers=headers)
+    client.get(f"{api}/projects/{project_id}/versions/2", headers=headers)
+    client.get(f"{api}/projects/{project_id}/versions/1/diff/2", headers=headers)
+    client.post(f"{api}/projects/{project_id}/versions/1/restore", headers=headers)
+    client.post(f"{api}/projects/{project_id}/versions/2/duplicate", headers=headers)
+    duplicate = client.post(f"{api}/projects/{project_id}/duplicate", headers=headers).json()
+    client.delete(f"{api}/projects/{duplicate['id']}", headers=headers)
+
+    client.put(f"{api}/projects/{project_id}", json={"is_public": True}, headers=headers)
+    client.get(f"{api}/templates/")
+    client.get(f"{api}/templates/user-{project_id}")
+
+    client.get(f"{api}/users/me", headers=headers)
+    client.put(f"{api}/users/me", json={"bio": "Designer"}, headers=headers)
+    api_key = client.post(f"{api}/users/me/api-keys", json={"name": "ci"}, headers=headers).json()
+    client.get(f"{api}/projects/{project_id}", headers={"Authorization": f"Bearer {api_key['key']}"})
+    client.get(f"{api}/users/me/api-keys", headers=headers)
+    client.delete(f"{api}/users/me/api-keys/{api_key['id']}", headers=headers)
+    tokens = client.post(f"{api}/auth/login", data={"username": "editor", "password": "secret-password"}).json()
+    client.post(f"{api}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    client.post(f"{api}/auth/logout", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+def explain(statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).fetchall()
+    return [row[-1] for row in rows]
+
+def test_router_queries_use_indexes(client, auth_headers, recorded_queries):
+    exercise_api(client, auth_headers)
+    assert recorded_queries, "no queries were recorded"
+
+    scans = []
+    for statement, parameters in recorded_queries:
+        for detail in explain(statement, parameters):
+            match = FULL_SCAN.match(detail)
+            if match:
+                scans.append(f"{match.group(1)}: {' '.join(statement.split())}")
+    assert not scans, "full table scans:\n" + "\n".join(scans)
+
+def test_listing_uses_composite_index(client, auth_headers, recorded_queries):
+    client.get("/api/v1/projects/", params={"category": "blog"}, headers=auth_headers)
+    plans = [explain(s, p) for s, p in recorded_queries if "FROM projects" in s]
+    assert any("ix_projects_user_category_updated" in detail for plan in plans for detail in plan)
+
+def test_version_lookup_uses_composite_index(client, auth_headers, recorded_queries):
+    project = client.post("/api/v1/projects/", json={"name": "P"}, headers=auth_headers).json()
+    client.post(f"/api/v1/projects/{project['id']}/versions", json={}, headers=auth_headers)
+    plans = [explain(s, p) for s, p in recorded_queries if "project_versions.project_id =" in s]
+    assert plans
+    assert all(any("ix_project_versions_project_version" in detail for detail in plan) for plan in plans)
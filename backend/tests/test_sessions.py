@@ -0,0 +1,87 @@
+"""
+Login sessions: self-contained access tokens, rotating refresh tokens, revocation
+"""
+
+from datetime import datetime, timedelta
+
+from jose import jwt
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.sessions import revoked_sessions, sync_revocations
+from app.database import AsyncSessionLocal, run_write
+from app.models.session import UserSession
+from tests.conftest import record_statements
+
+def login(client, auth_headers):
+    response = client.post("/api/v1/auth/login", data={"username": "editor", "password": "secret-password"})
+    assert response.status_code == 200
+    return response.json()
+
+def bearer(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+def test_access_tokens_carry_the_principal(client, auth_headers):
+    tokens = login(client, auth_headers)
+    claims = jwt.decode(tokens["access_token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert claims["sub"] == "editor" and claims["role"] == "user"
+    assert isinstance(claims["uid"], int) and isinstance(claims["sid"], int)
+    assert tokens["refresh_token"].startswith(f"{claims['sid']}.")
+    assert tokens["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    response, statements = record_statements(client, lambda: [
+        client.post("/api/v1/projects/", json={"name": "P"}, headers=bearer(tokens)),
+        client.get("/api/v1/projects/", headers=bearer(tokens)),
+    ])
+    assert [each.status_code for each in response] == [201, 200]
+    assert response[1].json()[0]["user_id"] == claims["uid"]
+    assert not [statement for statement in statements if "FROM users" in statement]
+    assert client.get("/api/v1/admin/metrics", headers=bearer(tokens)).status_code == 403
+
+def test_refresh_rotates_and_reuse_revokes(client, auth_headers):
+    tokens = login(client, auth_headers)
+    refreshed = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200
+    rotated = refreshed.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/api/v1/projects/", headers=bearer(rotated)).status_code == 200
+
+    # Replaying the old refresh token means it leaked: the whole session goes
+    replayed = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replayed.status_code == 401
+    assert client.get("/api/v1/projects/", headers=bearer(rotated)).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": "garbage"}).status_code == 401
+
+def test_logout_and_deactivation_revoke_sessions(client, auth_headers):
+    first, second = login(client, auth_headers), login(client, auth_headers)
+    assert client.post("/api/v1/auth/logout", headers=bearer(first)).status_code == 204
+    assert client.get("/api/v1/projects/", headers=bearer(first)).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]}).status_code == 401
+    assert client.get("/api/v1/projects/", headers=bearer(second)).status_code == 200
+
+    assert client.delete("/api/v1/users/me", headers=bearer(second)).status_code == 204
+    assert client.get("/api/v1/projects/", headers=bearer(second)).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": second["refresh_token"]}).status_code == 401
+    assert client.post("/api/v1/auth/login", data={"username": "editor", "password": "secret-password"}).status_code == 401
+
+def test_sync_loads_revocations_and_purges_expired_sessions(client, auth_headers):
+    live, revoked, expired = (login(client, auth_headers) for _ in range(3))
+    session_id = lambda tokens: int(tokens["refresh_token"].split(".")[0])
+    long_ago = datetime.utcnow() - timedelta(days=1)
+
+    async def age_sessions():
+        async def work(db):
+            # As if another worker had revoked one session and another ran out
+            await db.execute(update(UserSession).where(UserSession.id == session_id(revoked)).values(revoked_at=datetime.utcnow()))
+            await db.execute(update(UserSession).where(UserSession.id == session_id(expired)).values(expires_at=long_ago))
+        async with AsyncSessionLocal() as db:
+            await run_write(db, work)
+        async with AsyncSessionLocal() as db:
+            return await run_write(db, sync_revocations)
+
+    assert client.portal.call(age_sessions) == 1
+    assert session_id(revoked) in revoked_sessions and session_id(live) not in revoked_sessions
+    assert client.get("/api/v1/projects/", headers=bearer(revoked)).status_code == 401
+    assert client.get("/api/v1/projects/", headers=bearer(live)).status_code == 200
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": expired["refresh_token"]}).status_code == 401
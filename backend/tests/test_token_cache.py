@@ -0,0 +1,36 @@
+"""
+Verified-token cache: one signature check per token, bounded by its expiry
+"""
+
+import time
+from datetime import timedelta
+
+from app.core.auth import create_access_token, decode_token, token_cache, token_digest
+from app.core.metrics import metrics
+
+def test_signature_is_checked_once_per_token(client, auth_headers):
+    metrics.reset()
+    for _ in range(3):
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+    snapshot = metrics.snapshot()
+    assert snapshot["timings"]["auth.token.decode"]["count"] == 1
+    assert snapshot["counters"]["cache.auth.tokens.hits"] == 2
+
+def test_entries_expire_with_their_token(client):
+    token = create_access_token({"sub": "someone"}, expires_delta=timedelta(seconds=30))
+    assert decode_token(token)["sub"] == "someone"
+    expires_at, claims = token_cache._entries[token_digest(token)]
+    assert 25 < expires_at - time.monotonic() <= 30
+    assert token not in str(token_cache._entries)
+
+    expired = create_access_token({"sub": "someone"}, expires_delta=timedelta(seconds=-1))
+    assert decode_token(expired) is None
+    assert decode_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB")) is None
+    assert len(token_cache) == 1
+
+def test_logout_revokes_the_token(client, auth_headers):
+    other = {"Authorization": "Bearer " + create_access_token({"sub": "editor"}, expires_delta=timedelta(minutes=5))}
+    assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=auth_headers).status_code == 204
+    assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 401
+    assert client.get("/api/v1/users/me", headers=other).status_code == 200
@@ -0,0 +1,78 @@
+"""
+Binary tree encoding and lazy decoding of elements_tree / canvas_settings
+"""
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import undefer_group
+
+from app.core import treecodec
+from app.core.compression import decompress
+from app.core.config import settings
+from app.core.treecodec import LazyTree, decode_tree, encode_tree
+from app.database import SessionLocal
+from app.models.project import Project
+
+TREE = {
+    "id": "root",
+    "type": "body",
+    "props": {"style": {"margin": "0", "opacity": 0.5}, "hidden": False, "dataset": None},
+    "children": [
+        {"id": f"el-{i}", "type": "section", "index": i, "offset": -i, "label": "ñandú €" * (i % 4)}
+        for i in range(300)
+    ],
+}
+
+@pytest.mark.parametrize("value", [
+    TREE, {}, [], None, True, 0, 127, 128, -1, -32, -33, 2 ** 70, -(2 ** 70), 1.25,
+    "", "x" * 31, "x" * 32, {str(i): i for i in range(200)}, [[1] * 16, {"a": [{"a": None}]}],
+])
+def test_round_trip(value):
+    assert decode_tree(encode_tree(value)) == value
+
+def test_keys_are_interned():
+    encoded = encode_tree(TREE)
+    assert encoded.count(b"offset") == 1
+    assert encoded[0] == treecodec.MAGIC
+    assert len(encoded) < len(str(TREE)) / 2
+
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_trees_decode_only_when_touched(client, auth_headers, monkeypatch, encoding):
+    monkeypatch.setattr(settings, "TREE_ENCODING", encoding)
+    project = client.post("/api/v1/projects/", json={
+        "name": "Tree", "elements_tree": TREE, "canvas_settings": {"width": "100%"},
+    }, headers=auth_headers).json()
+
+    with SessionLocal() as db:
+        stored = decompress(db.execute(text("SELECT elements_tree FROM projects")).scalar_one())
+        assert (stored[0] == treecodec.MAGIC) == (encoding == "binary")
+
+        loaded = db.scalars(select(Project).options(undefer_group("content"))).one()
+        assert isinstance(loaded.elements_tree, LazyTree)
+        assert loaded.elements_tree.payload is not None
+        assert loaded.elements_tree["children"][7]["label"] == "ñandú €" * 3
+        assert loaded.elements_tree.payload is None
+
+    # Duplicating copies the stored payload without decoding it
+    decoded = []
+    original_decode = treecodec.decode_payload
+    monkeypatch.setattr(treecodec, "decode_payload", lambda payload: decoded.append(1) or original_decode(payload))
+    copy = client.post(f"/api/v1/projects/{project['id']}/duplicate", headers=auth_headers).json()
+    assert decoded == []
+    monkeypatch.setattr(treecodec, "decode_payload", original_decode)
+
+    detail = client.get(f"/api/v1/projects/{copy['id']}", headers=auth_headers).json()
+    assert detail["elements_tree"] == TREE
+    assert detail["canvas_settings"] == {"width": "100%"}
+
+def test_template_response_serializes_lazy_trees(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={
+        "name": "Gallery", "is_public": True, "elements_tree": TREE,
+    }, headers=auth_headers).json()
+    with SessionLocal() as db:
+        db.execute(update(Project).values(is_template=True))
+        db.commit()
+
+    response = client.get(f"/api/v1/templates/user-{project['id']}")
+    assert response.status_code == 200
+    assert response.json()["elements_tree"] == TREE
@@ -0,0 +1,134 @@
+"""
+Line and element-tree diffs between project versions
+"""
+
+import random
+import time
+import tracemalloc
+
+from app.core.diff import line_hunks, matching_blocks, opcodes
+from app.core.metrics import metrics
+from app.core.treediff import diff_trees
+from app.core.versions import diff_cache
+
+def test_line_hunks_keep_context_and_split():
+    old = [f"line {i}" for i in range(30)]
+    new = list(old)
+    new[2] = "changed"
+    new.insert(20, "inserted")
+
+    first, second = line_hunks(old, new, context=2)
+    assert (first["old_start"], first["old_lines"], first["new_start"], first["new_lines"]) == (1, 5, 1, 5)
+    assert first["lines"] == [" line 0", " line 1", "-line 2", "+changed", " line 3", " line 4"]
+    assert (second["old_start"], second["old_lines"], second["new_lines"]) == (19, 4, 5)
+    assert second["lines"][2] == "+inserted"
+    assert line_hunks(old, old) == []
+
+def test_line_hunks_scale_with_edits():
+    old = [f"<div class='row-{i}'>item {i}</div>" for i in range(100000)]
+    new = list(old)
+    for i in range(0, 100000, 5000):
+        new[i] = "<p>edited</p>"
+    started = time.perf_counter()
+    hunks = line_hunks(old, new)
+    assert len(hunks) == 20
+    assert time.perf_counter() - started < 2
+
+def test_matching_blocks_find_a_longest_common_subsequence():
+    def lcs_length(a, b):
+        previous = [0] * (len(b) + 1)
+        for x in a:
+            current = [0]
+            for j, y in enumerate(b):
+                current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+            previous = current
+        return previous[-1]
+
+    rng = random.Random(7)
+    for _ in range(500):
+        a = [rng.choice("abcd") for _ in range(rng.randint(0, 30))]
+        b = [rng.choice("abcd") for _ in range(rng.randint(0, 30))]
+        blocks = matching_blocks(a, b)
+        assert all(a[i:i + size] == b[j:j + size] for i, j, size in blocks)
+        assert sum(size for *_, size in blocks) == lcs_length(a, b)
+
+def test_unrelated_inputs_are_diffed_in_bounded_time():
+    old = [f"old {i}" for i in range(5000)]
+    new = [f"new {i}" for i in range(5000)]
+    started = time.perf_counter()
+    # No edit limit: only the work budget stops the search
+    assert opcodes(old, new, max_edits=10 ** 9) == [("replace", 0, 5000, 0, 5000)]
+    assert time.perf_counter() - started < 2
+
+def test_diff_memory_does_not_grow_with_edits():
+    old = [f"old {i}" for i in range(200)]
+    new = [f"new {i}" for i in range(200)]
+    tracemalloc.start()
+    try:
+        assert opcodes(old, new) == [("replace", 0, 200, 0, 200)]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Keeping every round's furthest points (O(D^2)) took over 1 MB here
+    assert peak < 200_000
+
+def test_tree_diff_matches_nodes_by_id():
+    old = {"id": "root", "children": [
+        {"id": "title", "tag": "h1", "text": "Hello"},
+        {"id": "box", "tag": "div", "children": [{"id": "img", "tag": "img"}]},
+        {"id": "footer", "tag": "footer"},
+        {"tag": "span"},
+    ]}
+    new = {"id": "root", "children": [
+        {"id": "footer", "tag": "footer"},
+        {"id": "title", "tag": "h2", "text": "Hello"},
+        {"id": "box", "tag": "div", "children": []},
+        {"id": "img", "tag": "img"},
+        {"id": "cta", "tag": "button", "children": [{"id": "label", "text": "Go"}]},
+    ]}
+
+    changes = {(change["type"], change["id"]): change for change in diff_trees(old, new)}
+    assert set(changes) == {
+        ("remove", "root/3"), ("move", "footer"), ("update", "title"), ("move", "img"), ("add", "cta"),
+    }
+    assert changes["update", "title"]["changes"] == {"tag": "h2"}
+    assert changes["move", "img"]["from_parent"] == "box" and changes["move", "img"]["index"] == 3
+    assert changes["add", "cta"]["element"]["children"][0]["id"] == "label"
+    assert diff_trees(new, new) == []
+    assert diff_trees(None, new)[0]["type"] == "add"
+
+def test_diff_endpoint_is_cached(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={"name": "Diff"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}"
+    for html, children in (("<h1>A</h1>\n<p>one</p>", ["a"]), ("<h1>B</h1>\n<p>one</p>", ["a", "b"])):
+        client.put(url, json={
+            "html_content": html,
+            "css_content": "h1 { color: red; }",
+            "elements_tree": {"id": "root", "children": [{"id": child} for child in children]},
+        }, headers=auth_headers)
+        client.post(f"{url}/versions", json={}, headers=auth_headers)
+    # The second snapshot was delta-encoded on the diff executor
+    assert metrics.snapshot()["timings"]["executor.diffs.run"]["count"] >= 1
+    diff_cache.clear()
+    metrics.reset()
+
+    diff = client.get(f"{url}/versions/1/diff/2", headers=auth_headers).json()
+    assert diff["from_version"] == 1 and diff["to_version"] == 2 and not diff["identical"]
+    assert diff["html_content"]["hunks"][0]["lines"] == ["-<h1>A</h1>", "+<h1>B</h1>", " <p>one</p>"]
+    assert (diff["html_content"]["added"], diff["html_content"]["removed"]) == (1, 1)
+    assert diff["css_content"]["hunks"] == []
+    assert diff["elements_tree"] == [{
+        "type": "add", "id": "b", "parent": "root", "index": 1, "element": {"id": "b"},
+        "from_parent": None, "from_index": None, "changes": None,
+    }]
+
+    # Version 2 rebuilt and the pair diffed on the diff executor, not on the event loop
+    assert metrics.snapshot()["timings"]["executor.diffs.run"]["count"] == 2
+    reconstructs = metrics.snapshot()["timings"]["versions.reconstruct"]["count"]
+    assert client.get(f"{url}/versions/1/diff/2", headers=auth_headers).json() == diff
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["cache.versions.diff.hits"] == 1
+    assert snapshot["timings"]["versions.reconstruct"]["count"] == reconstructs
+
+    assert client.get(f"{url}/versions/2/diff/2", headers=auth_headers).json()["identical"]
+    assert client.get(f"{url}/versions/1/diff/9", headers=auth_headers).status_code == 404
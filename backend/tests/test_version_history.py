@@ -0,0 +1,131 @@
+"""
+Paginated version history and per-version content
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.auth import create_access_token
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.project import ProjectVersion
+from tests.conftest import recording_statements
+
+@pytest.fixture
+def project_with_versions(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={"name": "Site"}, headers=auth_headers).json()
+    for number in range(1, 6):
+        client.put(f"/api/v1/projects/{project['id']}", json={
+            "html_content": f"<h1>Version {number}</h1>",
+            "elements_tree": {"id": "root", "version": number},
+        }, headers=auth_headers)
+        client.post(f"/api/v1/projects/{project['id']}/versions", json={"description": f"v{number}"}, headers=auth_headers)
+    return project["id"]
+
+def test_listing_pages_by_version_number(client, auth_headers, project_with_versions):
+    url = f"/api/v1/projects/{project_with_versions}/versions"
+    first = client.get(url, params={"limit": 2}, headers=auth_headers)
+    assert [v["version_number"] for v in first.json()] == [5, 4]
+    assert "X-Prev-Cursor" not in first.headers
+
+    second = client.get(url, params={"cursor": first.headers["X-Next-Cursor"], "limit": 2}, headers=auth_headers)
+    assert [v["version_number"] for v in second.json()] == [3, 2]
+    last = client.get(url, params={"cursor": second.headers["X-Next-Cursor"], "limit": 2}, headers=auth_headers)
+    assert [v["version_number"] for v in last.json()] == [1]
+    assert "X-Next-Cursor" not in last.headers
+
+    back = client.get(url, params={"cursor": last.headers["X-Prev-Cursor"], "limit": 2}, headers=auth_headers)
+    assert [v["version_number"] for v in back.json()] == [3, 2]
+    assert client.get(url, params={"cursor": "garbage"}, headers=auth_headers).status_code == 400
+
+def test_listing_loads_no_content(client, auth_headers, project_with_versions):
+    with recording_statements(lambda statement: "FROM project_versions" in statement) as statements:
+        client.get(f"/api/v1/projects/{project_with_versions}/versions", headers=auth_headers)
+
+    assert len(statements) == 1
+    selected = statements[0][0].split("FROM")[0]
+    for column in ("delta", "elements_tree", "html_hash", "content_hash"):
+        assert column not in selected
+
+def test_version_content(client, auth_headers, project_with_versions):
+    url = f"/api/v1/projects/{project_with_versions}/versions"
+    metrics.reset()
+    version = client.get(f"{url}/3", headers=auth_headers).json()
+    # A delta version: its chain is replayed on the diff executor
+    assert metrics.snapshot()["timings"]["executor.diffs.run"]["count"] == 1
+    assert version["version_number"] == 3
+    assert version["description"] == "v3"
+    assert version["html_content"] == "<h1>Version 3</h1>"
+    assert version["css_content"] is None
+    assert version["elements_tree"] == {"id": "root", "version": 3}
+
+    assert client.get(f"{url}/9", headers=auth_headers).status_code == 404
+
+def test_concurrent_snapshots_get_unique_numbers(client, auth_headers):
+    project = client.post("/api/v1/projects/", json={"name": "Busy", "html_content": "<p>x</p>"}, headers=auth_headers).json()
+    url = f"/api/v1/projects/{project['id']}/versions"
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: client.post(url, json={}, headers=auth_headers), range(16)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sorted(response.json()["version_number"] for response in responses) == list(range(1, 17))
+    detail = client.get("/api/v1/projects/", headers=auth_headers).json()[0]
+    assert detail["latest_version_number"] == 16
+    assert detail["version_count"] == 16
+
+def test_duplicate_copies_inside_the_database(client, auth_headers):
+    tree = {"id": "root", "children": [{"id": f"n{i}"} for i in range(100)]}
+    project = client.post("/api/v1/projects/", json={
+        "name": "Big", "html_content": "<p>big</p>" * 1000, "elements_tree": tree, "tags": ["a"],
+    }, headers=auth_headers).json()
+
+    with recording_statements() as recorded:
+        copy = client.post(f"/api/v1/projects/{project['id']}/duplicate", headers=auth_headers).json()
+    statements = [statement for statement, _ in recorded]
+
+    assert copy["name"] == "Big (Copy)"
+    assert copy["tags"] == ["a"]
+    assert any(s.startswith("INSERT INTO projects") and "SELECT" in s for s in statements)
+    assert not any("content_blobs" in s or "projects.elements_tree" in s.split("FROM")[0] for s in statements
+                   if s.startswith("SELECT"))
+
+    detail = client.get(f"/api/v1/projects/{copy['id']}", headers=auth_headers).json()
+    assert detail["html_content"] == "<p>big</p>" * 1000
+    assert detail["elements_tree"] == tree
+    assert client.post("/api/v1/projects/999/duplicate", headers=auth_headers).status_code == 404
+
+@pytest.mark.parametrize("version_number", [1, 3])  # a keyframe and a delta
+def test_restore_and_create_from_version(client, auth_headers, project_with_versions, version_number):
+    url = f"/api/v1/projects/{project_with_versions}"
+    restored = client.post(f"{url}/versions/{version_number}/restore", headers=auth_headers)
+    assert restored.status_code == 200
+    detail = client.get(url, headers=auth_headers).json()
+    assert detail["html_content"] == f"<h1>Version {version_number}</h1>"
+    assert detail["elements_tree"] == {"id": "root", "version": version_number}
+
+    created = client.post(f"{url}/versions/{version_number}/duplicate", headers=auth_headers).json()
+    assert created["name"] == f"Site (Version {version_number})"
+    assert created["id"] != project_with_versions
+    detail = client.get(f"/api/v1/projects/{created['id']}", headers=auth_headers).json()
+    assert detail["html_content"] == f"<h1>Version {version_number}</h1>"
+    assert detail["elements_tree"] == {"id": "root", "version": version_number}
+
+    assert client.post(f"{url}/versions/9/restore", headers=auth_headers).status_code == 404
+    assert client.post(f"{url}/versions/9/duplicate", headers=auth_headers).status_code == 404
+
+def test_deleting_a_project_removes_its_history(client, auth_headers, project_with_versions):
+    url = f"/api/v1/projects/{project_with_versions}"
+    assert client.delete(url, headers=auth_headers).status_code == 204
+
+    client.post("/api/v1/auth/register", json={"username": "next", "email": "next@example.com", "password": "secret-password"})
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'next'})}"}
+    project = client.post("/api/v1/projects/", json={"name": "Fresh"}, headers=headers).json()
+    assert project["id"] != project_with_versions
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(ProjectVersion)) == 0
+
+    # The new project's history starts clean
+    assert client.get(f"/api/v1/projects/{project['id']}/versions", headers=headers).json() == []
+    assert client.post(f"/api/v1/projects/{project['id']}/versions", json={}, headers=headers).json()["version_number"] == 1
@@ -0,0 +1,147 @@
+"""
+Version retention policies and the background thinning job
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.retention import RetentionRule, parse_policy, plan_retention, retention_batch
+from app.core.versions import drop_versions, load_version_content
+from app.database import SessionLocal
+from app.models.project import Project, ProjectVersion
+
+from tests.test_version_storage import run, snapshot_history, version_rows
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+def test_parse_policy():
+    assert parse_policy("") == []
+    assert parse_policy("24h:all, 30d:1h, *:1d") == [
+        RetentionRule(DAY, None), RetentionRule(30 * DAY, HOUR), RetentionRule(None, DAY),
+    ]
+    assert parse_policy("90d:1w,*:none") == [RetentionRule(90 * DAY, 7 * DAY), RetentionRule(None, 0)]
+
+@pytest.mark.parametrize("policy", ["24h", "1y:all", "30d:1h,24h:all", "*:1d,30d:1h", "24h:hourly"])
+def test_parse_policy_rejects(policy):
+    with pytest.raises(ValueError):
+        parse_policy(policy)
+
+def test_plan_keeps_the_newest_version_per_bucket():
+    now = datetime(2026, 10, 18, 12, 0)
+    # One version every 20 minutes for three days: 216 versions, oldest first
+    versions = [(number, now - timedelta(minutes=20 * (216 - number))) for number in range(1, 217)]
+    rules = parse_policy("24h:all,48h:6h,*:none")
+
+    dropped = plan_retention(versions, rules, now)
+    kept = [number for number, _ in versions if number not in dropped]
+    assert dropped == sorted(dropped)
+    # The last day in full, then one per 6-hour bucket (five buckets overlap
+    # the second day, aligned to midnight), nothing older than two days
+    assert len([number for number in kept if number > 144]) == 72
+    assert [number for number in kept if number <= 144] == [89, 107, 125, 143, 144]
+    assert min(kept) > 72
+
+    # Stable: applying the plan again drops nothing more
+    survivors = [version for version in versions if version[0] not in dropped]
+    assert plan_retention(survivors, rules, now) == []
+    # The latest version survives even a policy that drops everything
+    assert plan_retention(versions, parse_policy("*:none"), now) == list(range(1, 216))
+
+def age_history(project_id, hours_between):
+    """Spread a project's versions back in time, newest now"""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        rows = db.scalars(select(ProjectVersion).where(ProjectVersion.project_id == project_id)).all()
+        for row in rows:
+            row.created_at = now - timedelta(hours=hours_between * (len(rows) - row.version_number))
+        db.commit()
+
+def test_retention_thins_history_and_keeps_chains(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "VERSION_KEYFRAME_INTERVAL", 4)
+    monkeypatch.setattr(settings, "VERSION_RETENTION_POLICY", "3h:all,*:6h")
+    monkeypatch.setattr(settings, "VERSION_RETENTION_MAX_DELETES", 3)
+    project_id, snapshots = snapshot_history(client, auth_headers, 12)
+    age_history(project_id, 1)
+    metrics.reset()
+
+    # Three deletions per transaction: the project stays a candidate until drained
+    assert run(client, retention_batch) == 1
+    assert len(version_rows(project_id)) == 9
+    while run(client, retention_batch):
+        pass
+
+    rows = version_rows(project_id)
+    dropped = 12 - len(rows)
+    assert dropped > 3
+    assert [row.version_number for row in rows][-4:] == [9, 10, 11, 12]
+    assert rows[0].is_keyframe and max(row.chain_depth for row in rows) < 4
+    for row in rows:
+        assert run(client, lambda db: load_version_content(db, row)) == snapshots[row.version_number - 1]
+
+    project = client.get(f"/api/v1/projects/{project_id}", headers=auth_headers).json()
+    assert project["version_count"] == len(rows)
+    assert project["latest_version_number"] == 12
+    counters = metrics.snapshot()["counters"]
+    assert counters["versions.retention.deleted"] == dropped
+    assert counters["versions.retention.bytes_reclaimed"] > 0
+
+def test_project_policy_and_dry_run(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["editor"])
+    monkeypatch.setattr(settings, "VERSION_RETENTION_POLICY", "*:none")
+    kept_id, _ = snapshot_history(client, auth_headers, 3)
+    thinned_id, _ = snapshot_history(client, auth_headers, 4)
+
+    response = client.put(f"/api/v1/projects/{kept_id}", json={"retention_policy": "1y:all"}, headers=auth_headers)
+    assert response.status_code == 422
+    response = client.put(f"/api/v1/projects/{kept_id}", json={"retention_policy": ""}, headers=auth_headers)
+    assert response.json()["retention_policy"] == ""
+
+    report = client.get("/api/v1/admin/storage/retention", headers=auth_headers).json()
+    assert [plan["project_id"] for plan in report["projects"]] == [thinned_id]
+    assert report["projects"][0]["dropped"] == [1, 2, 3]
+    assert report["stored_bytes"] > 0
+
+    monkeypatch.setattr(settings, "VERSION_RETENTION_DRY_RUN", True)
+    assert run(client, retention_batch) == 1
+    assert run(client, retention_batch) == 0
+    assert len(version_rows(thinned_id)) == 4
+
+    monkeypatch.setattr(settings, "VERSION_RETENTION_DRY_RUN", False)
+    with SessionLocal() as db:
+        db.execute(update(Project).values(retention_checked_at=None))
+        db.commit()
+    assert run(client, retention_batch) == 1
+    assert [row.version_number for row in version_rows(thinned_id)] == [4]
+    assert len(version_rows(kept_id)) == 3
+
+def test_dropping_versions_rewrites_only_their_chains(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "VERSION_KEYFRAME_INTERVAL", 4)
+    project_id, snapshots = snapshot_history(client, auth_headers, 12)
+    encoding = lambda row: (row.is_keyframe, row.chain_depth, row.base_version_number, row.delta)
+    before = {row.version_number: encoding(row) for row in version_rows(project_id)}
+
+    # The first chain's keyframe and one delta: 2 becomes the keyframe, 4 a delta against it
+    assert run(client, lambda db: drop_versions(db, project_id, {1, 3})) == 2
+    rows = {row.version_number: row for row in version_rows(project_id)}
+    assert sorted(rows) == [2, *range(4, 13)]
+    assert encoding(rows[2])[:3] == (True, 0, None)
+    assert encoding(rows[4])[:3] == (False, 1, 2)
+    assert all(encoding(rows[number]) == before[number] for number in range(5, 13))
+    for number, row in rows.items():
+        assert run(client, lambda db: load_version_content(db, row)) == snapshots[number - 1]
+
+def test_retention_commits_each_thinned_project(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "VERSION_RETENTION_POLICY", "*:none")
+    first_id, _ = snapshot_history(client, auth_headers, 3)
+    second_id, _ = snapshot_history(client, auth_headers, 3)
+
+    assert run(client, retention_batch) == 1
+    assert [len(version_rows(first_id)), len(version_rows(second_id))] == [1, 3]
+    assert run(client, retention_batch) == 1
+    assert len(version_rows(second_id)) == 1
+    assert run(client, retention_batch) == 0
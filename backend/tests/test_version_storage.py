@@ -0,0 +1,107 @@
+"""
+Delta-encoded version history
+"""
+
+import random
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer
+
+from app.core.config import settings
+from app.core.delta import apply_delta, encode_delta
+from app.core.versions import collect_garbage_blobs, load_version_content, reencode_batch
+from app.database import AsyncSessionLocal, SessionLocal, run_write
+from app.models.project import ProjectVersion
+
+@pytest.fixture
+def keyframe_interval(monkeypatch):
+    monkeypatch.setattr(settings, "VERSION_KEYFRAME_INTERVAL", 4)
+    return 4
+
+def run(client, work):
+    """Run ``work(session)`` on the app's event loop and commit"""
+    async def call():
+        async with AsyncSessionLocal() as db:
+            return await run_write(db, work)
+    return client.portal.call(call)
+
+def version_rows(project_id):
+    with SessionLocal() as db:
+        return db.scalars(select(ProjectVersion).where(
+            ProjectVersion.project_id == project_id
+        ).order_by(ProjectVersion.version_number).options(undefer(ProjectVersion.delta))).all()
+
+def snapshot_history(client, auth_headers, count):
+    """Create a project and ``count`` versions, returning the project id and each snapshot"""
+    random.seed(count)
+    lines = [f"<div class='row-{i}'><p>item {i}</p></div>" for i in range(300)]
+    project = client.post("/api/v1/projects/", json={"name": "History"}, headers=auth_headers).json()
+    snapshots = []
+    for number in range(1, count + 1):
+        lines[random.randrange(len(lines))] = f"<section>edit {number}</section>"
+        content = {
+            "html_content": "\n".join(lines),
+            "css_content": f".row-{number} {{ color: red; }}" if number % 3 else None,
+            "js_content": "console.log('stable');",
+            "elements_tree": {"id": "root", "children": [{"id": f"n{i}", "tag": "div"} for i in range(number)]},
+        }
+        client.put(f"/api/v1/projects/{project['id']}", json=content, headers=auth_headers)
+        client.post(f"/api/v1/projects/{project['id']}/versions", json={}, headers=auth_headers)
+        snapshots.append(content)
+    return project["id"], snapshots
+
+def test_delta_round_trip():
+    cases = [
+        (b"", b""), (b"", b"abc"), (b"abc", b""), (b"abc", b"abXc"),
+        (b"a\nb\nc\n", b"a\nc\nb\n"), ("ñandú €\n".encode() * 50, "ñandú\n€\n".encode() * 49),
+    ]
+    for base, target in cases:
+        assert apply_delta(base, encode_delta(base, target)) == target
+
+def test_versions_are_deltas_between_keyframes(client, auth_headers, keyframe_interval):
+    project_id, snapshots = snapshot_history(client, auth_headers, 10)
+
+    rows = version_rows(project_id)
+    assert [row.is_keyframe for row in rows] == [i % keyframe_interval == 0 for i in range(10)]
+    assert max(row.chain_depth for row in rows) == keyframe_interval - 1
+    assert all(row.html_hash is None and row.delta for row in rows if not row.is_keyframe)
+    delta_sizes = [row.stored_size for row in rows if not row.is_keyframe]
+    assert max(delta_sizes) < rows[0].content_size / 20
+
+    for row, expected in zip(rows, snapshots):
+        assert run(client, lambda db: load_version_content(db, row)) == expected
+
+def test_reencode_rewrites_legacy_history(client, auth_headers, keyframe_interval, monkeypatch):
+    # Full copies with no content hash: the shape history had before delta encoding
+    monkeypatch.setattr(settings, "VERSION_KEYFRAME_INTERVAL", 1)
+    project_id, snapshots = snapshot_history(client, auth_headers, 6)
+    with SessionLocal() as db:
+        db.execute(update(ProjectVersion).values(content_hash=None, content_size=None, stored_size=None))
+        db.commit()
+    assert all(row.is_keyframe for row in version_rows(project_id))
+
+    monkeypatch.setattr(settings, "VERSION_KEYFRAME_INTERVAL", keyframe_interval)
+    assert run(client, reencode_batch) == 6
+    assert run(client, reencode_batch) == 0
+
+    # Full copies of versions that became deltas are now unreferenced
+    monkeypatch.setattr(settings, "BLOB_GC_GRACE_SECONDS", 0)
+    assert run(client, collect_garbage_blobs) >= 3
+    assert run(client, collect_garbage_blobs) == 0
+
+    rows = version_rows(project_id)
+    assert [row.is_keyframe for row in rows] == [True, False, False, False, True, False]
+    for row, expected in zip(rows, snapshots):
+        assert run(client, lambda db: load_version_content(db, row)) == expected
+
+def test_storage_report(client, auth_headers, keyframe_interval, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["editor"])
+    snapshot_history(client, auth_headers, 8)
+
+    report = client.get("/api/v1/admin/storage/versions", headers=auth_headers).json()
+    assert report["versions"] == 8
+    assert report["keyframes"] == 2
+    assert report["pending_reencode"] == 0
+    assert report["compression_ratio"] > 3
+    assert report["reconstruct"]["count"] >= 6
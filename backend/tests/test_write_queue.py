@@ -0,0 +1,98 @@
+"""
+Single writer: a batch of queued writes is one SQLite transaction
+"""
+
+import asyncio
+import os
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.writer import WriteQueue
+from app.database import use_explicit_transactions, writer_engine
+from tests.conftest import TEST_DB_DIR
+
+def test_batch_commits_once(client):
+    statements = []
+    path = os.path.join(TEST_DB_DIR, "writer.db")
+    writer = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+    use_explicit_transactions(writer.sync_engine)
+    reader = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    queue = WriteQueue(async_sessionmaker(bind=writer), batch_size=8, batch_window=0.05)
+    seen_before_commit = []
+
+    async def insert(session, value):
+        await session.execute(text("INSERT INTO items (value) VALUES (:value)"), {"value": value})
+        async with reader.connect() as conn:
+            seen_before_commit.append((await conn.execute(text("SELECT count(*) FROM items"))).scalar())
+        if value == 2:
+            raise ValueError("rolled back alone")
+        return value
+
+    async def scenario():
+        async with writer.begin() as conn:
+            await conn.execute(text("CREATE TABLE items (value INTEGER)"))
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.set_trace_callback(statements.append)
+        statements.clear()
+        queue.start()
+        results = await asyncio.gather(
+            *(queue.submit(lambda session, value=value: insert(session, value)) for value in range(1, 5)),
+            return_exceptions=True
+        )
+        await queue.stop()
+        async with reader.connect() as conn:
+            stored = (await conn.execute(text("SELECT value FROM items ORDER BY value"))).scalars().all()
+        await writer.dispose()
+        await reader.dispose()
+        return results, stored
+
+    results, stored = client.portal.call(scenario)
+    assert results[:1] + results[2:] == [1, 3, 4] and isinstance(results[1], ValueError)
+    assert stored == [1, 3, 4]
+    assert seen_before_commit == [0, 0, 0, 0]
+    assert [statement for statement in statements if statement.startswith(("BEGIN", "COMMIT"))] == ["BEGIN IMMEDIATE", "COMMIT"]
+    assert sum(statement.startswith("RELEASE") for statement in statements) == 3
+
+def test_a_failed_batch_does_not_stop_the_writer(client):
+    path = os.path.join(TEST_DB_DIR, "writer.db")
+    writer = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+    sessions = async_sessionmaker(bind=writer)
+    failures = [OSError("database is unavailable")]
+
+    def session_factory():
+        # The first batch cannot even get its session
+        if failures:
+            raise failures.pop()
+        return sessions()
+
+    queue = WriteQueue(session_factory, batch_size=8, batch_window=0.05)
+
+    async def scenario():
+        queue.start()
+        first = await asyncio.gather(
+            *(queue.submit(lambda session: session.execute(text("SELECT 1"))) for _ in range(2)),
+            return_exceptions=True
+        )
+        second = await asyncio.wait_for(
+            queue.submit(lambda session: session.scalar(text("SELECT 2"))), 5
+        )
+        await queue.stop()
+        await writer.dispose()
+        return first, second
+
+    first, second = client.portal.call(scenario)
+    assert [type(error) for error in first] == [OSError, OSError]
+    assert second == 2
+
+def test_pool_report_includes_the_writer(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["editor"])
+    engines = client.get("/api/v1/admin/db/pool", headers=auth_headers).json()["engines"]
+    if writer_engine is None:
+        assert sorted(engines) == ["async", "sync"]
+        return
+    assert sorted(engines) == ["async", "sync", "writer"]
+    assert (engines["writer"]["size"], engines["writer"]["max_overflow"]) == (1, 0)
+    assert engines["async"]["max_overflow"] == settings.DB_MAX_OVERFLOW